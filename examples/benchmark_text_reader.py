@@ -0,0 +1,59 @@
+# import statements
+import argparse
+import ftxpy
+import numpy as np
+import os
+import tempfile
+import time
+
+# ===================================================================
+def sizes():
+    return [1000, 10000, 100000, 1000000]
+
+# ===================================================================
+def ncols():
+    return 6 # number of columns in retentionOut.txt
+
+# ===================================================================
+def write_file(file_name, nrows):
+    np.random.seed(2022)
+    np.savetxt(file_name, np.random.rand(nrows, ncols()) * 1e20)
+
+# ===================================================================
+def time_it(fun, file_name, repeat):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fun(file_name)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+# ===================================================================
+def benchmark(file_name, repeat):
+    reader = ftxpy.TextReader()
+    t_loadtxt, expected = time_it(np.loadtxt, file_name, repeat)
+    t_reader, result = time_it(reader.read, file_name, repeat) # file that may still be written to
+    t_complete, result_complete = time_it(lambda file_name: reader.read(file_name, complete=True), file_name, repeat)
+    if not np.array_equal(expected.reshape(-1, ncols()), result) or not np.array_equal(result, result_complete):
+        raise ValueError(f"results of np.loadtxt and TextReader differ for {file_name}")
+    size = os.path.getsize(file_name) / 1e6
+    print(f"{size:8.1f} MB | np.loadtxt {t_loadtxt:8.3f} s ({size / t_loadtxt:6.1f} MB/s) | TextReader {t_reader:8.3f} s ({size / t_reader:6.1f} MB/s) | TextReader (complete) {t_complete:8.3f} s ({size / t_complete:6.1f} MB/s)")
+
+# ===================================================================
+def main():
+
+    # add argument parser
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # run benchmarks
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for nrows in sizes():
+            file_name = os.path.join(tmp_dir, f"retentionOut_{nrows}.txt")
+            write_file(file_name, nrows)
+            benchmark(file_name, args.repeat)
+
+# ===================================================================
+if __name__ == "__main__":
+    main()
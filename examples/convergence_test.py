@@ -1,7 +1,6 @@
 # import statements
 import argparse
 import ftxpy
-import numpy as np
 import os
 import shutil
 import sys
@@ -18,6 +17,10 @@ def seeds():
 def network_sizes():
     return [50, 100, 150, 200, 250]
 
+# ===================================================================
+def uncertain_parameters():
+    return ["SBV_W", "EF_W", "EF_He", "E0_He", "ALPHA0_He", "lattice", "impurityRadius", "biasFactor", "initialV", "He1", "He2", "He3", "He4", "He5", "He6", "He7", "V1"]
+
 # ===================================================================
 def get_root_dir():
     return os.path.join(os.environ["CSCRATCH"], "ftxpy", "convergence_test")
@@ -36,27 +39,32 @@ def define():
     # list of simulations
     simulations = list()
 
-    for network_size in network_sizes():
-        for seed in seeds():
+    # sample the uncertain parameters, the same design is used for every network size (requires scipy, use method="mc" otherwise)
+    # scipy warns that 10 Sobol' points are not balanced, use a power of two number of seeds for a balanced design
+    config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile=profile())
+    sampler = ftxpy.FTXSampler(config["input"]["parameters"], param_names=uncertain_parameters(), method="sobol", seed=2022)
+    design = sampler.sample(len(seeds()))
 
-            # set seed
-            np.random.seed(2022 + seed)
+    # store the parameters of all simulations in a single table
+    table = ftxpy.FTXParameterTable(config["input"]["parameters"])
 
-            # load configuration file
-            config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile=profile())
+    # simulations with the same inputs as a finished simulation reuse its results
+    result_index = ftxpy.FTXResultIndex(os.path.join(os.environ["CSCRATCH"], "ftxpy", "result_index.db"), version=ftxpy.get_code_version(config["batchscript"]["commands"]))
+
+    for network_size in network_sizes():
+        for seed in seeds():
 
             # define parameters
-            parameters = config["input"]["parameters"]
-            
+            parameters = table.add_members(1)[0]
+
             # update parameters
             parameters["SIM_NAME"].set_value(get_name(network_size, seed))
             parameters["netParam"].set_value(f"8 0 0 {network_size} 6 false")
-            for param_name in ["SBV_W", "EF_W", "EF_He", "E0_He", "ALPHA0_He", "lattice", "impurityRadius", "biasFactor", "initialV", "He1", "He2", "He3", "He4", "He5", "He6", "He7", "V1"]:
-                parameters[param_name].set_random_value()
+            sampler.apply(parameters, design[seed])
         
             # define inputs
             source = os.path.expandvars(config["input"]["source"])
-            inputs = ftxpy.FTXInput(parameters=parameters, source=source)
+            inputs = ftxpy.FTXInput(parameters=parameters, source=source, staging=config["input"]["staging"])
 
             # define batchscript
             slurm_settings = config["batchscript"]["slurm_settings"]
@@ -72,40 +80,74 @@ def define():
             run = ftxpy.FTXRun(work_dir, inputs, batchscript)
 
             # set up an ftx simulation
-            simulation = ftxpy.FTXSimulation(run)
+            simulation = ftxpy.FTXSimulation(run, result_index=result_index)
             simulations.append(simulation)
 
     # create a simulation group
-    group = ftxpy.FTXGroup(get_root_dir(), simulations)
+    planner = ftxpy.FTXJobPlanner(**config["batchscript"].get("planner", dict()))
+    walltime_model = ftxpy.FTXWalltimeModel(**config["batchscript"]["walltime"])
+    group = ftxpy.FTXGroup(get_root_dir(), simulations, planner=planner, walltime_model=walltime_model)
 
     # save the simulation group
     group.save(overwrite=True)
 
+# ===================================================================
+def get_group_file():
+    return os.path.join(get_root_dir(), "simulation_group.db")
+
 # ===================================================================
 def start():
-    group = ftxpy.FTXGroup.load(os.path.join(get_root_dir(), "simulation_group.pk"))
-    group.start()
-    group.save(overwrite=True)
+    with ftxpy.FTXStateStore(get_group_file()).lock():
+        group = ftxpy.FTXGroup.load(get_group_file())
+        group.start()
+        group.save(overwrite=True)
 
 # ===================================================================
 def step():
-    group = ftxpy.FTXGroup.load(os.path.join(get_root_dir(), "simulation_group.pk"))
-    group.step()
-    group.save(overwrite=True)
+    with ftxpy.FTXStateStore(get_group_file()).lock():
+        group = ftxpy.FTXGroup.load(get_group_file())
+        group.step()
+        group.save(overwrite=True)
+
+# ===================================================================
+def get_monitor():
+    return ftxpy.FTXConvergenceMonitor(ftxpy.FTXRelativeChange("retention", window=1.0, rtol=1e-3))
+
+# ===================================================================
+def get_monitor_file():
+    return os.path.join(get_root_dir(), "monitor.pk")
+
+# ===================================================================
+def monitor():
+    with ftxpy.FTXStateStore(get_group_file()).lock():
+        group = ftxpy.FTXGroup.load(get_group_file())
+        convergence_monitor = ftxpy.utils.load(get_monitor_file()) if os.path.isfile(get_monitor_file()) else get_monitor() # keeps the read offsets between cron calls
+        convergence_monitor.check_group(group)
+        group.save(overwrite=True)
+        ftxpy.utils.save(convergence_monitor, get_monitor_file())
+
+# ===================================================================
+def drive():
+    campaign = ftxpy.FTXCampaign(get_group_file(), poll_interval=60, max_active=len(seeds()) * len(network_sizes()), monitor=get_monitor())
+    campaign.run()
 
 # ===================================================================
 def print_status():
-    group = ftxpy.FTXGroup.load(os.path.join(get_root_dir(), "simulation_group.pk"))
+    group = ftxpy.FTXGroup.load(get_group_file())
     group.print_status()
 
+# ===================================================================
+def print_last_known_status():
+    ftxpy.FTXStateStore(get_group_file()).print_status()
+
 # ===================================================================
 def postprocess():
-    group = ftxpy.FTXGroup.load(os.path.join(get_root_dir(), "simulation_group.pk"))
+    group = ftxpy.FTXGroup.load(get_group_file())
     group.postprocess()
 
 # ===================================================================
 def delete_failed_restarts():
-    group = ftxpy.FTXGroup.load(os.path.join(get_root_dir(), "simulation_group.pk"))
+    group = ftxpy.FTXGroup.load(get_group_file())
     group.save(overwrite=True)
 
 # ===================================================================
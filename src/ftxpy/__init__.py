@@ -1,10 +1,29 @@
 from .utils import *
+from .scheduler import *
+from .local import *
+from .batchscript import *
+from .logscanner import *
+from .filecache import *
+from .textreader import *
 from .parameter import *
+from .sampler import *
+from .table import *
+from .template import *
+from .sourcecache import *
+from .staging import *
+from .checkpoint import *
 from .input import *
+from .resultindex import *
 from .run import *
 from .simulation import *
+from .planner import *
+from .walltime import *
 from .group import *
+from .campaign import *
 from .output import *
+from .monitor import *
+from .store import *
+from .statestore import *
 
 # load default configuration files
 _ftxpy_config_cori_ = os.path.join(os.path.dirname(__file__), "..", "..", "config", "config.cori.toml")
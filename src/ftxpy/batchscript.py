@@ -1,9 +1,12 @@
 # import statements
 import os
-import pyslurm
 import shlex
 import subprocess
 
+# special imports
+from .local import get_local_queue
+from .scheduler import get_slurm_queue, pyslurm
+
 # class that represents a batchscript
 class Batchscript():
     """
@@ -13,6 +16,8 @@ class Batchscript():
     -------
     submit():
         Submit this batchscript to the slurm scheduler
+    submit_array(work_dirs, manifest_file, max_running):
+        Submit this batchscript as a slurm job array, with one array task per work directory
     """
 
     def __init__(self, slurm_settings:dict, commands:list):
@@ -40,13 +45,119 @@ class Batchscript():
         """
         job = {key: val for key, val in self.slurm_settings.items()}
         job["wrap"] = "\n".join(self.commands)
+        return self._submit(job)
+
+    def submit_array(self, work_dirs:list, manifest_file:str="array_manifest", max_running:int=None)->int:
+        """
+        Submit this batchscript as a slurm job array, with one array task per work directory
+
+        The work directories are written to a manifest file (one per line), and array
+        task k changes to the work directory on line k + 1 before running the commands.
+        Use '%a' in the output setting to get a separate slurm log file per array task.
+
+            Parameters:
+                work_dirs (list): The work directories of the array tasks
+                manifest_file (str): The name of the manifest file, relative to the current directory
+                max_running (int): The maximum number of array tasks that run at the same time, 'None' means no limit
+
+        Return
+        ------
+            job_id : int
+                The array job id for this batch job
+        """
+        if len(work_dirs) < 1:
+            print(f"A job array needs at least one work directory, got {len(work_dirs)}")
+            raise ValueError("FTXPy -> Batchscript -> submit_array() : A job array needs at least one work directory")
+        manifest_file = os.path.abspath(manifest_file)
+        with open(manifest_file, "w") as f:
+            f.write("\n".join(os.path.abspath(work_dir) for work_dir in work_dirs) + "\n")
+        job = {key: val for key, val in self.slurm_settings.items()}
+        job["array"] = f"0-{len(work_dirs) - 1}" + ("" if max_running is None else f"%{max_running}")
+        cd_command = f"cd \"$(sed -n \"$((SLURM_ARRAY_TASK_ID + 1))p\" {shlex.quote(manifest_file)})\""
+        job["wrap"] = "\n".join([cd_command] + self.commands)
+        return self._submit(job)
+
+    def _submit(self, job:dict)->int:
+        if pyslurm is None:
+            print(f"Cannot submit batchscript, pyslurm is not available (use LocalBatchscript to run jobs locally)")
+            raise ValueError("FTXPy -> Batchscript -> submit() : pyslurm is not available")
         try:
             job_id = pyslurm.job().submit_batch_job(job)
         except:
             print(f"Error submitting batchscript")
             raise ValueError("FTXPy -> Batchscript -> submit() : Error submitting batchscript")
+        get_slurm_queue().invalidate() # the new job is not in the current snapshot
         return job_id
 
+# class that represents a batchscript that runs as a local subprocess
+class LocalBatchscript():
+    """
+    A class to represent a batchscript that runs as a local subprocess instead of a slurm job
+
+    The jobs are run by the shared LocalQueue, which bounds the number of jobs that run
+    at the same time and pins every job to its own CPUs. The 'output' and 'time_limit'
+    (in minutes) slurm settings are honored, all other slurm settings are ignored. Like
+    slurm jobs, local jobs keep running after the process that submitted them has exited.
+
+    Methods
+    -------
+    submit():
+        Submit this batchscript to the local queue
+    submit_array(work_dirs, manifest_file, max_running):
+        Submit this batchscript as a local job array, with one array task per work directory
+    """
+
+    def __init__(self, slurm_settings:dict, commands:list, cpus_per_job:int=1):
+        """
+        Constructs all the necessary attributes for the LocalBatchscript object
+
+        Parameters
+        ----------
+            slurm_settings : dict
+                An optional dict of slurm settings
+            commands : list
+                An optional list of commands to run
+            cpus_per_job : int (keyword argument)
+                The number of CPUs every job is pinned to
+        """
+        self.slurm_settings = slurm_settings
+        self.commands = commands
+        self.cpus_per_job = cpus_per_job
+
+    def _get_output(self)->str:
+        return os.path.abspath(self.slurm_settings.get("output", "slurm-%j.out"))
+
+    def submit(self)->str:
+        """
+        Submit this batchscript to the local queue, the commands run in the current directory
+
+        Return
+        ------
+            job_id : str
+                The job id for this local job
+        """
+        return get_local_queue().submit(self.commands, os.getcwd(), self._get_output(), time_limit=self.slurm_settings.get("time_limit"), cpus_per_job=self.cpus_per_job)
+
+    def submit_array(self, work_dirs:list, manifest_file:str="array_manifest", max_running:int=None)->str:
+        """
+        Submit this batchscript as a local job array, with one array task per work directory
+
+            Parameters:
+                work_dirs (list): The work directories of the array tasks
+                manifest_file (str): Ignored, every array task runs in its own work directory
+                max_running (int): Ignored, the number of running jobs is bounded by the local queue
+
+        Return
+        ------
+            job_id : str
+                The array job id for this local job
+        """
+        if len(work_dirs) < 1:
+            print(f"A job array needs at least one work directory, got {len(work_dirs)}")
+            raise ValueError("FTXPy -> LocalBatchscript -> submit_array() : A job array needs at least one work directory")
+        work_dirs = [os.path.abspath(work_dir) for work_dir in work_dirs]
+        return get_local_queue().submit(self.commands, work_dirs, self._get_output(), time_limit=self.slurm_settings.get("time_limit"), cpus_per_job=self.cpus_per_job, array_task_ids=list(range(len(work_dirs))))
+
 # class that represents a dummy batchscript
 class DummyBatchscript():
 
@@ -0,0 +1,216 @@
+# import statements
+import asyncio
+import os
+import signal
+
+# special imports
+from .group import FTXGroup
+from .monitor import FTXConvergenceMonitor
+from .scheduler import get_slurm_queue
+from .statestore import FTXStateStore
+
+# class that represents a long-running driver for a group of FTX simulations
+class FTXCampaign():
+    """
+    A class to represent a long-running driver for a group of FTX simulations
+
+    The driver polls the slurm job table every few seconds. A simulation whose job
+    left the queue is inspected right away. It is restarted if it exceeded the time
+    limit, marked as done if it finished, and marked as failed otherwise. Simulations
+    that have not started are started. At most 'max_active' simulations are queueing
+    or running at the same time. With a convergence monitor, running simulations that
+    meet its stopping criterion are marked as converged and their jobs are cancelled,
+    so they are not restarted. The group and the state of the driver are saved
+    after every submission, so the driver can be stopped (SIGINT or SIGTERM) and
+    resumed. The driver only holds the lock of the state store while it polls and
+    submits, not while it waits, and it reloads the group when another process
+    (e.g. a cron-driven 'step' or 'monitor') saved it in the meantime.
+
+    Methods
+    -------
+    run()
+        Run this campaign until all simulations have finished or failed, or until it is stopped
+    run_async()
+        Coroutine that runs this campaign
+    stop()
+        Stop this campaign after the current poll
+    get_state()
+        Returns the state of this campaign
+    """
+
+    def __init__(self, file_name:str, poll_interval:float=60, max_active:int=None, max_restarts:int=None, processes:int=1, monitor:FTXConvergenceMonitor=None):
+        """
+        Constructs all the necessary attributes for the FTXCampaign object
+
+        Parameters
+        ----------
+            file_name : str
+                The name of the simulation group file (an SQLite state store)
+            poll_interval : float (keyword argument)
+                The number of seconds between two polls of the slurm job table
+            max_active : int (keyword argument)
+                The maximum number of simulations that are queueing or running at the same time, None means no limit
+            max_restarts : int (keyword argument)
+                The maximum number of restarts of a single simulation, None means no limit
+            processes : int (keyword argument)
+                The number of worker processes used to prepare the simulations
+            monitor : FTXConvergenceMonitor (keyword argument)
+                The monitor that stops simulations whose outputs have converged, by default simulations run until END_TIME
+        """
+        if max_active is not None and max_active < 1:
+            print(f"Invalid value for max_active: expected a positive integer, got {max_active}")
+            raise ValueError("FTXPy -> FTXCampaign -> __init__() : Invalid value specified")
+        self.file_name = file_name
+        self.poll_interval = poll_interval
+        self.max_active = max_active
+        self.max_restarts = max_restarts
+        self.processes = processes
+        self.monitor = monitor
+        self._store = FTXStateStore(file_name)
+        self._active = set() # paths of simulations that are queueing or running
+        self._pending = dict() # dict with paths of simulations that need to be submitted and their action
+        self._finished = set()
+        self._failed = set()
+        self._restarts = dict() # dict with simulation paths and number of restarts
+        self._generation = None # generation of the state store when the group was last loaded or saved by this driver
+        self._stop_event = None
+
+    def get_state(self)->dict:
+        """Returns the state of this campaign"""
+        return {"finished": sorted(self._finished), "failed": sorted(self._failed), "restarts": dict(self._restarts)}
+
+    def _set_state(self, state:dict)->None:
+        self._finished = set(state.get("finished", list()))
+        self._failed = set(state.get("failed", list()))
+        self._restarts = dict(state.get("restarts", dict()))
+
+    def _resolve_paths(self, group:FTXGroup)->None:
+        paths = {os.path.basename(simulation.get_path()): simulation.get_path() for simulation in group.simulations}
+        if len(paths) < len(group.simulations):
+            return # simulations with the same base name, states saved before simulations were keyed by their path cannot be resolved
+        self._finished = {paths.get(key, key) for key in self._finished} # states saved before simulations were keyed by their path
+        self._failed = {paths.get(key, key) for key in self._failed}
+        self._restarts = {paths.get(key, key): restarts for key, restarts in self._restarts.items()}
+
+    def run(self)->None:
+        """Run this campaign until all simulations have finished or failed, or until it is stopped"""
+        asyncio.run(self.run_async())
+
+    def stop(self)->None:
+        """Stop this campaign after the current poll"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    async def run_async(self)->None:
+        """Coroutine that runs this campaign"""
+        loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError): # not in the main thread
+                pass
+        try:
+            with self._store.lock():
+                self._set_state(self._store.load_campaign_state())
+            group = None
+            while not self._stop_event.is_set():
+                with self._store.lock(): # held for one poll only, so that cron-driven actions can run in between
+                    group = await loop.run_in_executor(None, self._load, group)
+                    converged = list() if self.monitor is None else await loop.run_in_executor(None, self.monitor.check_group, group)
+                    stopped = await loop.run_in_executor(None, self._poll, group)
+                    submitted = await loop.run_in_executor(None, self._submit, group)
+                    if len(converged) > 0 or len(stopped) > 0 or len(submitted) > 0:
+                        await loop.run_in_executor(None, self._checkpoint, group)
+                if len(self._active) == 0 and len(self._pending) == 0:
+                    print(f"Campaign complete: {len(self._finished)} simulations finished, {len(self._failed)} failed")
+                    break
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if group is not None:
+                with self._store.lock():
+                    group = await loop.run_in_executor(None, self._load, group)
+                    await loop.run_in_executor(None, self._checkpoint, group)
+        finally:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.remove_signal_handler(signum)
+                except (NotImplementedError, RuntimeError):
+                    pass
+
+    def _poll(self, group:FTXGroup)->list:
+        get_slurm_queue().invalidate() # one fresh snapshot of the job table per poll
+        stopped = list()
+        for simulation in group.simulations:
+            path = simulation.get_path()
+            if path in self._finished or path in self._failed or path in self._pending:
+                continue
+            if simulation.has_started() and (simulation.is_queueing() or simulation.is_running()):
+                self._active.add(path)
+                continue
+            if path in self._active: # the job of this simulation left the queue
+                self._active.discard(path)
+                stopped.append(path)
+            action = self._get_action(simulation, path)
+            if action is not None:
+                self._pending[path] = action
+        return stopped
+
+    def _get_action(self, simulation, path:str)->str:
+        if not simulation.has_started():
+            return "start"
+        if simulation.has_finished():
+            print(simulation.status())
+            self._finished.add(path)
+            simulation.record_result() # recorded as soon as the simulation is seen to finish
+            return None
+        if simulation.has_exceeded_the_time_limit():
+            if self.max_restarts is not None and self._restarts.get(path, 0) >= self.max_restarts:
+                print(f"{simulation.status()}, but it has reached the maximum number of restarts ({self.max_restarts})")
+                self._failed.add(path)
+                return None
+            return "restart"
+        print(f"{simulation.status()}, it will not be resubmitted")
+        self._failed.add(path)
+        return None
+
+    def _submit(self, group:FTXGroup)->list:
+        capacity = len(self._pending) if self.max_active is None else max(0, self.max_active - len(self._active))
+        actions = {path: self._pending.pop(path) for path in list(self._pending)[:capacity]}
+        submitted = list()
+        for action in ("start", "restart"):
+            simulations = [simulation for simulation in group.simulations if actions.get(simulation.get_path()) == action]
+            if len(simulations) == 0:
+                continue
+            submitted_paths = {simulation.get_path() for simulation in group.submit(simulations, action, self.processes)}
+            reused_paths = {simulation.get_path() for simulation in group.simulations if simulation.is_reused()}
+            for simulation in simulations:
+                path = simulation.get_path()
+                if path in reused_paths: # the runs of a finished simulation with the same inputs were reused
+                    self._finished.add(path)
+                elif path in submitted_paths:
+                    self._active.add(path)
+                    if action == "restart":
+                        self._restarts[path] = self._restarts.get(path, 0) + 1
+                    submitted.append(path)
+                else: # error while preparing the simulation
+                    self._failed.add(path)
+        if len(submitted) > 0:
+            print(f"Submitted {len(submitted)} simulations ({len(self._active)} active, {len(self._pending)} pending)")
+        return submitted
+
+    def _load(self, group:FTXGroup)->FTXGroup:
+        generation = self._store.get_generation()
+        if group is None or generation != self._generation: # the group was saved by another process
+            group = FTXGroup.load(self.file_name)
+            self._resolve_paths(group)
+            self._generation = generation
+            self._pending.clear() # the next poll derives the pending actions from the reloaded group
+        return group
+
+    def _checkpoint(self, group:FTXGroup)->None:
+        group.save(overwrite=True)
+        self._store.save_campaign_state(self.get_state())
+        self._generation = self._store.get_generation()
@@ -0,0 +1,66 @@
+# import statements
+import h5py
+import os
+
+# function to copy the attributes of an HDF5 object
+def _copy_attrs(src, dest)->None:
+    for key, val in src.attrs.items():
+        dest.attrs[key] = val
+
+# function to copy an HDF5 object (with its attributes, chunking and compression), returns the number of bytes of data copied
+def _copy(obj, dest_group:h5py.Group, name:str)->int:
+    obj.file.copy(obj, dest_group, name=name) # object-level copy (H5Ocopy), HDF5 copies the data chunk by chunk
+    return _get_nbytes(obj)
+
+# function to return the number of bytes of data in an HDF5 dataset or group
+def _get_nbytes(obj)->int:
+    if isinstance(obj, h5py.Dataset):
+        return 0 if obj.shape is None else obj.dtype.itemsize * obj.size
+    nbytes = list()
+    obj.visititems(lambda _, child: nbytes.append(_get_nbytes(child)) if isinstance(child, h5py.Dataset) else None)
+    return sum(nbytes)
+
+# function to return the name of the last concentration timestep in a Xolotl checkpoint file
+def _get_last_timestep(concentrations:h5py.Group)->str:
+    if "lastTimeStep" in concentrations.attrs:
+        return f"concentration_{int(concentrations.attrs['lastTimeStep'])}"
+    timesteps = [int(key.split("_")[-1]) for key in concentrations.keys() if key.startswith("concentration_")]
+    if len(timesteps) == 0:
+        return None
+    return f"concentration_{max(timesteps)}"
+
+# function to copy a Xolotl checkpoint file, keeping only the last concentration timestep
+def keep_last_ts(in_file:str, out_file:str, verbose:bool=False)->int:
+    """
+    Copy a Xolotl checkpoint file (e.g. xolotlStop.h5) to a new file, keeping only the last concentration timestep
+
+        Parameters:
+            in_file (str): The name of the Xolotl checkpoint file
+            out_file (str): The name of the new file (e.g. networkFile.h5), an existing file is overwritten
+            verbose (bool): Print the number of bytes copied
+
+        Returns:
+            nbytes (int): The number of bytes copied
+    """
+    if not os.path.isfile(in_file):
+        print(f"File {in_file} does not exist")
+        raise ValueError("FTXPy -> keep_last_ts() : File does not exist")
+    nbytes = 0
+    with h5py.File(in_file, "r") as f_in, h5py.File(out_file, "w") as f_out:
+        _copy_attrs(f_in, f_out)
+        for key, obj in f_in.items():
+            if key != "concentrationsGroup": # header and network
+                nbytes += _copy(obj, f_out, key)
+        if "concentrationsGroup" in f_in:
+            concentrations = f_in["concentrationsGroup"]
+            new_concentrations = f_out.create_group("concentrationsGroup")
+            _copy_attrs(concentrations, new_concentrations)
+            last_timestep = _get_last_timestep(concentrations)
+            if last_timestep is not None:
+                if not last_timestep in concentrations:
+                    print(f"Last timestep {last_timestep} not found in {in_file}")
+                    raise ValueError("FTXPy -> keep_last_ts() : Last timestep not found")
+                nbytes += _copy(concentrations[last_timestep], new_concentrations, last_timestep)
+    if verbose:
+        print(f"Copied {nbytes / 1e6:.1f} MB from {in_file} to {out_file}")
+    return nbytes
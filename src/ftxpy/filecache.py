@@ -0,0 +1,70 @@
+# import statements
+import os
+import sys
+
+# special imports
+from collections import OrderedDict
+
+# class that represents a cache of parsed files
+class FileCache():
+    """
+    A class to represent a least-recently-used cache of parsed files
+
+    Files are identified by their path, modification time and size, so that a
+    file that changes on disk is parsed again. The total size of the cached
+    objects is bounded by a given number of bytes.
+
+    Methods
+    -------
+    load(file_name, parser)
+        Returns the parsed contents of the given file, parsing it only if it is not in the cache
+    clear()
+        Removes all parsed files from the cache
+    get_size()
+        Returns the total size (in bytes) of the parsed files in this cache
+    """
+
+    def __init__(self, max_bytes:int=1 << 28):
+        """
+        Constructs all the necessary attributes for the FileCache object
+
+        Parameters
+        ----------
+            max_bytes : int (keyword argument)
+                The maximum total size (in bytes) of the parsed files in this cache
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # dict with (path, mtime, size) keys and (parsed contents, size in bytes) values
+        self._size = 0
+
+    def load(self, file_name:str, parser):
+        """
+        Returns the parsed contents of the given file, parsing it only if it is not in the cache
+
+            Parameters:
+                file_name (str): The name of the file to parse
+                parser (callable): A function that takes a file name and returns its parsed contents
+        """
+        stat = os.stat(file_name)
+        key = (os.path.abspath(file_name), stat.st_mtime_ns, stat.st_size, parser)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+        contents = parser(file_name)
+        nbytes = getattr(contents, "nbytes", sys.getsizeof(contents))
+        if nbytes <= self.max_bytes:
+            self._entries[key] = (contents, nbytes)
+            self._size += nbytes
+            while self._size > self.max_bytes:
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self._size -= evicted_nbytes
+        return contents
+
+    def clear(self)->None:
+        """Removes all parsed files from the cache"""
+        self._entries.clear()
+        self._size = 0
+
+    def get_size(self)->int:
+        """Returns the total size (in bytes) of the parsed files in this cache"""
+        return self._size
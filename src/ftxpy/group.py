@@ -1,11 +1,21 @@
 # import statements
+import copy
+import multiprocessing
 import os
 
 # special imports
 from .simulation import FTXSimulation
 from .batchscript import Batchscript, DummyBatchscript
+from .filecache import FileCache
 from .output import FTXOutput
-from .utils import save, load, working_directory
+from .parameter import FTXParameter
+from .planner import FTXJobPlanner
+from .scheduler import get_slurm_queue
+from .statestore import FTXStateStore
+from .store import FTXResultStore
+from .textreader import TextReader, get_text_reader
+from .walltime import FTXWalltimeModel
+from .utils import load, working_directory
 
 # class that represents an FTX simulation group
 class FTXGroup():
@@ -14,17 +24,25 @@ class FTXGroup():
 
     Methods
     -------
-    step()
+    start(processes)
+        Start this group of simulations
+    step(processes)
         Execute the next step in this group of simulations
+    submit(simulations, action, processes)
+        Prepare and submit the given simulations of this group
     print_status()
         Prints the status of this group of simulations
     save()
         Save this group FTX simulations
+    postprocess(processes, chunksize)
+        Postprocess this group of FTX simulations, optionally in parallel
+    get_results()
+        Returns the result store of this group of FTX simulations
     load()
         Load a group of FTX simulations from file
     """
 
-    def __init__(self, work_dir:str, simulations:list):
+    def __init__(self, work_dir:str, simulations:list, planner:FTXJobPlanner=None, array:bool=False, walltime_model:FTXWalltimeModel=None):
         """
         Constructs all the necessary attributes for the FTXGroup object
 
@@ -34,6 +52,12 @@ class FTXGroup():
                 The name of the work directory where this group of FTX simulations wil be running
             simulations : list
                 The list of simulations that are part of this group of FTX simulations
+            planner : FTXJobPlanner (keyword argument)
+                The planner that splits the simulations over Slurm jobs, by default all simulations are submitted in a single job
+            array : bool (keyword argument)
+                Submit the simulations as a Slurm job array with one array task per simulation, instead of packing them into IPS jobs
+            walltime_model : FTXWalltimeModel (keyword argument)
+                The model used to set the time limit of every job from past runs, by default the time limit of the batchscript is used
         """
         self.work_dir = work_dir
         if len(simulations) < 1:
@@ -44,72 +68,286 @@ class FTXGroup():
         for simulation in simulations:
             simulation.current_run.batchscript = DummyBatchscript()
         self.run_number = -1
+        self.planner = FTXJobPlanner() if planner is None else planner
+        self.array = array
+        self.walltime_model = walltime_model
 
-    def _step(self, simulations):
+    def _step(self, simulations, walltime_model:FTXWalltimeModel=None):
         if len(simulations) > 0:
             self.run_number += 1
-            self.batchscript.slurm_settings["output"] = f"log.slurm.stdOut.{self.run_number}"
-            self.batchscript.slurm_settings["min_nodes"] = 2*len(simulations)
-            configs = []
-            for simulation in simulations:
-                configs.append(f"{simulation.current_run.work_dir}/ips.ftx.config")
-            ips_command = "ips.py --config=" + ",".join(configs) + f" --platform=$CFS/atom/users/$USER/ips-examples/iterative-xolotlFT-UQ/conf.ips.cori --log=log.framework.{self.run_number} 2>>log.stdErr.{self.run_number} 1>>log.stdOut.{self.run_number}"
-            self.batchscript.commands[-1] = ips_command
-            with working_directory(self.work_dir):
-                job_id = self.batchscript.submit()
-            for simulation in simulations:
-                simulation.current_run._job_id = job_id
-                simulation.current_run.batchscript.slurm_settings["output"] = os.path.join(self.work_dir, self.batchscript.slurm_settings["output"])
-
-    def start(self):
-        """Start this group of simulations"""
-        simulations = list()
+            if self._is_array():
+                self._step_array(simulations, walltime_model)
+                return
+            jobs = self._get_planner().plan(simulations)
+            for job_number, job_simulations in enumerate(jobs):
+                suffix = f"{self.run_number}" if len(jobs) == 1 else f"{self.run_number}.{job_number}"
+                batchscript = copy.deepcopy(self.batchscript)
+                batchscript.slurm_settings["output"] = f"log.slurm.stdOut.{suffix}"
+                batchscript.slurm_settings["min_nodes"] = sum(self._get_planner().get_nodes(simulation) for simulation in job_simulations)
+                self._set_time_limit(batchscript, job_simulations, walltime_model)
+                configs = []
+                for simulation in job_simulations:
+                    configs.append(f"{simulation.current_run.work_dir}/ips.ftx.config")
+                ips_command = "ips.py --config=" + ",".join(configs) + f" --platform=$CFS/atom/users/$USER/ips-examples/iterative-xolotlFT-UQ/conf.ips.cori --log=log.framework.{suffix} 2>>log.stdErr.{suffix} 1>>log.stdOut.{suffix}"
+                batchscript.commands[-1] = ips_command
+                with working_directory(self.work_dir):
+                    job_id = batchscript.submit()
+                for simulation in job_simulations:
+                    simulation.current_run._job_id = job_id
+                    simulation.current_run.batchscript.slurm_settings["output"] = os.path.join(self.work_dir, batchscript.slurm_settings["output"])
+                    _record_time_limit(simulation, batchscript)
+
+    def _step_array(self, simulations, walltime_model:FTXWalltimeModel=None):
+        batchscript = copy.deepcopy(self.batchscript)
+        batchscript.slurm_settings["output"] = f"log.slurm.stdOut.{self.run_number}.%a"
+        batchscript.slurm_settings["min_nodes"] = max(self._get_planner().get_nodes(simulation) for simulation in simulations)
+        self._set_time_limit(batchscript, simulations, walltime_model)
+        work_dirs = [simulation.current_run.work_dir for simulation in simulations]
+        with working_directory(self.work_dir):
+            job_id = batchscript.submit_array(work_dirs, manifest_file=f"array_manifest.{self.run_number}")
+        for array_task_id, simulation in enumerate(simulations):
+            simulation.current_run._job_id = job_id
+            simulation.current_run._array_task_id = array_task_id
+            simulation.current_run.batchscript.slurm_settings["output"] = os.path.join(self.work_dir, f"log.slurm.stdOut.{self.run_number}.{array_task_id}")
+            _record_time_limit(simulation, batchscript)
+
+    def _set_time_limit(self, batchscript, simulations:list, walltime_model:FTXWalltimeModel)->None:
+        if walltime_model is None or not walltime_model.is_fitted():
+            return
+        max_time_limit = self.batchscript.slurm_settings.get("time_limit")
+        batchscript.slurm_settings["time_limit"] = max(walltime_model.get_time_limit(simulation.current_run.inputs.parameters, max_time_limit) for simulation in simulations)
+
+    def _fit_walltime_model(self)->FTXWalltimeModel:
+        if getattr(self, "walltime_model", None) is None: # groups saved before the walltime model was introduced
+            return None
+        walltime_model = copy.deepcopy(self.walltime_model)
         for simulation in self.simulations:
-            if not simulation.has_started():
-                simulation.start()
-                simulations.append(simulation)
+            walltime_model.add_runs(simulation.get_runs())
+        walltime_model.fit()
+        return walltime_model
+
+    def _is_array(self)->bool:
+        if not hasattr(self, "array"): # groups saved before job arrays were introduced
+            self.array = False
+        return self.array
+
+    def _get_planner(self)->FTXJobPlanner:
+        if not hasattr(self, "planner"): # groups saved before the job planner was introduced
+            self.planner = FTXJobPlanner()
+        return self.planner
+
+    def start(self, processes:int=1, force:bool=False):
+        """
+        Start this group of simulations
+
+            Parameters:
+                processes (int): The number of worker processes used to prepare the simulations, 'None' uses all available cores
+                force (bool): Submit all simulations, also those with the same inputs as a finished simulation in their result index
+        """
+        simulations = [simulation for simulation in self.simulations if not simulation.has_started()]
+        self.submit(simulations, "start", processes, force)
+
+    def step(self, processes:int=1):
+        """
+        Execute the next step in this group of simulations
+
+            Parameters:
+                processes (int): The number of worker processes used to prepare the simulations, 'None' uses all available cores
+        """
+        simulations = [simulation for simulation in self.simulations if not simulation.has_finished()]
+        self.submit(simulations, "restart", processes)
+
+    def submit(self, simulations:list, action:str="start", processes:int=1, force:bool=False)->list:
+        """
+        Prepare and submit the given simulations of this group
+
+            Parameters:
+                simulations (list): The simulations to submit, must be part of this group
+                action (str): Either 'start' or 'restart'
+                processes (int): The number of worker processes used to prepare the simulations, 'None' uses all available cores
+                force (bool): Submit all simulations, also those with the same inputs as a finished simulation in their result index
+
+            Returns:
+                submitted (list): The simulations that were prepared and submitted, these replace the given simulations in this group, simulations that reused the runs of a finished simulation are not submitted
+        """
+        if not action in ("start", "restart"):
+            print(f"Invalid action {action}: expected 'start' or 'restart'")
+            raise ValueError("FTXPy -> FTXGroup -> submit() : Invalid action specified")
+        if not self._is_array():
+            self._get_planner().plan(simulations) # check that the simulations can be submitted before preparing them
 
         # actually run the jobs
-        self._step(simulations)
+        self._record_results(simulations) # finished simulations can be reused by the simulations that are started
+        walltime_model = self._fit_walltime_model() # fitted to all past runs of this group
+        submitted = [simulation for simulation in self._prepare(simulations, action, processes, force) if not simulation.is_reused()]
+        self._step(submitted, walltime_model)
+        return submitted
 
-    def step(self):
-        """Execute the next step in this group of simulations"""
-        simulations = list()
+    def _record_results(self, submitted:list)->None:
+        submitted = set(map(id, submitted)) # these are about to be (re)started, so they have no new result
         for simulation in self.simulations:
-            if not simulation.has_finished():
-                simulation.restart()
-                simulations.append(simulation)
+            if not id(simulation) in submitted:
+                simulation.record_result() # returns immediately for simulations that were recorded before
 
-        # actually run the jobs
-        self._step(simulations)
+    def _prepare(self, simulations:list, action:str, processes:int, force:bool=False)->list:
+        if processes == 1:
+            results = [_prepare_simulation(simulation, action, force) for simulation in simulations] # prepared in place, a failed preparation is rolled back
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.starmap(_prepare_simulation, [(simulation, action, force) for simulation in simulations])
+        prepared = list()
+        for simulation, (prepared_simulation, error) in zip(simulations, results):
+            if error is not None:
+                print(f"Error preparing simulation {os.path.basename(simulation.get_path())}, it will not be submitted: {error}")
+                continue
+            self.simulations[self.simulations.index(simulation)] = prepared_simulation
+            prepared.append(prepared_simulation)
+        return prepared
 
     def print_status(self):
         """Prints the status of this group of FTX simulations"""
+        get_slurm_queue().invalidate() # take one fresh snapshot of the job table for this sweep
         for simulation in self.simulations:
             simulation.print_status()
 
     def save(self, overwrite:bool=False)->None:
-        """Save this FTX group of simulations"""
-        file_name =  os.path.join(self.work_dir, "simulation_group.pk")
-        if overwrite and os.path.isfile(file_name):
-            os.remove(file_name)
-        if os.path.isfile(file_name):
+        """Save this FTX group of simulations, only simulations that changed since the last save are rewritten and, when overwriting, simulations that are no longer in this group are removed"""
+        file_name =  os.path.join(self.work_dir, "simulation_group.db")
+        if not overwrite and os.path.isfile(file_name):
             print(f"File {file_name} already exists, use 'overwrite=True' to overwrite the simulation group file")
             raise ValueError("FTXPy -> FTXGroup -> save() : File already exists, use 'overwrite=True' to overwrite the simulation group file")
-        save(self, file_name)
+        state = {key: val for key, val in self.__dict__.items() if not key in ("simulations", "_partial")}
+        prune = overwrite and not getattr(self, "_partial", False) # a group loaded with a subset of the simulations does not remove the others
+        FTXStateStore(file_name).save_state(state, self.simulations, prune=prune)
 
-    def postprocess(self):
-        for simulation in self.simulations:
-            # if simulation.has_finished():
-            output = FTXOutput(simulation)
-            output.load_surface()
-            output.load_retention()
-            output.load_content()
-            output.save(overwrite=True)
-
-    def load(file_name:str):
-        """Load a group of FTX simulations from file"""
+    def postprocess(self, processes:int=1, chunksize:int=1)->dict:
+        """
+        Postprocess this group of FTX simulations, and collect the results in an FTXResultStore in the 'results' directory, simulations that fail keep the results stored by a previous postprocess
+
+            Parameters:
+                processes (int): The number of worker processes to use, 'None' uses all available cores, 1 postprocesses the simulations in this process
+                chunksize (int): The number of simulations sent to a worker process at once
+
+            Returns:
+                errors (dict): A dict with the names of the simulations that could not be postprocessed as keys and the error messages as values
+        """
+        n = len(self.simulations)
+        reader = TextReader() # parse statistics of all simulations, including those postprocessed in worker processes
+        if processes == 1:
+            cache = FileCache() # parsed output files, shared by all simulations in this sweep
+            results = (_postprocess_simulation(simulation, cache) for simulation in self.simulations)
+            errors, series = self._collect_postprocess_results(results, n, reader)
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.imap_unordered(_postprocess_simulation, self.simulations, chunksize=chunksize)
+                errors, series = self._collect_postprocess_results(results, n, reader)
+        reader.print_throughput()
+        names = [os.path.basename(simulation.get_path()) for simulation in self.simulations]
+        parameters = [simulation.current_run.inputs.parameters for simulation in self.simulations]
+        FTXResultStore.update(self.get_results_path(), names, parameters, [series.get(name) for name in names]) # keep previous results of simulations that failed this time
+        return errors
+
+    def _collect_postprocess_results(self, results, n:int, reader:TextReader)->tuple:
+        errors = dict()
+        series = dict()
+        for k, (name, error, simulation_series, stats) in enumerate(results):
+            reader.add_stats(stats)
+            if error is not None:
+                print(f"Error postprocessing simulation {name}: {error}")
+                errors[name] = error
+            else:
+                series[name] = simulation_series
+            print(f"Postprocessed {k + 1}/{n} simulations ({len(errors)} failed)")
+        return errors, series
+
+    def get_results_path(self)->str:
+        """Returns the path of the result store of this group of FTX simulations"""
+        return os.path.join(self.work_dir, "results")
+
+    def get_results(self)->FTXResultStore:
+        """Returns the result store of this group of FTX simulations, execute 'postprocess()' first"""
+        return FTXResultStore(self.get_results_path())
+
+    def load(file_name:str, names:list=None):
+        """
+        Load a group of FTX simulations from file
+
+            Parameters:
+                file_name (str): The name of the simulation group file, either an SQLite state store ('.db') or a pickle file ('.pk')
+                names (list): The paths (or unique names) of the simulations to load, 'None' loads all simulations (not supported for pickle files)
+        """
         if not os.path.isfile(file_name):
             print(f"File {file_name} does not exist")
             raise ValueError("FTXPy -> FTXGroup -> load() : File does not exist")
-        return load(file_name)
\ No newline at end of file
+        if file_name.endswith(".pk"): # groups saved before the state store was introduced
+            return load(file_name)
+        store = FTXStateStore(file_name)
+        group = FTXGroup.__new__(FTXGroup)
+        group.__dict__.update(store.load_state())
+        group._partial = names is not None
+        names = store.get_simulation_paths() if names is None else names
+        group.simulations = [store.load_simulation(name) for name in names]
+        return group
+
+# function to record the time limit of a job in the runs it contains, used as telemetry by the walltime model
+def _record_time_limit(simulation:FTXSimulation, batchscript)->None:
+    if "time_limit" in batchscript.slurm_settings:
+        simulation.current_run.batchscript.slurm_settings["time_limit"] = batchscript.slurm_settings["time_limit"]
+
+# function to postprocess a single FTX simulation, errors are returned instead of raised
+def _postprocess_simulation(simulation:FTXSimulation, cache:FileCache=None)->tuple:
+    name = os.path.basename(simulation.get_path())
+    stats = get_text_reader().get_stats()
+    try:
+        output = FTXOutput(simulation, cache=cache)
+        output.restore() # only ingest the runs that were added or changed since the last postprocess
+        output.load_surface()
+        output.load_retention()
+        output.load_content()
+        output.save_series()
+    except Exception as e:
+        return name, f"{type(e).__name__}: {e}", None, _get_stats_since(stats)
+    return name, None, {"surface": output.get_surface(), "retention": output.get_retention(), "content": output.get_content()}, _get_stats_since(stats)
+
+# function to return the parse statistics of the shared text reader since the given statistics
+def _get_stats_since(stats:tuple)->tuple:
+    return tuple(value - previous for value, previous in zip(get_text_reader().get_stats(), stats))
+
+# function to prepare a single FTX simulation for submission, errors are returned instead of raised and leave the simulation as it was
+def _prepare_simulation(simulation:FTXSimulation, action:str, force:bool=False)->tuple:
+    state = _get_prepare_state(simulation)
+    try:
+        if action == "start":
+            simulation.start(force=force)
+        else:
+            getattr(simulation, action)()
+    except Exception as e:
+        _set_prepare_state(simulation, state)
+        return None, f"{type(e).__name__}: {e}"
+    return simulation, None
+
+# function to record the fields of a simulation that 'start' and 'restart' change, i.e. the attributes of the simulation, its current run and the inputs of that run
+def _get_prepare_state(simulation:FTXSimulation)->tuple:
+    run = simulation.current_run
+    parameters = run.inputs.parameters
+    sim_root = parameters["SIM_ROOT"].get_value() if "SIM_ROOT" in parameters else None
+    inputs_state = {key: (val, dict(val) if isinstance(val, dict) else None) for key, val in run.inputs.__dict__.items()} # the items of dicts, e.g. of the parameters if they are not stored in a parameter table
+    return dict(simulation.__dict__), list(simulation.get_runs()), run, dict(run.__dict__), inputs_state, sim_root
+
+# function to roll back a simulation to the state recorded by '_get_prepare_state'
+def _set_prepare_state(simulation:FTXSimulation, state:tuple)->None:
+    simulation_state, runs, run, run_state, inputs_state, sim_root = state
+    simulation.__dict__.clear()
+    simulation.__dict__.update(simulation_state)
+    simulation._runs = runs
+    run.__dict__.clear()
+    run.__dict__.update(run_state)
+    run.inputs.__dict__.clear()
+    for key, (val, items) in inputs_state.items():
+        if items is not None: # restored in place, the dict may be shared with the caller
+            val.clear()
+            val.update(items)
+        run.inputs.__dict__[key] = val
+    parameters = run.inputs.parameters
+    if sim_root is not None and parameters["SIM_ROOT"].get_value() != sim_root: # parameters stored in a parameter table are changed in place
+        parameters["SIM_ROOT"] = FTXParameter(name="SIM_ROOT", value=sim_root)
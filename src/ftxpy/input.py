@@ -1,8 +1,13 @@
 # import statements
+import hashlib
 import os
-import shutil
+import stat
 
 # special imports
+from .parameter import FTXParameter
+from .sourcecache import get_source_cache
+from .staging import check_staging_mode, get_fingerprint_cache, is_shared, stage
+from .template import resolve_parameters
 from .utils import working_directory
 
 # class that represents a collection of FTX input files
@@ -15,12 +20,22 @@ class FTXInput():
     get_input_files_from_source(src):
         Get list of input files from a source directory
     stage_input_files()
-        Stages the input files
+        Stages and compiles the input files
+    get_source_hashes()
+        Returns the hashes of the source templates of the input files
+    get_staging_mode(name)
+        Returns the staging mode for the input file or directory with the given name
+    get_shared_sources()
+        Returns the fingerprints of the source files and directories that are shared between runs
+    check_shared_files()
+        Checks that none of the files shared between runs have been modified
     write_files(dest)
         Writes the contents of the input files to a destination directory
+    get_input_hash(ignore)
+        Returns a hash of the rendered input files
     """
 
-    def __init__(self, parameters:dict, source:str=None):
+    def __init__(self, parameters:dict, source:str=None, staging:dict=None):
         """
         Constructs all the necessary attributes for the FTXInput object
 
@@ -30,11 +45,17 @@ class FTXInput():
                 A dict with parameter names as key and FTX parameters as values
             source : str (keyword argument)
                 A source directory where to load files from
+            staging : dict (keyword argument)
+                A dict with input file or directory names as key and staging modes ('copy', 'hardlink', 'reflink' or 'symlink') as values, the key 'default' sets the mode for all other files and directories
         """
         self.parameters = parameters # dict with parameters
+        self.staging = dict() if staging is None else dict(staging) # dict with file names and staging modes
+        for mode in self.staging.values():
+            check_staging_mode(mode)
         self.input_files = self.get_input_files_from_source(source) # add files from source directory
-        self._files = dict() # dict with file names and file contents
+        self._hashes = dict() # dict with file names and the hashes of their templates in the source cache
         self._dirs = list() # list of directories
+        self._shared = dict() # dict with shared source files and directories and their fingerprints
         self.stage_input_files()
 
     def get_input_files_from_source(self, src:str)->None:
@@ -47,24 +68,69 @@ class FTXInput():
         if not os.path.isdir(src):
             print(f"Source directory {src} does not exist")
             raise ValueError("FTXPy -> FTXInput -> get_input_files_from_source(src) : Source directory does not exist")
-        input_files = list()
-        with working_directory(src):
-            for file in os.listdir():
-                input_files.append(os.path.join(src, file))
-        return input_files
+        return [os.path.join(src, file) for file in get_source_cache().list_source(src)]
 
     def stage_input_files(self)->None:
-        """Stages the input files"""
+        """Stages and compiles the input files"""
         for file in self.input_files:
-            if not os.path.exists(file):
+            try:
+                file_stat = os.stat(file)
+            except FileNotFoundError:
                 print(f"Requested input file {file} does not exist")
                 raise ValueError("FTXPy -> FTXInput -> stage_input_files(src) : Requested input file does not exist")
-            if os.path.isdir(file):
+            if stat.S_ISDIR(file_stat.st_mode):
                 self._dirs.append(file)
             else:
-                with open(file, "r") as f:
-                    file_contents = f.readlines()
-                self._files[os.path.basename(file)] = file_contents
+                self._hashes[os.path.basename(file)] = get_source_cache().add_file(file, file_stat)
+
+    def get_source_hashes(self)->dict:
+        """Returns the hashes of the source templates of the input files, as a dict with file names as keys"""
+        if not hasattr(self, "_hashes"): # inputs saved before the source cache was introduced
+            files = {file_name: "".join(file_contents) for file_name, file_contents in self._files.items()}
+            self._hashes = {file_name: get_source_cache().add_text(text) for file_name, text in files.items()}
+            del self._files
+            if hasattr(self, "_templates"):
+                del self._templates
+        return self._hashes
+
+    def _get_templates(self)->dict:
+        sources = {os.path.basename(file): file for file in self.input_files}
+        return {file_name: get_source_cache().get_template(content_hash, sources.get(file_name)) for file_name, content_hash in self.get_source_hashes().items()}
+
+    def get_staging_mode(self, name:str)->str:
+        """
+        Returns the staging mode for the input file or directory with the given name
+
+            Parameters:
+                name (str): The base name of the input file or directory
+        """
+        staging = getattr(self, "staging", dict()) # inputs saved before staging modes were introduced
+        return staging.get(name, staging.get("default", "copy"))
+
+    def get_shared_sources(self)->dict:
+        """Returns the fingerprints of the source files and directories that are shared between runs, as a dict with source paths as keys"""
+        if not hasattr(self, "_shared"): # inputs saved before shared sources were fingerprinted as a whole
+            self._shared = dict()
+            if hasattr(self, "_fingerprints"):
+                del self._fingerprints
+        return self._shared
+
+    def check_shared_files(self)->None:
+        """
+        Checks that none of the files shared between runs have been modified
+
+        Notes:
+            The shared sources are walked again on every check, and the refreshed fingerprints are stored in the 'FingerprintCache'.
+        """
+        for src, src_fingerprint in self.get_shared_sources().items():
+            if get_fingerprint_cache().get_fingerprint(src, refresh=True) != src_fingerprint:
+                print(f"Shared input {src} has been modified or removed")
+                raise ValueError("FTXPy -> FTXInput -> check_shared_files() : Shared input file has been modified or removed")
+
+    def _stage(self, src:str, mode:str)->None:
+        stage(src, os.path.basename(src), mode)
+        if is_shared(mode):
+            self.get_shared_sources().setdefault(os.path.abspath(src), get_fingerprint_cache().get_fingerprint(src))
 
     def write_files(self, dest:str)->None:
         """
@@ -76,15 +142,50 @@ class FTXInput():
         if not os.path.isdir(dest):
             print(f"Destination directory {dest} does not exist")
             raise ValueError("FTXPy -> FTXInput -> write_files(dest) : Destination directory does not exist")
+        if hasattr(self, "_rendered"): # inputs saved when the rendered parameter values were recorded
+            del self._rendered
+        self.check_shared_files()
+        templates = self._get_templates()
+        references = set().union(*[template.get_references() for template in templates.values()])
+        values = resolve_parameters(self.parameters, references)
+        sources = {os.path.basename(file): os.path.abspath(file) for file in self.input_files} # source paths may be relative to the current directory
         with working_directory(dest):
             for dir_name in self._dirs:
-                shutil.copytree(dir_name, os.path.basename(dir_name), dirs_exist_ok=True)
-            for file_name, file_contents in self._files.items():
-                lines = file_contents.copy()
-                for _ in range(2): # repeat twice to capture self-references in parameters
-                    for param_name, param_value in self.parameters.items():
-                        for line_nb in range(len(lines)):
-                            if "{" + param_name + "}" in lines[line_nb]:
-                                lines[line_nb] = lines[line_nb].replace("{" + param_name + "}", str(param_value.get_value()))
+                self._stage(sources[os.path.basename(dir_name)], self.get_staging_mode(os.path.basename(dir_name)))
+            for file_name, template in templates.items():
+                mode = self.get_staging_mode(file_name)
+                if mode != "copy" and len(template.get_references()) == 0: # files without parameters can be linked
+                    self._stage(sources[file_name], mode)
+                    continue
+                file_values = {ref: values[ref] for ref in template.get_references() if ref in values}
+                if os.path.islink(file_name) or (os.path.isfile(file_name) and os.stat(file_name).st_nlink > 1):
+                    os.remove(file_name) # never write through a link into a shared file
                 with open(file_name, "w") as f:
-                    f.writelines(lines)
\ No newline at end of file
+                    f.write(template.render(file_values))
+
+    def get_input_hash(self, ignore:tuple=("SIM_ROOT", "SIM_NAME"))->str:
+        """
+        Returns a hash of the rendered input files, i.e. of the files written by 'write_files'
+
+            Parameters:
+                ignore (tuple): The names of the parameters that do not change the results, these are rendered as placeholders so that inputs in different work dirs can have the same hash
+
+        Notes:
+            Directories in the source directory are identified by their name, staging mode, source path and fingerprint (see 'FingerprintCache'), so inputs whose directories were modified in place between two processes get another hash.
+        """
+        templates = self._get_templates()
+        parameters = {name: param for name, param in self.parameters.items()}
+        for name in ignore:
+            if name in parameters:
+                parameters[name] = FTXParameter(name=name, value=f"<{name}>")
+        references = set().union(*[template.get_references() for template in templates.values()])
+        values = resolve_parameters(parameters, references)
+        input_hash = hashlib.sha256()
+        for file_name in sorted(templates):
+            template = templates[file_name]
+            text = template.render({ref: values[ref] for ref in template.get_references() if ref in values})
+            input_hash.update(f"file\0{file_name}\0".encode() + text.encode() + b"\0")
+        for dir_name in sorted(self._dirs):
+            name = os.path.basename(dir_name)
+            input_hash.update(f"dir\0{name}\0{self.get_staging_mode(name)}\0{os.path.abspath(dir_name)}\0{get_fingerprint_cache().get_fingerprint(dir_name)}\0".encode())
+        return input_hash.hexdigest()
@@ -0,0 +1,234 @@
+# import statements
+import fcntl
+import itertools
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+# special imports
+from .localjob import write_state
+
+# class that represents a queue of batch jobs that run as local subprocesses
+class LocalQueue():
+    """
+    A class to represent a queue of batch jobs that run as local subprocesses
+
+    Every job (or array task) is run by its own detached wrapper process (see localjob.py),
+    which waits for one of 'max_workers' worker slots and for its own set of CPUs, pins the
+    commands to those CPUs, kills them when they exceed the time limit, and then appends the
+    same 'DUE TO TIME LIMIT' message as Slurm to the output file. Slots and CPUs are lock
+    files in the queue directory, and the wrapper records the state of the job in a state
+    file next to a lock file that it holds while it runs. Jobs therefore keep running, and
+    their state can be queried and cancelled, from any process on the same host, also after
+    the process that submitted them has exited. Queueing jobs start in roughly the order in
+    which they were submitted.
+
+    Methods
+    -------
+    get_max_workers()
+        Returns the maximum number of jobs that run at the same time
+    set_max_workers(max_workers)
+        Sets the maximum number of jobs that run at the same time
+    submit(commands, work_dir, output, time_limit, cpus_per_job, array_task_ids)
+        Submit a job that runs the given commands, returns the job id
+    get_job(job_id, array_task_id)
+        Returns the job info for the given job id (and array task id), or None if the job is not in the queue
+    is_running(job_id, array_task_id)
+        Check if the job with the given job id (and array task id) is currently running
+    is_queueing(job_id, array_task_id)
+        Check if the job with the given job id (and array task id) is currently queueing
+    cancel(job_id, array_task_id)
+        Cancel the job with the given job id (and array task id)
+    invalidate()
+        Does nothing, the local queue is always up to date
+    wait(timeout)
+        Wait until all jobs submitted by this process have completed
+    """
+
+    def __init__(self, max_workers:int=None, queue_dir:str=None):
+        """
+        Constructs all the necessary attributes for the LocalQueue object
+
+        Parameters
+        ----------
+            max_workers : int (keyword argument)
+                The maximum number of jobs that run at the same time, None means one job per available CPU
+            queue_dir : str (keyword argument)
+                The directory with the job and lock files, by default '$FTXPY_LOCAL_QUEUE_DIR' or '~/.ftxpy/local_queue/<hostname>'
+        """
+        self._cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.set_max_workers(max_workers)
+        self.queue_dir = _get_default_queue_dir() if queue_dir is None else queue_dir
+        self._submitted = list() # keys of the jobs submitted by this process
+        self._wrappers = list() # wrapper processes started by this process, polled to reap them
+        self._counter = itertools.count()
+
+    def get_max_workers(self)->int:
+        """Returns the maximum number of jobs that run at the same time"""
+        return self.max_workers
+
+    def set_max_workers(self, max_workers:int)->None:
+        """
+        Sets the maximum number of jobs that run at the same time, for the jobs that are submitted from now on
+
+            Parameters:
+                max_workers (int): The new maximum number of jobs, None means one job per available CPU
+        """
+        if max_workers is not None and max_workers < 1:
+            print(f"Invalid number of workers specified: expected a positive integer, got {max_workers}")
+            raise ValueError("FTXPy -> LocalQueue -> set_max_workers() : Invalid number of workers specified")
+        self.max_workers = len(self._cpus) if max_workers is None else max_workers
+
+    def submit(self, commands:list, work_dir:str, output:str, time_limit:float=None, cpus_per_job:int=1, array_task_ids:list=None, timeout:float=60)->str:
+        """
+        Submit a job that runs the given commands, returns the job id
+
+            Parameters:
+                commands (list): The commands to run, in a single bash shell
+                work_dir (str): The directory in which the commands are run
+                output (str): The name of the output file, '%j' and '%a' are replaced by the job id and the array task id
+                time_limit (float): The time limit in minutes, None means no limit
+                cpus_per_job (int): The number of CPUs the job is pinned to
+                array_task_ids (list): For a job array, the array task ids, every task runs the commands in its own work directory
+                timeout (float): The maximum number of seconds to wait for the wrapper processes to start
+
+        Notes:
+            For job arrays, 'work_dir' is a list with the work directory of each array task.
+        """
+        if cpus_per_job < 1 or cpus_per_job > len(self._cpus):
+            print(f"Invalid number of CPUs per job specified: expected a value between 1 and {len(self._cpus)}, got {cpus_per_job}")
+            raise ValueError("FTXPy -> LocalQueue -> submit() : Invalid number of CPUs per job specified")
+        os.makedirs(self.queue_dir, exist_ok=True)
+        job_id = self._get_new_job_id()
+        tasks = [(None, work_dir)] if array_task_ids is None else list(zip(array_task_ids, work_dir))
+        keys = list()
+        for array_task_id, task_dir in tasks:
+            env = {"SLURM_JOB_ID": job_id}
+            if array_task_id is not None:
+                env.update(SLURM_ARRAY_JOB_ID=job_id, SLURM_ARRAY_TASK_ID=str(array_task_id))
+            job = {"job_id": job_id, "array_task_id": array_task_id, "commands": list(commands), "work_dir": task_dir, "env": env,
+                   "output": os.path.join(task_dir, output.replace("%j", job_id).replace("%a", str(array_task_id))), "time_limit": time_limit,
+                   "cpus_per_job": cpus_per_job, "cpus": self._cpus, "max_workers": self.max_workers, "queue_dir": self.queue_dir, "submit_time": time.time()}
+            prefix = self._get_prefix(job_id, array_task_id)
+            with open(prefix + ".job", "w") as f:
+                json.dump(job, f)
+            self._wrappers.append(subprocess.Popen([sys.executable, "-I", _wrapper_file, prefix + ".job"], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True))
+            keys.append((job_id, array_task_id))
+            self._wait_for_wrapper(prefix, timeout) # wrappers start one by one, so that jobs start in the order in which they were submitted
+        self._submitted.extend(keys)
+        return job_id
+
+    def _get_new_job_id(self)->str:
+        while True:
+            job_id = f"local.{os.getpid()}.{next(self._counter)}"
+            if not any(os.path.exists(self._get_prefix(job_id, None) + ext) for ext in (".job", ".state")) and not os.path.exists(self._get_prefix(job_id, 0) + ".state"): # ids of jobs of an earlier process with the same pid
+                return job_id
+
+    def _get_prefix(self, job_id:str, array_task_id:int)->str:
+        return os.path.join(self.queue_dir, job_id if array_task_id is None else f"{job_id}_{array_task_id}")
+
+    def _wait_for_wrapper(self, prefix:str, timeout:float)->None:
+        start = time.time()
+        while not os.path.exists(prefix + ".state"):
+            if self._wrappers[-1].poll() is not None or time.time() - start > timeout:
+                write_state(prefix + ".state", {"job_state": "FAILED", "end_time": time.time()})
+                print(f"The local job {os.path.basename(prefix)} could not be started")
+                raise ValueError("FTXPy -> LocalQueue -> submit() : The local job could not be started")
+            time.sleep(0.01)
+
+    def _is_alive(self, prefix:str)->bool:
+        try:
+            fd = os.open(prefix + ".lock", os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            return False # nobody holds the lock, the wrapper has exited
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+
+    def _read_state(self, prefix:str)->dict:
+        try:
+            with open(prefix + ".state", "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def get_job(self, job_id:str, array_task_id:int=None)->dict:
+        """Returns the job info for the given job id (and array task id), or None if the job is not in the queue"""
+        self._wrappers = [wrapper for wrapper in self._wrappers if wrapper.poll() is None] # reap wrappers that have exited
+        prefix = self._get_prefix(job_id, array_task_id)
+        info = self._read_state(prefix)
+        if info is None or info["job_state"] not in ("PENDING", "RUNNING") or not self._is_alive(prefix): # a wrapper that was killed leaves its last state behind
+            return None
+        info["run_time"] = 0 if info["start_time"] is None else time.time() - info["start_time"]
+        return info
+
+    def is_running(self, job_id:str, array_task_id:int=None)->bool:
+        """Check if the job with the given job id (and array task id) is currently running"""
+        job = self.get_job(job_id, array_task_id)
+        return job is not None and job["job_state"] == "RUNNING"
+
+    def is_queueing(self, job_id:str, array_task_id:int=None)->bool:
+        """Check if the job with the given job id (and array task id) is currently queueing"""
+        job = self.get_job(job_id, array_task_id)
+        return job is not None and job["job_state"] == "PENDING"
+
+    def cancel(self, job_id:str, array_task_id:int=None)->None:
+        """Cancel the job with the given job id (and array task id), a running job is killed and a pending job is removed from the queue"""
+        job = self.get_job(job_id, array_task_id)
+        if job is not None:
+            try:
+                os.kill(job["pid"], signal.SIGTERM) # handled by the wrapper
+            except ProcessLookupError:
+                pass
+
+    def invalidate(self)->None:
+        """Does nothing, the local queue is always up to date"""
+        pass
+
+    def wait(self, timeout:float=None, poll_interval:float=0.1)->bool:
+        """
+        Wait until all jobs submitted by this process have completed
+
+            Parameters:
+                timeout (float): The maximum number of seconds to wait, None means no limit
+                poll_interval (float): The number of seconds between two checks
+
+            Returns:
+                completed (bool): True if all jobs have completed, False if the timeout expired
+        """
+        start = time.time()
+        while True:
+            self._submitted = [key for key in self._submitted if self.get_job(*key) is not None]
+            if len(self._submitted) == 0:
+                return True
+            if timeout is not None and time.time() - start > timeout:
+                return False
+            time.sleep(poll_interval)
+
+# script that runs a single local job
+_wrapper_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "localjob.py")
+
+# function to return the default directory of the local queue
+def _get_default_queue_dir()->str:
+    return os.environ.get("FTXPY_LOCAL_QUEUE_DIR", os.path.join(os.path.expanduser("~"), ".ftxpy", "local_queue", socket.gethostname()))
+
+# shared queue of local jobs, used by all local batchscripts
+_local_queue = LocalQueue()
+
+# function to return the shared queue of local jobs
+def get_local_queue()->LocalQueue:
+    """Returns the queue of local jobs that is shared by all local batchscripts"""
+    return _local_queue
+
+# function to check if a job id belongs to a local job
+def is_local_job_id(job_id)->bool:
+    """Check if the given job id belongs to a job in the local queue"""
+    return isinstance(job_id, str) and job_id.startswith("local.")
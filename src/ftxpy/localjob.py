@@ -0,0 +1,133 @@
+# script that runs a single local job on behalf of the LocalQueue, it only uses the standard library so that it starts quickly
+#
+#   python localjob.py <job file>
+#
+# The job file is a JSON file written by LocalQueue.submit(). The script holds an exclusive lock on
+# '<job>.lock' for as long as it runs, waits for a worker slot and for CPUs (lock files in the queue
+# directory that are shared by all processes), runs the commands with the job's CPU affinity, kills
+# them when the time limit is exceeded or when the job is cancelled (SIGTERM), and records the state
+# of the job in '<job>.state'. Other processes read the state file, and use the lock to check that
+# the job is still alive.
+
+# import statements
+import fcntl
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+# function to write the state of a job atomically
+def write_state(state_file:str, state:dict)->None:
+    tmp_file = f"{state_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_file, state_file)
+
+# function to try to lock a file without blocking, returns the open file or None
+def try_lock(file_name:str):
+    f = open(file_name, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return f
+    except BlockingIOError:
+        f.close()
+        return None
+
+# function to acquire a worker slot and the CPUs of a job, returns the open lock files and the CPUs, or None
+def acquire(queue_dir:str, max_workers:int, cpus:list, cpus_per_job:int):
+    for k in range(max_workers):
+        worker = try_lock(os.path.join(queue_dir, f"worker_{k}.lock"))
+        if worker is not None:
+            break
+    else:
+        return None
+    locks, job_cpus = [worker], list()
+    for cpu in cpus:
+        cpu_lock = try_lock(os.path.join(queue_dir, f"cpu_{cpu}.lock"))
+        if cpu_lock is not None:
+            locks.append(cpu_lock)
+            job_cpus.append(cpu)
+            if len(job_cpus) == cpus_per_job:
+                return locks, job_cpus
+    for lock in locks:
+        lock.close()
+    return None
+
+# function to kill a process group, first with SIGTERM and then with SIGKILL
+def kill(process, grace_period:float=10)->None:
+    for signum, timeout in ((signal.SIGTERM, grace_period), (signal.SIGKILL, None)):
+        try:
+            os.killpg(process.pid, signum)
+        except ProcessLookupError:
+            pass
+        try:
+            process.wait(timeout=timeout)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+# function to append a slurm-like message to the output of a job
+def write_marker(output:str, job_id:str, reason:str)->None:
+    with open(output, "a") as f:
+        f.write(f"slurmstepd: error: *** JOB {job_id} ON {socket.gethostname()} CANCELLED AT {time.strftime('%Y-%m-%dT%H:%M:%S')}{reason} ***\n")
+
+# function to run a local job
+def main(job_file:str)->None:
+    with open(job_file, "r") as f:
+        job = json.load(f)
+    prefix = job_file[:-len(".job")]
+    alive = open(prefix + ".lock", "a")
+    fcntl.flock(alive, fcntl.LOCK_EX) # held until this process exits
+    cancelled = list()
+    signal.signal(signal.SIGTERM, lambda signum, frame: cancelled.append(signum))
+    state = {"job_id": job["job_id"], "array_task_id": job["array_task_id"], "job_state": "PENDING", "pid": os.getpid(), "work_dir": job["work_dir"], "output": job["output"],
+             "time_limit": job["time_limit"], "cpus_per_job": job["cpus_per_job"], "cpus": None, "submit_time": job["submit_time"], "start_time": None, "end_time": None, "exit_code": None}
+    acquired = acquire(job["queue_dir"], job["max_workers"], job["cpus"], job["cpus_per_job"])
+    if acquired is None:
+        write_state(prefix + ".state", state)
+    while acquired is None and len(cancelled) == 0:
+        time.sleep(0.1)
+        acquired = acquire(job["queue_dir"], job["max_workers"], job["cpus"], job["cpus_per_job"])
+    if len(cancelled) > 0: # cancelled while queueing
+        write_state(prefix + ".state", dict(state, job_state="CANCELLED", end_time=time.time()))
+        for ext in (".job", ".lock"):
+            os.remove(prefix + ext)
+        return
+    _, cpus = acquired
+    state.update(job_state="RUNNING", cpus=cpus, start_time=time.time())
+    write_state(prefix + ".state", state)
+    env = dict(os.environ, **job["env"], SLURM_CPUS_ON_NODE=str(len(cpus)))
+    preexec_fn = (lambda: os.sched_setaffinity(0, cpus)) if hasattr(os, "sched_setaffinity") else None # set in the child before the commands start, so that all their processes inherit it
+    job_state = "FAILED"
+    try:
+        with open(job["output"], "a") as f:
+            process = subprocess.Popen(["bash", "-c", "\n".join(job["commands"])], cwd=job["work_dir"], env=env, stdout=f, stderr=subprocess.STDOUT, start_new_session=True, preexec_fn=preexec_fn)
+        deadline = None if job["time_limit"] is None else state["start_time"] + 60 * job["time_limit"]
+        while process.poll() is None and len(cancelled) == 0 and (deadline is None or time.time() < deadline):
+            try:
+                process.wait(timeout=0.1 if deadline is None else max(0.0, min(0.1, deadline - time.time())))
+            except subprocess.TimeoutExpired:
+                pass
+        if process.poll() is None:
+            kill(process)
+            if len(cancelled) > 0:
+                write_marker(job["output"], job["job_id"], "")
+                job_state = "CANCELLED"
+            else:
+                write_marker(job["output"], job["job_id"], " DUE TO TIME LIMIT")
+                job_state = "TIMEOUT"
+        else:
+            job_state = "COMPLETED" if process.returncode == 0 else "FAILED"
+        state["exit_code"] = process.returncode
+    except OSError as e:
+        with open(job["output"], "a") as f:
+            f.write(f"Error running local job {job['job_id']}: {e}\n")
+    write_state(prefix + ".state", dict(state, job_state=job_state, end_time=time.time()))
+    for ext in (".job", ".lock"): # the state file is kept, an unlocked or missing lock file means the job has ended
+        os.remove(prefix + ext)
+
+if __name__ == "__main__":
+    main(sys.argv[1])
@@ -0,0 +1,94 @@
+# import statements
+import os
+
+# class that represents an incremental scanner for a (growing) log file
+class LogScanner():
+    """
+    A class to represent an incremental scanner for a (growing) log file
+
+    The scanner remembers the byte offset up to which the file has been read
+    and which sentinels have already been found, so that every call to scan()
+    only reads the bytes that were appended since the previous call. When the
+    file is truncated, replaced or removed, the scanner starts over.
+
+    Methods
+    -------
+    scan()
+        Read the bytes that were appended to the log file since the last scan
+    reset()
+        Forget all previously scanned bytes and matches
+    has_match(sentinel)
+        Check if the given sentinel occurs in the log file
+    """
+
+    chunk_size = 1 << 20 # read at most 1 MiB at a time
+
+    def __init__(self, file_name:str, sentinels:list):
+        """
+        Constructs all the necessary attributes for the LogScanner object
+
+        Parameters
+        ----------
+            file_name : str
+                The name of the log file to scan
+            sentinels : list
+                A list of strings to look for in the log file
+        """
+        self.file_name = file_name
+        self.sentinels = list(sentinels)
+        self._overlap = max([len(sentinel.encode()) for sentinel in self.sentinels] + [1]) - 1
+        self.reset()
+
+    def reset(self)->None:
+        """Forget all previously scanned bytes and matches"""
+        self._inode = None # inode of the scanned file, used to detect rotation
+        self._offset = 0 # number of bytes read so far
+        self._tail = b"" # last bytes read, to catch sentinels split across reads
+        self._matches = set() # sentinels found so far
+
+    def scan(self)->None:
+        """Read the bytes that were appended to the log file since the last scan"""
+        try:
+            stat = os.stat(self.file_name)
+        except FileNotFoundError:
+            self.reset()
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset: # file was rotated or truncated
+            self.reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset or len(self._matches) == len(self.sentinels):
+            return
+        with open(self.file_name, "rb") as f:
+            f.seek(self._offset)
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                data = self._tail + chunk
+                for sentinel in self.sentinels:
+                    if sentinel not in self._matches and sentinel.encode() in data:
+                        self._matches.add(sentinel)
+                self._offset += len(chunk)
+                self._tail = data[-self._overlap:] if self._overlap > 0 else b""
+
+    def __getstate__(self)->dict: # the matches are pickled in a fixed order, so that unchanged runs pickle to the same bytes in every process
+        state = self.__dict__.copy()
+        state["_matches"] = sorted(self._matches)
+        return state
+
+    def __setstate__(self, state:dict)->None:
+        self.__dict__.update(state)
+        self._matches = set(self._matches)
+
+    def has_match(self, sentinel:str)->bool:
+        """
+        Check if the given sentinel occurs in the log file
+
+            Parameters:
+                sentinel (str): The string to look for, must be one of the sentinels of this scanner
+        """
+        if sentinel not in self.sentinels:
+            print(f"Sentinel '{sentinel}' is not tracked by the scanner for {self.file_name}")
+            raise ValueError("FTXPy -> LogScanner -> has_match() : Sentinel is not tracked by this scanner")
+        self.scan()
+        return sentinel in self._matches
@@ -0,0 +1,259 @@
+# import statements
+import glob
+import numpy as np
+import os
+
+# special imports
+from .output import FTXOutput
+
+# class that represents a stopping criterion on the relative change of an output series
+class FTXRelativeChange():
+    """
+    A class to represent a stopping criterion on the relative change of an output series
+
+    The criterion is met when the value of the series at the last output time differs
+    by at most 'rtol' (relative) from its value 'window' seconds (simulated time)
+    earlier, and the last output time is at least 'min_time'.
+
+    Methods
+    -------
+    is_met(series)
+        Check if this criterion is met for the given series
+    """
+
+    def __init__(self, name:str="retention", window:float=1.0, rtol:float=1e-3, min_time:float=0.0):
+        """
+        Constructs all the necessary attributes for the FTXRelativeChange object
+
+        Parameters
+        ----------
+            name : str (keyword argument)
+                The name of the series, one of 'surface', 'retention' or 'content'
+            window : float (keyword argument)
+                The length of the window (in simulated seconds)
+            rtol : float (keyword argument)
+                The maximum relative change over the window
+            min_time : float (keyword argument)
+                The criterion is never met before this simulated time
+        """
+        if window <= 0 or rtol < 0:
+            print(f"Invalid stopping criterion specified: expected a positive window and a nonnegative tolerance, got window = {window} and rtol = {rtol}")
+            raise ValueError("FTXPy -> FTXRelativeChange -> __init__() : Invalid stopping criterion specified")
+        self.name = name
+        self.window = window
+        self.rtol = rtol
+        self.min_time = min_time
+
+    def is_met(self, series:dict)->bool:
+        """
+        Check if this criterion is met for the given series
+
+            Parameters:
+                series (dict): A dict with series names as keys and (time, value) tuples as values
+        """
+        if not self.name in series:
+            return False
+        t, x = series[self.name]
+        if len(t) < 2 or t[-1] < self.min_time or t[-1] - t[0] < self.window:
+            return False
+        x_start = np.interp(t[-1] - self.window, t, x)
+        return abs(x[-1] - x_start) <= self.rtol * abs(x[-1])
+
+    def __call__(self, series:dict)->bool:
+        return self.is_met(series)
+
+# class that represents a monitor that stops FTX simulations when their outputs have converged
+class FTXConvergenceMonitor():
+    """
+    A class to represent a monitor that stops FTX simulations when their outputs have converged
+
+    The monitor reads the surface and retention outputs of every run of a simulation
+    incrementally, i.e. only the lines that were appended since the previous check, adds
+    them to the series it keeps for every simulation, and evaluates a stopping criterion
+    on the series. A simulation that meets the criterion
+    is marked as converged, so that it counts as finished and is not restarted, and its
+    job is cancelled as soon as all simulations in that job have converged. The series
+    passed to the criterion are a dict with 'surface', 'retention' and 'content' keys
+    and (time, value) tuples as values, as in FTXOutput, except that the retention is
+    not divided by the He sticking coefficient (a constant factor).
+
+    The read offsets and series live in the monitor object. FTXCampaign keeps one
+    monitor for its whole run; processes that check a group periodically (e.g. from
+    cron) should pickle the monitor between checks, as in examples/convergence_test.py,
+    otherwise every check reads all outputs again.
+
+    Methods
+    -------
+    get_series(simulation)
+        Returns the series of the given simulation, reading only the new output lines
+    check(simulation)
+        Check the stopping criterion for the given simulation, and mark it as converged if it is met
+    check_group(group)
+        Check all running simulations of the given group, and cancel the jobs of converged simulations
+    """
+
+    def __init__(self, criterion=None):
+        """
+        Constructs all the necessary attributes for the FTXConvergenceMonitor object
+
+        Parameters
+        ----------
+            criterion : callable (keyword argument)
+                A function that takes a dict of series and returns True when the simulation has converged, e.g. an FTXRelativeChange, by default a relative change in retention of 0.1% over 1 second
+        """
+        self.criterion = FTXRelativeChange() if criterion is None else criterion
+        self._tails = dict() # dict with file names and output tails
+        self._series = dict() # dict with simulation paths and dicts with series names and merged rows
+
+    def get_series(self, simulation)->dict:
+        """
+        Returns the series of the given simulation, reading only the lines that were appended since the previous call
+
+            Parameters:
+                simulation (FTXSimulation): The simulation
+        """
+        files = {name: [(file, ncols) for pattern, ncols in patterns for run in simulation.get_runs() for file in sorted(glob.glob(os.path.join(run.get_work_dir(), pattern)))] for name, patterns in FTXOutput.series_files.items()}
+        merged = self._series.setdefault(simulation.get_path(), dict())
+        for name, name_files in files.items():
+            for file, ncols in name_files:
+                if not file in self._tails:
+                    self._tails[file] = _OutputTail(file, ncols)
+                rows, reset = self._tails[file].read()
+                if reset and name in merged: # a file was replaced or truncated, read all files of this series again
+                    del merged[name]
+                    for other_file, _ in name_files:
+                        self._tails[other_file].reset()
+                    return self.get_series(simulation)
+                if rows.size > 0:
+                    merged.setdefault(name, _MergedRows()).add(rows, file)
+        arrays = {name: rows.get() for name, rows in merged.items() if rows.get() is not None}
+        series = dict()
+        if "surface" in arrays and arrays["surface"].shape[1] >= 2:
+            surface = arrays["surface"]
+            series["surface"] = (surface[:, 0], surface[:, 1] - surface[0, 1])
+        if "retention" in arrays and arrays["retention"].shape[0] > 1 and arrays["retention"].shape[1] >= 6:
+            retention = arrays["retention"][1:]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                series["retention"] = (retention[:, 0], 100*(retention[:, 2] + retention[:, 5]) / retention[:, 1])
+            series["content"] = (retention[:, 0], retention[:, 2])
+        return series
+
+    def check(self, simulation)->bool:
+        """
+        Check the stopping criterion for the given simulation, and mark it as converged if it is met
+
+            Parameters:
+                simulation (FTXSimulation): The simulation, simulations that have not started or have finished are not checked
+
+            Returns:
+                converged (bool): True if the simulation has converged in this check
+        """
+        if not simulation.has_started() or simulation.has_finished():
+            return False
+        series = self.get_series(simulation)
+        if not self.criterion(series):
+            return False
+        times = [t[-1] for t, _ in series.values() if len(t) > 0]
+        simulation.set_converged(max(times) if len(times) > 0 else None)
+        print(simulation.status())
+        return True
+
+    def check_group(self, group)->list:
+        """
+        Check all running simulations of the given group, and cancel the jobs of converged simulations
+
+            Parameters:
+                group (FTXGroup): The group of simulations
+
+            Returns:
+                converged (list): The paths of the simulations that converged in this check
+        """
+        converged = [simulation.get_path() for simulation in group.simulations if self.check(simulation)]
+        jobs = dict() # dict with (job id, array task id) keys and the simulations in that job as values
+        for simulation in group.simulations:
+            run = simulation.current_run
+            if run.has_started():
+                jobs.setdefault((run._job_id, run.get_array_task_id()), list()).append(simulation)
+        for (job_id, array_task_id), simulations in jobs.items():
+            if all(simulation.is_converged() for simulation in simulations):
+                run = simulations[0].current_run
+                if run.is_running() or run.is_queueing():
+                    print(f"Cancelling job {job_id}" + ("" if array_task_id is None else f"_{array_task_id}") + f", all {len(simulations)} simulation(s) in this job have converged")
+                    run.cancel()
+        return converged
+
+# class that represents the rows of a series read from several output files, sorted by time and without duplicates as in np.unique
+class _MergedRows():
+
+    def __init__(self):
+        self._rows = None # buffer with the rows, grown by doubling its capacity
+        self._n = 0
+        self._skipped = set() # files whose rows have another number of columns
+
+    def get(self)->np.ndarray:
+        return None if self._rows is None else self._rows[:self._n]
+
+    def add(self, rows:np.ndarray, file_name:str)->None:
+        if self._rows is None:
+            self._rows = np.unique(rows, axis=0)
+            self._n = len(self._rows)
+            return
+        if rows.shape[1] != self._rows.shape[1]:
+            if not file_name in self._skipped:
+                print(f"Warning: {file_name} has {rows.shape[1]} columns instead of {self._rows.shape[1]}, its rows are ignored")
+                self._skipped.add(file_name)
+            return
+        if rows[0, 0] > self._rows[self._n - 1, 0] and np.all(np.diff(rows[:, 0]) > 0): # appended rows, the common case
+            if self._n + len(rows) > len(self._rows):
+                buffer = np.empty((max(2 * len(self._rows), self._n + len(rows)), self._rows.shape[1]))
+                buffer[:self._n] = self._rows[:self._n]
+                self._rows = buffer
+            self._rows[self._n:self._n + len(rows)] = rows
+            self._n += len(rows)
+        else: # e.g. the overlapping outputs of a restart
+            self._rows = np.unique(np.vstack((self._rows[:self._n], rows)), axis=0)
+            self._n = len(self._rows)
+
+# class that represents the lines appended to a (growing) output file with a fixed number of columns
+class _OutputTail():
+
+    def __init__(self, file_name:str, ncols:int=None):
+        self.file_name = file_name
+        self._ncols = ncols # number of columns, None means the number of values on the first line
+        self.reset()
+
+    def reset(self)->None:
+        self.ncols = self._ncols
+        self._inode = None
+        self._offset = 0 # number of bytes read so far
+        self._values = np.empty(0) # values read so far that do not fill a complete row
+
+    def read(self)->tuple: # returns the rows appended since the previous call, and True if the file was replaced or truncated since then
+        try:
+            stat = os.stat(self.file_name)
+        except FileNotFoundError:
+            return np.empty((0, 0)), False
+        reset = self._inode is not None and (stat.st_ino != self._inode or stat.st_size < self._offset)
+        if reset or self._inode is None:
+            self.reset()
+            self._inode = stat.st_ino
+        if stat.st_size <= self._offset:
+            return np.empty((0, 0)), reset
+        with open(self.file_name, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        end = data.rfind(b"\n") + 1 # only complete lines, the last line may still be written
+        self._offset += end
+        return self._parse(data[:end]), reset
+
+    def _parse(self, text:bytes)->np.ndarray:
+        lines = [line.split(b"#")[0] for line in text.split(b"\n")]
+        lines = [line for line in lines if len(line.strip()) > 0]
+        if len(lines) == 0:
+            return np.empty((0, 0))
+        if self.ncols is None:
+            self.ncols = len(lines[0].split())
+        values = np.concatenate((self._values, np.array(b" ".join(lines).split(), dtype=float)))
+        n = len(values) - len(values) % self.ncols
+        self._values = values[n:]
+        return values[:n].reshape(-1, self.ncols)
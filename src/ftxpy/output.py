@@ -7,42 +7,184 @@ import shutil
 
 # special imports
 from .simulation import FTXSimulation
+from .filecache import FileCache
+from .textreader import read_columns, read_complete_columns
 from .utils import save, load
 
+# function to merge rows into a series, sorted by time and without duplicates as in np.unique
+def _merge_rows(series:np.ndarray, rows:np.ndarray)->np.ndarray:
+    if series is None:
+        return np.unique(rows, axis=0)
+    if rows.shape[1] == series.shape[1] and rows[0, 0] > series[-1, 0] and np.all(np.diff(rows[:, 0]) > 0): # appended rows, the common case
+        return np.concatenate((series, rows))
+    return np.unique(np.vstack((series, rows)), axis=0)
+
+# function to parse a tridyn.dat file into the He sticking coefficient
+def _parse_sticking_coeff(file_name:str)->float:
+    with open(file_name, "r") as f:
+        for line in f:
+            if line.startswith("He"):
+                return float(line.split()[-1])
+
 class FTXOutput():
 
-    def __init__(self, ftx_simulation:FTXSimulation):
+    # output files of a run that make up each series, as (glob pattern relative to the run directory, reshape to this number of columns) tuples
+    series_files = {
+        "surface": [(os.path.join("work", "workers__xolotlWorker_*", "surface.txt"), 2), (os.path.join("work", "driver__xolotlFtridynDriver_*", "allSurface.txt"), None)],
+        "retention": [(os.path.join("work", "workers__xolotlWorker_*", "retentionOut.txt"), None), (os.path.join("work", "driver__xolotlFtridynDriver_*", "allRetentionOut.txt"), None)],
+    }
+
+    # name of the binary file with the parsed series, stored in every run directory
+    sidecar_file = "ftxpy_output.npz"
+
+    # name of the binary file with the merged series of all ingested runs, stored in the directory of the simulation
+    merged_file = "ftxpy_merged_output.npz"
+
+    def __init__(self, ftx_simulation:FTXSimulation, cache:FileCache=None):
         self.ftx_simulation = ftx_simulation
         self.surface = None
         self.retention = None
         self.content = None
+        self._cache = FileCache() if cache is None else cache # parsed output files, shared by all loaders
+        self._series = dict() # dict with series names and merged series of all ingested runs
+        self._base = dict() # dict with series names and merged series of all ingested runs but the last one, None if unknown
+        self._ingested = dict() # dict with work dirs and signatures of the ingested runs, in the order they were ingested
 
-    def load_surface(self):
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_cache", None) # do not save parsed output files
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache = FileCache()
+        self._series = state.get("_series", dict()) # outputs saved before incremental ingestion was introduced
+        self._base = state.get("_base", None)
+        self._ingested = state.get("_ingested", dict())
+
+    def _get_files(self, *pattern)->list:
         runs = self.ftx_simulation.get_runs()
-        surface_files = [file for file_list in [glob.glob(os.path.join(run.get_work_dir(), "work", "workers__xolotlWorker_*", "surface.txt")) for run in runs] for file in file_list]
-        surfaces = [np.loadtxt(surface_file).reshape(-1, 2) for surface_file in surface_files if os.path.isfile(surface_file) and os.path.getsize(surface_file)]
-        allSurface_files = [file for file_list in [glob.glob(os.path.join(run.get_work_dir(), "work", "driver__xolotlFtridynDriver_*", "allSurface.txt")) for run in runs] for file in file_list]
-        allSurfaces = [np.loadtxt(allSurface_file) for allSurface_file in allSurface_files if os.path.isfile(allSurface_file) and os.path.getsize(allSurface_file)]
-        surface = np.unique(np.vstack(surfaces + allSurfaces), axis=0)
+        return [file for run in runs for file in glob.glob(os.path.join(run.get_work_dir(), *pattern))]
+
+    def _get_run_signature(self, run)->tuple:
+        signature = list()
+        for patterns in self.series_files.values():
+            for pattern, _ in patterns:
+                for file in sorted(glob.glob(os.path.join(run.get_work_dir(), pattern))):
+                    stat = os.stat(file)
+                    signature.append((file, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _parse_run(self, run, complete:bool=False)->dict:
+        series = dict()
+        parser = read_complete_columns if complete else read_columns # a last line without a newline may still be written
+        for name, patterns in self.series_files.items():
+            arrays = list()
+            for pattern, ncols in patterns:
+                for file in sorted(glob.glob(os.path.join(run.get_work_dir(), pattern))):
+                    array = self._cache.load(file, parser)
+                    if array.size > 0:
+                        arrays.append(array.reshape(-1, ncols) if ncols else array)
+            series[name] = np.vstack(arrays) if len(arrays) > 0 else np.empty((0, 0))
+        return series
+
+    def _load_run(self, run, signature:tuple)->dict:
+        sidecar = os.path.join(run.get_work_dir(), self.sidecar_file)
+        complete = run.has_finished()
+        if os.path.isfile(sidecar):
+            with np.load(sidecar) as data:
+                sidecar_signature = tuple(zip(data["files"].tolist(), *[data["stats"][:, k].tolist() for k in range(2)]))
+                sidecar_complete = bool(data["complete"]) if "complete" in data.files else False # sidecars saved before complete files were distinguished
+                if sidecar_signature == signature and (sidecar_complete or not complete):
+                    return {name: data[name] for name in self.series_files}
+        series = self._parse_run(run, complete)
+        files = np.array([file for file, _, _ in signature], dtype=str)
+        stats = np.array([(mtime, size) for _, mtime, size in signature], dtype=np.int64).reshape(-1, 2)
+        np.savez(sidecar, files=files, stats=stats, complete=np.array(complete), **series)
+        return series
+
+    def ingest(self)->None:
+        """
+        Parse the outputs of all runs that were added or changed since the last call, and merge them into the series
+
+        New runs are appended to the merged series. Only the last ingested run can still change
+        (it may have been running), its rows are replaced by merging it again into the series of
+        the runs before it. If any other run changed or was deleted, all runs are merged again.
+        """
+        runs = self.ftx_simulation.get_runs()
+        signatures = {run.get_work_dir(): self._get_run_signature(run) for run in runs}
+        ingested = list(self._ingested)
+        changed = [work_dir for work_dir in ingested if signatures.get(work_dir) != self._ingested[work_dir]]
+        if changed == ingested[-1:] and len(changed) > 0 and self._base is not None and changed[0] in signatures: # only the last run changed
+            self._series = dict(self._base)
+            del self._ingested[changed[0]]
+        elif len(changed) > 0: # a run before the last one changed or was deleted
+            self._series = dict()
+            self._base = dict()
+            self._ingested = dict()
+        for run in runs:
+            work_dir = run.get_work_dir()
+            if work_dir in self._ingested:
+                continue
+            self._base = dict(self._series)
+            for name, array in self._load_run(run, signatures[work_dir]).items():
+                if array.size > 0:
+                    self._series[name] = _merge_rows(self._series.get(name), array)
+            self._ingested[work_dir] = signatures[work_dir]
+
+    def save_series(self)->None:
+        """Save the merged series of the ingested runs in the directory of this simulation, so that 'restore' only needs to ingest the runs that were added or changed"""
+        file_name = os.path.join(self.ftx_simulation.get_path(), self.merged_file)
+        signatures = [(k, file, mtime, size) for k, signature in enumerate(self._ingested.values()) for file, mtime, size in signature]
+        arrays = {"work_dirs": np.array(list(self._ingested), dtype=str),
+                  "runs": np.array([k for k, _, _, _ in signatures], dtype=np.int64),
+                  "files": np.array([file for _, file, _, _ in signatures], dtype=str),
+                  "stats": np.array([(mtime, size) for _, _, mtime, size in signatures], dtype=np.int64).reshape(-1, 2)}
+        arrays.update({f"series_{name}": array for name, array in self._series.items()})
+        arrays.update({f"base_{name}": array for name, array in ({} if self._base is None else self._base).items()})
+        arrays["has_base"] = np.array(self._base is not None)
+        tmp_file = file_name + ".tmp.npz"
+        np.savez(tmp_file, **arrays)
+        os.replace(tmp_file, file_name) # a concurrent 'restore' never sees a partially written file
+
+    def restore(self)->None:
+        """Restore the ingested series from the previously saved series of this simulation, if any"""
+        file_name = os.path.join(self.ftx_simulation.get_path(), self.merged_file)
+        if os.path.isfile(file_name):
+            with np.load(file_name) as data:
+                work_dirs = data["work_dirs"].tolist()
+                signatures = [list() for _ in work_dirs]
+                for k, file, (mtime, size) in zip(data["runs"].tolist(), data["files"].tolist(), data["stats"].tolist()):
+                    signatures[k].append((file, mtime, size))
+                self._ingested = {work_dir: tuple(signature) for work_dir, signature in zip(work_dirs, signatures)}
+                self._series = {key[len("series_"):]: data[key] for key in data.files if key.startswith("series_")}
+                self._base = {key[len("base_"):]: data[key] for key in data.files if key.startswith("base_")} if bool(data["has_base"]) else None
+            return
+        file_name = os.path.join(self.ftx_simulation.get_path(), "output.pk")
+        if os.path.isfile(file_name): # outputs saved before the merged series were saved separately
+            previous = load(file_name)
+            self._series = previous._series
+            self._base = None
+            self._ingested = previous._ingested
+
+    def _get_series(self, name:str):
+        self.ingest()
+        if not name in self._series:
+            print(f"No {name} output files found")
+            raise ValueError(f"FTXPy -> FTXOutput -> _get_series() : No {name} output files found")
+        return self._series[name]
+
+    def load_surface(self):
+        surface = self._get_series("surface").copy()
         surface[:, 1] -= surface[0, 1] # subtract baseline
         self.surface = (surface[:, 0], surface[:, 1])
 
     def load_retention(self):
-        runs = self.ftx_simulation.get_runs()
-        retentionOut_files = [file for file_list in [glob.glob(os.path.join(run.get_work_dir(), "work", "workers__xolotlWorker_*", "retentionOut.txt")) for run in runs] for file in file_list]
-        retentionOuts = [np.loadtxt(retentionOut_file) for retentionOut_file in retentionOut_files if os.path.isfile(retentionOut_file) and os.path.getsize(retentionOut_file)]
-        allRetentionOut_files = [file for file_list in [glob.glob(os.path.join(run.get_work_dir(), "work", "driver__xolotlFtridynDriver_*", "allRetentionOut.txt")) for run in runs] for file in file_list]
-        allRetentionOuts = [np.loadtxt(allRetentionOut_file) for allRetentionOut_file in allRetentionOut_files if os.path.isfile(allRetentionOut_file) and os.path.getsize(allRetentionOut_file)]
-        retention = np.unique(np.vstack(retentionOuts + allRetentionOuts), axis=0)
+        retention = self._get_series("retention")
         self.retention = (retention[1:, 0], 100*(retention[1:, 2] + retention[1:, 5]) / (retention[1:, 1] * self.get_sticking_coeff())) # 100*(He content + He bulk ) / (fluence * He sticking coeff)
 
     def load_content(self):
-        runs = self.ftx_simulation.get_runs()
-        retentionOut_files = [file for file_list in [glob.glob(os.path.join(run.get_work_dir(), "work", "workers__xolotlWorker_*", "retentionOut.txt")) for run in runs] for file in file_list]
-        retentionOuts = [np.loadtxt(retentionOut_file) for retentionOut_file in retentionOut_files if os.path.isfile(retentionOut_file) and os.path.getsize(retentionOut_file)]
-        allRetentionOut_files = [file for file_list in [glob.glob(os.path.join(run.get_work_dir(), "work", "driver__xolotlFtridynDriver_*", "allRetentionOut.txt")) for run in runs] for file in file_list]
-        allRetentionOuts = [np.loadtxt(allRetentionOut_file) for allRetentionOut_file in allRetentionOut_files if os.path.isfile(allRetentionOut_file) and os.path.getsize(allRetentionOut_file)]
-        retention = np.unique(np.vstack(retentionOuts + allRetentionOuts), axis=0)
+        retention = self._get_series("retention")
         self.content = (retention[1:, 0], retention[1:, 2])
 
     def get_surface(self):
@@ -67,18 +209,11 @@ class FTXOutput():
         return self.content
 
     def get_sticking_coeff(self):
-        runs = self.ftx_simulation.get_runs()
-        tridyn_dat_files = [file for file_list in [glob.glob(os.path.join(run.get_work_dir(), "work", "workers__xolotlWorker_*", "tridyn.dat")) for run in runs] for file in file_list]
-        tridyn_exists = [os.path.isfile(tridyn_dat_file) for tridyn_dat_file in tridyn_dat_files]
-        tridyn_ics = [i for i, tridyn_exist in enumerate(tridyn_exists) if tridyn_exist]
-        if len(tridyn_ics) == 0:
+        tridyn_dat_files = [file for file in self._get_files("work", "workers__xolotlWorker_*", "tridyn.dat") if os.path.isfile(file)]
+        if len(tridyn_dat_files) == 0:
             print(f"No tridyn.dat file(s) found!")
             raise ValueError("FTXPy -> FTXOutput -> get_sticking_coeff() : No tridyn.dat file(s) found!")
-        with open(tridyn_dat_files[tridyn_ics[-1]], "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                if line.startswith("He"):
-                    return float(line.split()[-1])
+        return self._cache.load(tridyn_dat_files[-1], _parse_sticking_coeff)
 
     def plot_surface(self, t_end=None, figsize=(8, 5), kwargs={"linewidth": .75}, ax=None)->None:
         """Plot surface growth"""
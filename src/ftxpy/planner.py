@@ -0,0 +1,102 @@
+# import statements
+import math
+
+# class that represents a planner that packs FTX simulations into Slurm jobs
+class FTXJobPlanner():
+    """
+    A class to represent a planner that packs FTX simulations into Slurm jobs
+
+    The simulations are split over as few jobs as possible, such that no job
+    requests more than the maximum number of nodes (the partition limit, the QOS
+    limit, or a smaller target size that fits in the backfill windows of the
+    scheduler). Simulations are distributed longest-processing-time first, so
+    that all jobs have about the same size.
+
+    Methods
+    -------
+    get_nodes(simulation)
+        Returns the number of nodes needed by the given simulation
+    get_max_nodes_per_job()
+        Returns the maximum number of nodes of a single job
+    plan(simulations)
+        Returns a list of jobs, where every job is a list of simulations
+    """
+
+    def __init__(self, max_nodes:int=None, max_jobs:int=None, backfill_nodes:int=None):
+        """
+        Constructs all the necessary attributes for the FTXJobPlanner object
+
+        Parameters
+        ----------
+            max_nodes : int (keyword argument)
+                The maximum number of nodes of a single job (partition or QOS limit), None means no limit
+            max_jobs : int (keyword argument)
+                The maximum number of jobs that can be submitted at once (QOS limit), None means no limit
+            backfill_nodes : int (keyword argument)
+                The preferred maximum number of nodes of a single job, small enough to be scheduled in backfill windows, None means no preference
+        """
+        for name, value in (("max_nodes", max_nodes), ("max_jobs", max_jobs), ("backfill_nodes", backfill_nodes)):
+            if value is not None and value < 1:
+                print(f"Invalid value for {name}: expected a positive integer, got {value}")
+                raise ValueError("FTXPy -> FTXJobPlanner -> __init__() : Invalid value specified")
+        self.max_nodes = max_nodes
+        self.max_jobs = max_jobs
+        self.backfill_nodes = backfill_nodes
+
+    def get_nodes(self, simulation)->int:
+        """
+        Returns the number of nodes needed by the given simulation
+
+        Xolotl runs on NPROC processors and F-Tridyn on FTMPI_PPN processors, both
+        with task_ppn processors per node. They run one after the other on the same
+        nodes, so a simulation needs ceil(max(NPROC, FTMPI_PPN) / task_ppn) nodes.
+        """
+        parameters = simulation.current_run.inputs.parameters
+        nproc = parameters["NPROC"].get_value()
+        task_ppn = parameters["task_ppn"].get_value()
+        ftmpi_ppn = parameters["FTMPI_PPN"].get_value()
+        if nproc < 1 or task_ppn < 1 or ftmpi_ppn < 1:
+            print(f"Invalid parallel processing parameters: NPROC = {nproc}, task_ppn = {task_ppn}, FTMPI_PPN = {ftmpi_ppn}")
+            raise ValueError("FTXPy -> FTXJobPlanner -> get_nodes() : Invalid parallel processing parameters")
+        return max(1, math.ceil(max(nproc, ftmpi_ppn) / task_ppn))
+
+    def get_max_nodes_per_job(self)->int:
+        """Returns the maximum number of nodes of a single job, or None if there is no limit"""
+        limits = [limit for limit in (self.max_nodes, self.backfill_nodes) if limit is not None]
+        return min(limits) if len(limits) > 0 else None
+
+    def plan(self, simulations:list)->list:
+        """
+        Returns a list of jobs, where every job is a list of simulations
+
+            Parameters:
+                simulations (list): The simulations to submit
+        """
+        if len(simulations) == 0:
+            return list()
+        nodes = [self.get_nodes(simulation) for simulation in simulations]
+        total_nodes = sum(nodes)
+        capacity = self.get_max_nodes_per_job()
+        if capacity is None:
+            return [list(simulations)]
+        if self.max_jobs is not None and math.ceil(total_nodes / capacity) > self.max_jobs: # grow jobs beyond the backfill size to respect the job limit
+            capacity = max(capacity, math.ceil(total_nodes / self.max_jobs))
+            capacity = capacity if self.max_nodes is None else min(capacity, self.max_nodes)
+        if max(nodes) > capacity:
+            print(f"A simulation needs {max(nodes)} nodes, but a job can have at most {capacity} nodes")
+            raise ValueError("FTXPy -> FTXJobPlanner -> plan() : A simulation needs more nodes than a job can have")
+        n_jobs = math.ceil(total_nodes / capacity)
+        jobs = [list() for _ in range(n_jobs)]
+        loads = [0] * n_jobs
+        for k in sorted(range(len(simulations)), key=lambda k: -nodes[k]): # largest simulations first
+            j = min(range(len(jobs)), key=lambda j: loads[j]) # least loaded job
+            if loads[j] + nodes[k] > capacity:
+                jobs.append(list())
+                loads.append(0)
+                j = len(jobs) - 1
+            jobs[j].append(simulations[k])
+            loads[j] += nodes[k]
+        if self.max_jobs is not None and len(jobs) > self.max_jobs:
+            print(f"The simulations need {len(jobs)} jobs, but at most {self.max_jobs} jobs can be submitted")
+            raise ValueError("FTXPy -> FTXJobPlanner -> plan() : Too many jobs needed")
+        return [job for job in jobs if len(job) > 0]
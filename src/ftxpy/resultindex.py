@@ -0,0 +1,187 @@
+# import statements
+import hashlib
+import os
+import pickle as pk
+import platform
+import sqlite3
+import time
+
+# special imports
+from contextlib import contextmanager
+from .sourcecache import get_source_cache
+
+# class that represents an index of finished FTX simulations, keyed by their rendered inputs
+class FTXResultIndex():
+    """
+    A class to represent an SQLite index of finished FTX simulations, keyed by their rendered inputs
+
+    The key of a simulation is the hash of the rendered input files of its first run
+    (see 'FTXInput.get_input_hash') together with a version string that identifies
+    the code and the platform. A simulation that starts with the same key as a
+    finished simulation in the index can reuse its runs instead of being submitted.
+    Entries whose run directories have been removed (e.g. by a scratch purge) are
+    dropped when they are looked up. The source templates of the runs are stored with
+    every entry and are added to the source cache when the entry is found, so that
+    reused runs can be rendered and saved in any process.
+
+    Methods
+    -------
+    get_key(inputs)
+        Returns the key of the given FTX inputs
+    add(simulation)
+        Add a finished FTX simulation to this index
+    find(inputs)
+        Returns the runs of a finished simulation with the same key as the given FTX inputs
+    remove(key)
+        Remove the entry with the given key from this index
+    get_size()
+        Returns the number of entries in this index
+    """
+
+    def __init__(self, file_name:str, version:str, timeout:float=60):
+        """
+        Constructs all the necessary attributes for the FTXResultIndex object
+
+        Parameters
+        ----------
+            file_name : str
+                The name of the database file
+            version : str
+                A string that identifies the version of the code and the platform, e.g. the Xolotl and F-TRIDYN builds (see 'get_code_version')
+            timeout : float (keyword argument)
+                The number of seconds to wait for a concurrent writer to finish
+        """
+        self.file_name = file_name
+        if not version:
+            print(f"Invalid version '{version}' for the result index {file_name}")
+            raise ValueError("FTXPy -> FTXResultIndex -> __init__() : Invalid version specified")
+        self.version = version
+        self.timeout = timeout
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, path TEXT, created REAL, runs BLOB, templates BLOB)")
+            if not "templates" in [column[1] for column in connection.execute("PRAGMA table_info(results)")]: # indices created before templates were stored
+                connection.execute("ALTER TABLE results ADD COLUMN templates BLOB")
+
+    @contextmanager
+    def _connection(self):
+        connection = sqlite3.connect(self.file_name, timeout=self.timeout)
+        try:
+            with connection: # commits on success, rolls back on error
+                yield connection
+        finally:
+            connection.close()
+
+    def get_key(self, inputs)->str:
+        """
+        Returns the key of the given FTX inputs
+
+            Parameters:
+                inputs (FTXInput): The inputs of the first run of a simulation
+        """
+        return hashlib.sha256(f"{self.version}\0{inputs.get_input_hash()}".encode()).hexdigest()
+
+    def add(self, simulation)->bool:
+        """
+        Add a finished FTX simulation to this index, returns True if a new entry was added
+
+            Parameters:
+                simulation (FTXSimulation): The simulation to add, simulations that did not finish, stopped early because they converged or reused the runs of another simulation are ignored
+        """
+        if len(simulation.get_runs()) == 0 or simulation.is_reused() or simulation.is_converged() or not simulation.has_finished():
+            return False
+        key = self.get_key(simulation.get_runs()[0].inputs)
+        hashes = set().union(*[run.inputs.get_source_hashes().values() for run in simulation.get_runs()])
+        templates = {content_hash: get_source_cache().get_text(content_hash) for content_hash in hashes}
+        with self._connection() as connection:
+            cursor = connection.execute("INSERT OR IGNORE INTO results (key, path, created, runs, templates) VALUES (?, ?, ?, ?, ?)", (key, simulation.get_path(), time.time(), pk.dumps(simulation.get_runs()), pk.dumps(templates)))
+        return cursor.rowcount > 0
+
+    def find(self, inputs)->tuple:
+        """
+        Returns the runs of a finished simulation with the same key as the given FTX inputs
+
+            Parameters:
+                inputs (FTXInput): The inputs of the first run of a simulation
+
+            Returns:
+                path, runs (tuple): The path of the finished simulation and its runs, or None if there is no such simulation
+        """
+        key = self.get_key(inputs)
+        with self._connection() as connection:
+            row = connection.execute("SELECT path, runs, templates FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        path, runs = row[0], pk.loads(row[1])
+        if row[2] is not None:
+            cache = get_source_cache()
+            for content_hash, text in pk.loads(row[2]).items():
+                if not content_hash in cache:
+                    cache.add_text(text, content_hash)
+        elif not _has_templates(runs): # entries added before templates were stored, whose source files have changed
+            print(f"Removing the finished simulation {path} from the result index, its source templates are no longer available")
+            self.remove(key)
+            return None
+        if not all(os.path.isdir(run.get_work_dir()) for run in runs) or not runs[-1].has_finished(): # the outputs have been removed
+            print(f"Removing the finished simulation {path} from the result index, its outputs no longer exist")
+            self.remove(key)
+            return None
+        return path, runs
+
+    def remove(self, key:str)->None:
+        """Remove the entry with the given key from this index"""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def get_size(self)->int:
+        """Returns the number of entries in this index"""
+        with self._connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+# function to return a version string that identifies the code and the platform
+def get_code_version(commands:list, executables:list=None, platform_name:str=None)->str:
+    """
+    Returns a version string that identifies the code and the platform, for use in an FTXResultIndex
+
+    The version consists of the ftxpy version, the platform name and a hash of the batch
+    commands (which load the modules and run the codes) and of the paths, sizes and
+    modification times of the given executables, so that rebuilding an executable or
+    loading other modules gives another version.
+
+        Parameters:
+            commands (list): The commands of the batchscript, e.g. config["batchscript"]["commands"]
+            executables (list): The files of the executables, e.g. the Xolotl and F-TRIDYN binaries
+            platform_name (str): The name of the platform, by default $NERSC_HOST or the operating system and machine type
+    """
+    if platform_name is None:
+        platform_name = os.environ.get("NERSC_HOST", f"{platform.system()}-{platform.machine()}".lower())
+    code_hash = hashlib.sha256()
+    for command in commands:
+        code_hash.update(f"command\0{command}\0".encode())
+    for executable in ([] if executables is None else executables):
+        if not os.path.isfile(executable):
+            print(f"Executable {executable} does not exist")
+            raise ValueError("FTXPy -> get_code_version() : Executable does not exist")
+        file_stat = os.stat(executable)
+        code_hash.update(f"executable\0{os.path.abspath(executable)}\0{file_stat.st_size}\0{file_stat.st_mtime_ns}\0".encode())
+    return f"ftxpy-{_get_ftxpy_version()}-{platform_name}-{code_hash.hexdigest()[:16]}"
+
+# function to return the version of the installed ftxpy package
+def _get_ftxpy_version()->str:
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError: # Python 3.7
+        return "unknown"
+    try:
+        return version("ftxpy")
+    except PackageNotFoundError: # running from a source checkout
+        return "unknown"
+
+# function to check if the source templates of the given runs are available
+def _has_templates(runs:list)->bool:
+    try:
+        for run in runs:
+            run.inputs._get_templates() # adds the templates to the source cache when the source files are unchanged
+    except ValueError:
+        return False
+    return True
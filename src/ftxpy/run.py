@@ -1,13 +1,15 @@
 import os
-import pyslurm
 import shlex
 import subprocess
 
 # special imports
 from .batchscript import Batchscript
+from .local import get_local_queue, is_local_job_id
 from .input import FTXInput
+from .logscanner import LogScanner
 from .parameter import FTXParameter
-from .utils import working_directory, occursin_file
+from .scheduler import get_slurm_queue
+from .utils import working_directory
 
 # class that represents an FTX run
 class FTXRun():
@@ -30,6 +32,12 @@ class FTXRun():
         Check if this FTX run is currently running
     is_queueing()
         Check if this FTX run is currently queueing
+    cancel()
+        Cancel the job of this FTX run
+    get_array_task_id()
+        Returns the array task id of this FTX run, if it is part of a job array
+    get_start_time()
+        Returns the time at which the job of this FTX run was first seen running
     has_started
         Check if this FTX run has started
     has_finished
@@ -39,6 +47,9 @@ class FTXRun():
     has_failed
         Check if this FTX run has failed because of another error
     """
+
+    # sentinels looked for in the log files of a run, every log file is scanned for all of them in a single pass
+    log_sentinels = ("FT-X driver:finalize called", "ERROR", "DUE TO TIME LIMIT")
     
     def __init__(self, work_dir:str, inputs:FTXInput, batchscript:Batchscript):
         """
@@ -57,6 +68,8 @@ class FTXRun():
         self.inputs = inputs
         self.batchscript = batchscript
         self._job_id = None
+        self._array_task_id = None # set when this run is a task of a slurm job array
+        self._log_scanners = dict() # dict with file names and log scanners
         self.change_work_dir(self.work_dir) # also update SIM_ROOT in IPS config file!
 
     def get_work_dir(self)->str:
@@ -88,58 +101,87 @@ class FTXRun():
             os.system("chmod u+x " + clean_sh)
             os.system("./" + clean_sh)
 
+    def get_log_file_name(self)->str:
+        """Returns the name of the log.ftx file of this run"""
+        log_ftx = os.path.join(self.work_dir, "log.ftx")
+        if not os.path.isfile(log_ftx):
+            print(f"File {log_ftx} does not exist")
+            raise ValueError("FTXPy -> FTXRun -> get_log_file_name() : File does not exist")
+        return log_ftx
+
     def get_log_file(self):
         """Returns the content of the log.ftx file of this run"""
-        with working_directory(self.work_dir):
-            log_ftx = "log.ftx"
-            if not os.path.isfile(log_ftx):
-                print(f"File {log_ftx} does not exist")
-                raise ValueError("FTXPy -> FTXRun -> get_log_file() : File does not exist")
-            with open(log_ftx, "r") as f:
-                return f.readlines()
+        with open(self.get_log_file_name(), "r") as f:
+            return f.readlines()
 
     def start(self)->None:
         """Start this FTX run"""
         with working_directory(self.work_dir):
             self._job_id = self.batchscript.submit()
+        self._start_time = None
 
     def is_running(self)->bool:
-        """Check if this FTX run is currently running"""
-        jobs = pyslurm.job().get()
-        return self._job_id in jobs and jobs[self._job_id]["run_time"] > 0
+        """Check if this FTX run is currently running, the start time of its job is recorded the first time it is"""
+        queue = self._get_queue()
+        running = queue.is_running(self._job_id, self.get_array_task_id())
+        if running and self.get_start_time() is None:
+            job = queue.get_job(self._job_id, self.get_array_task_id())
+            if job is not None and job.get("start_time"):
+                self._start_time = float(job["start_time"])
+        return running
+
+    def get_start_time(self)->float:
+        """Returns the time (in seconds since the epoch) at which the job of this FTX run started, or None if it was never seen running"""
+        return getattr(self, "_start_time", None) # runs saved before start times were recorded
 
     def is_queueing(self)->bool:
         """Check if this FTX run is currently queueing"""
-        jobs = pyslurm.job().get()
-        return self._job_id in jobs and jobs[self._job_id]["run_time"] == 0
+        return self._get_queue().is_queueing(self._job_id, self.get_array_task_id())
+
+    def cancel(self)->None:
+        """Cancel the job of this FTX run, only this array task is cancelled if the run is part of a job array"""
+        if self.has_started():
+            self._get_queue().cancel(self._job_id, self.get_array_task_id())
+
+    def _get_queue(self):
+        return get_local_queue() if is_local_job_id(self._job_id) else get_slurm_queue()
+
+    def get_array_task_id(self)->int:
+        """Returns the array task id of this FTX run, or None if this run is not part of a job array"""
+        return getattr(self, "_array_task_id", None) # runs saved before job arrays were introduced
 
     def has_started(self)->bool:
         """Check if this FTX run has started"""
         return self._job_id is not None
 
+    def _has_match(self, file_name:str, sentinel:str)->bool:
+        if not hasattr(self, "_log_scanners"): # runs saved before log scanners were introduced
+            self._log_scanners = dict()
+        scanner = self._log_scanners.get(file_name)
+        if scanner is None or scanner.sentinels != list(self.log_sentinels): # scanners saved with a single sentinel are replaced
+            scanner = self._log_scanners[file_name] = LogScanner(file_name, self.log_sentinels)
+        return scanner.has_match(sentinel)
+
     def has_finished(self)->bool:
         """Check if this FTX run has finished"""
-        with working_directory(self.work_dir):
-            log_ftx_file = "log.ftx"
-            if not os.path.isfile(log_ftx_file):
-                return False
-            return occursin_file("FT-X driver:finalize called", log_ftx_file)
+        log_ftx_file = os.path.join(self.work_dir, "log.ftx")
+        if not os.path.isfile(log_ftx_file):
+            return False
+        return self._has_match(log_ftx_file, "FT-X driver:finalize called")
 
     def has_errored(self)->bool:
         """Check if this FTX run has errored"""
-        with working_directory(self.work_dir):
-            log_warning_file = "log.warning"
-            if not os.path.isfile(log_warning_file):
-                return True
-            return occursin_file("ERROR", log_warning_file)
+        log_warning_file = os.path.join(self.work_dir, "log.warning")
+        if not os.path.isfile(log_warning_file):
+            return True
+        return self._has_match(log_warning_file, "ERROR")
 
     def has_exceeded_the_time_limit(self)->bool:
         """Check if this FTX run has been killed because it exceeded the specified time limit"""
-        with working_directory(self.work_dir):
-            log_slurm_stdOut_file = self.batchscript.slurm_settings["output"]
-            if not os.path.isfile(log_slurm_stdOut_file):
-                return False
-            return occursin_file("DUE TO TIME LIMIT", log_slurm_stdOut_file)
+        log_slurm_stdOut_file = os.path.join(self.work_dir, self.batchscript.slurm_settings["output"])
+        if not os.path.isfile(log_slurm_stdOut_file):
+            return False
+        return self._has_match(log_slurm_stdOut_file, "DUE TO TIME LIMIT")
 
     def has_failed(self)->bool:
         """Check if this FTX run has failed because of another error"""
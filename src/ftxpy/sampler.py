@@ -0,0 +1,151 @@
+# import statements
+import numpy as np
+
+# class that represents a sampler for the uncertain parameters of an ensemble of FTX simulations
+class FTXSampler():
+    """
+    A class to represent a sampler for the uncertain parameters of an ensemble of FTX simulations
+
+    A design is an N x d matrix with one row for every member of the ensemble and one
+    column for every uncertain parameter, sampled uniformly between the lower and upper
+    bound of each parameter (or between their log10 if 'log10_transform' is set). Row k
+    of a design only depends on the seed and on k, so a design can be extended later
+    without resampling the existing members:
+
+    - 'mc': plain Monte Carlo, every member has its own random number stream
+    - 'sobol': scrambled Sobol' sequence (requires scipy), balanced when the total number
+      of members is a power of two, scipy warns that "the balance properties of Sobol'
+      points require n to be a power of 2" otherwise, the design is still valid but
+      converges more slowly, so prefer 8, 16, 32, ... members where possible
+    - 'halton': scrambled Halton sequence (requires scipy)
+    - 'lhs': Latin hypercube (requires scipy), every call to 'sample' or 'extend' adds
+      a new Latin hypercube, so the stratification holds within each batch
+
+    The methods that require scipy are available with 'pip install ftxpy[sampling]'.
+
+    Methods
+    -------
+    get_parameter_names()
+        Returns the names of the uncertain parameters, in the order of the columns of a design
+    sample(n)
+        Returns a design with n members
+    extend(design, n)
+        Returns the given design extended with n new members
+    apply(parameters, values)
+        Sets the values of the uncertain parameters to the given row of a design
+    """
+
+    methods = ("mc", "lhs", "sobol", "halton")
+
+    def __init__(self, parameters:dict, param_names:list=None, method:str="sobol", seed:int=2022):
+        """
+        Constructs all the necessary attributes for the FTXSampler object
+
+        Parameters
+        ----------
+            parameters : dict
+                A dict with parameter names as keys and FTX parameters as values, e.g. config["input"]["parameters"]
+            param_names : list (keyword argument)
+                The names of the parameters to sample, by default all parameters with a lower bound smaller than the upper bound
+            method : str (keyword argument)
+                The sampling method, one of 'mc', 'lhs', 'sobol' or 'halton', all but 'mc' require scipy
+            seed : int (keyword argument)
+                The seed of the design
+        """
+        if not method in self.methods:
+            print(f"Invalid sampling method {method}: expected one of {', '.join(self.methods)}")
+            raise ValueError("FTXPy -> FTXSampler -> __init__() : Invalid sampling method specified")
+        if method != "mc":
+            _import_qmc() # fail before any simulation is defined
+        if param_names is None:
+            param_names = [name for name, param in parameters.items() if _is_uncertain(param)]
+        for name in param_names:
+            if not name in parameters:
+                print(f"Parameter {name} not found")
+                raise ValueError("FTXPy -> FTXSampler -> __init__() : Parameter not found")
+        self.param_names = list(param_names)
+        self.method = method
+        self.seed = seed
+        params = [parameters[name] for name in self.param_names]
+        self._log10 = np.array([bool(param.log10_transform) for param in params], dtype=bool)
+        self._lower = np.array([param.lower for param in params], dtype=float)
+        self._upper = np.array([param.upper for param in params], dtype=float)
+        self._a = self._lower.copy()
+        self._b = self._upper.copy()
+        self._a[self._log10] = np.log10(self._lower[self._log10])
+        self._b[self._log10] = np.log10(self._upper[self._log10])
+
+    def get_parameter_names(self)->list:
+        """Returns the names of the uncertain parameters, in the order of the columns of a design"""
+        return self.param_names
+
+    def sample(self, n:int)->np.ndarray:
+        """
+        Returns a design with n members
+
+            Parameters:
+                n (int): The number of members, for the 'sobol' method preferably a power of two (see above)
+
+            Returns:
+                design (np.ndarray): An n x d matrix of parameter values
+        """
+        return self._transform(self._sample_unit(0, n))
+
+    def extend(self, design:np.ndarray, n:int)->np.ndarray:
+        """
+        Returns the given design extended with n new members, the existing members are not changed
+
+            Parameters:
+                design (np.ndarray): A design returned by 'sample' or 'extend'
+                n (int): The number of new members
+
+            Returns:
+                design (np.ndarray): An (N + n) x d matrix of parameter values
+        """
+        design = np.asarray(design, dtype=float).reshape(-1, len(self.param_names))
+        return np.vstack((design, self._transform(self._sample_unit(len(design), len(design) + n))))
+
+    def apply(self, parameters:dict, values)->None:
+        """
+        Sets the values of the uncertain parameters to the given row of a design
+
+            Parameters:
+                parameters (dict): A dict with parameter names as keys and FTX parameters as values
+                values (np.ndarray): A row of a design
+        """
+        for name, value in zip(self.param_names, values):
+            parameters[name].set_value(float(value))
+
+    def _sample_unit(self, start:int, stop:int)->np.ndarray: # members start, ..., stop - 1 in the unit hypercube
+        d = len(self.param_names)
+        n = max(0, stop - start)
+        if n == 0 or d == 0:
+            return np.empty((n, d))
+        if self.method == "mc":
+            return np.array([np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(k,))).random(d) for k in range(start, stop)])
+        qmc = _import_qmc()
+        if self.method == "lhs":
+            return qmc.LatinHypercube(d, seed=np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(start,)))).random(n)
+        engine = qmc.Sobol if self.method == "sobol" else qmc.Halton
+        sampler = engine(d, scramble=True, seed=np.random.default_rng(self.seed))
+        if start > 0:
+            sampler.fast_forward(start)
+        return sampler.random(n)
+
+    def _transform(self, u:np.ndarray)->np.ndarray:
+        x = self._a + u * (self._b - self._a)
+        x[:, self._log10] = 10**x[:, self._log10]
+        return np.clip(x, self._lower, self._upper) # guard against roundoff in the log10 transform
+
+# function to check if a parameter is uncertain
+def _is_uncertain(param)->bool:
+    return isinstance(param.lower, (int, float)) and isinstance(param.upper, (int, float)) and not isinstance(param.lower, bool) and param.lower < param.upper
+
+# function to import the quasi-Monte Carlo module of scipy
+def _import_qmc():
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        print(f"The 'lhs', 'sobol' and 'halton' sampling methods require scipy, use method='mc' or install scipy with 'pip install ftxpy[sampling]'")
+        raise ValueError("FTXPy -> FTXSampler -> __init__() : scipy is not available")
+    return qmc
@@ -0,0 +1,153 @@
+# import statements
+import os
+import subprocess
+import time
+
+# optional imports
+try:
+    import pyslurm
+except ImportError: # not on a cluster, only local batchscripts can be used
+    pyslurm = None
+
+# class that represents a cached snapshot of the slurm job table
+class SlurmQueue():
+    """
+    A class to represent a cached snapshot of the slurm job table
+
+    Methods
+    -------
+    get_ttl()
+        Returns the time-to-live (in seconds) of a snapshot
+    set_ttl(ttl)
+        Sets the time-to-live (in seconds) of a snapshot
+    invalidate()
+        Invalidates the current snapshot, the next query will fetch a new one
+    get_jobs()
+        Returns a dict with job ids as keys and job info as values for all jobs of the current user
+    get_job(job_id, array_task_id)
+        Returns the job info for the given job id (and array task id), or None if the job is not in the queue
+    is_running(job_id, array_task_id)
+        Check if the job with the given job id (and array task id) is currently running
+    is_queueing(job_id, array_task_id)
+        Check if the job with the given job id (and array task id) is currently queueing
+    cancel(job_id, array_task_id)
+        Cancel the job with the given job id (and array task id)
+    """
+
+    def __init__(self, ttl:float=30):
+        """
+        Constructs all the necessary attributes for the SlurmQueue object
+
+        Parameters
+        ----------
+            ttl : float (keyword argument)
+                The number of seconds a snapshot of the job table remains valid
+        """
+        self.set_ttl(ttl)
+        self._jobs = None # dict with job ids and job info
+        self._array_tasks = None # dict with (array job id, array task id) tuples and job info
+        self._timestamp = None # time at which the snapshot was taken
+
+    def get_ttl(self)->float:
+        """Returns the time-to-live (in seconds) of a snapshot"""
+        return self.ttl
+
+    def set_ttl(self, ttl:float)->None:
+        """
+        Sets the time-to-live (in seconds) of a snapshot
+
+            Parameters:
+                ttl (float): The new time-to-live
+        """
+        if ttl < 0:
+            print(f"Invalid time-to-live specified: expected a nonnegative value, got {ttl}")
+            raise ValueError("FTXPy -> SlurmQueue -> set_ttl() : Invalid time-to-live specified")
+        self.ttl = ttl
+
+    def invalidate(self)->None:
+        """Invalidates the current snapshot, the next query will fetch a new one"""
+        self._jobs = None
+        self._array_tasks = None
+        self._timestamp = None
+
+    def _is_stale(self)->bool:
+        return self._jobs is None or time.monotonic() - self._timestamp > self.ttl
+
+    def _refresh(self)->None:
+        if pyslurm is None:
+            print(f"Cannot query the slurm job table, pyslurm is not available")
+            raise ValueError("FTXPy -> SlurmQueue -> get_jobs() : pyslurm is not available")
+        user_id = os.getuid()
+        jobs = pyslurm.job().get()
+        self._jobs = {job_id: job for job_id, job in jobs.items() if job.get("user_id", user_id) == user_id}
+        self._array_tasks = dict()
+        for job in self._jobs.values():
+            array_job_id = job.get("array_job_id")
+            if not array_job_id: # not part of a job array
+                continue
+            if job.get("array_task_str"): # pending array tasks are collapsed into a single record
+                for array_task_id in _parse_array_task_str(job["array_task_str"]):
+                    self._array_tasks[(array_job_id, array_task_id)] = job
+            elif job.get("array_task_id") is not None and job["array_task_id"] < _NO_VAL:
+                self._array_tasks[(array_job_id, job["array_task_id"])] = job
+        self._timestamp = time.monotonic()
+
+    def get_jobs(self)->dict:
+        """Returns a dict with job ids as keys and job info as values for all jobs of the current user"""
+        if self._is_stale():
+            self._refresh()
+        return self._jobs
+
+    def get_job(self, job_id:int, array_task_id:int=None)->dict:
+        """Returns the job info for the given job id (and array task id), or None if the job is not in the queue"""
+        if job_id is None:
+            return None
+        jobs = self.get_jobs()
+        if array_task_id is None:
+            return jobs.get(job_id)
+        return self._array_tasks.get((job_id, array_task_id))
+
+    def is_running(self, job_id:int, array_task_id:int=None)->bool:
+        """Check if the job with the given job id (and array task id) is currently running"""
+        job = self.get_job(job_id, array_task_id)
+        return job is not None and job["run_time"] > 0
+
+    def is_queueing(self, job_id:int, array_task_id:int=None)->bool:
+        """Check if the job with the given job id (and array task id) is currently queueing"""
+        job = self.get_job(job_id, array_task_id)
+        return job is not None and job["run_time"] == 0
+
+    def cancel(self, job_id:int, array_task_id:int=None)->None:
+        """Cancel the job with the given job id (and array task id) with scancel, the next query will fetch a new snapshot"""
+        job = str(job_id) if array_task_id is None else f"{job_id}_{array_task_id}"
+        try:
+            result = subprocess.run(["scancel", job], capture_output=True, text=True)
+        except FileNotFoundError:
+            print(f"Cannot cancel job {job}, scancel is not available")
+            raise ValueError("FTXPy -> SlurmQueue -> cancel() : scancel is not available")
+        if result.returncode != 0:
+            print(f"Could not cancel job {job}: {result.stderr.strip()}")
+            raise ValueError("FTXPy -> SlurmQueue -> cancel() : Could not cancel job")
+        self.invalidate()
+
+# slurm marker for an unset array task id
+_NO_VAL = 0xfffffffe
+
+# function to expand an array task string such as '0-9%4' or '1,3,5-11:2' into a list of array task ids
+def _parse_array_task_str(array_task_str:str)->list:
+    array_task_ids = list()
+    for item in array_task_str.strip("[]").split("%")[0].split(","):
+        if len(item) == 0:
+            continue
+        item, _, step = item.partition(":")
+        first, _, last = item.partition("-")
+        array_task_ids.extend(range(int(first), int(last or first) + 1, int(step or 1)))
+    return array_task_ids
+
+# shared snapshot of the slurm job table, used by all FTX runs
+_slurm_queue = SlurmQueue()
+
+# function to return the shared snapshot of the slurm job table
+def get_slurm_queue()->SlurmQueue:
+    """Returns the slurm queue snapshot that is shared by all FTX runs"""
+    return _slurm_queue
@@ -3,15 +3,13 @@ import copy
 import glob
 import os
 import shutil
-import sys
 
 # special imports
+from .checkpoint import keep_last_ts
+from .resultindex import FTXResultIndex
 from .run import FTXRun
-from .utils import save, load, get_last_occurance
-
-# add path to keepLastTS.py
-sys.path.append(os.environ.get("CFS") + "/atom/users/" + os.environ.get("USER") + "/ips-wrappers/ips-iterative-xolotlFT/ips_xolotlFT/python_scripts_for_coupling")
-import keepLastTS
+from .utils import save, load, get_last_occurances
+from .walltime import FTXWalltimeModel
 
 # class that represents an FTX simulation
 class FTXSimulation():
@@ -20,12 +18,22 @@ class FTXSimulation():
 
     Methods
     -------
+    get_original_time_limit()
+        Returns the time limit of the batchscript this FTX simulation was defined with
     get_runs()
         Returns a list of FTX runs that compose this simulation
     get_path()
         Returns the path of this simulation
-    start()
-        Start this FTX simulation
+    start(force)
+        Start this FTX simulation, or reuse the runs of a finished simulation with the same inputs
+    set_converged(time)
+        Mark this FTX simulation as converged, it is considered finished and is not restarted
+    is_converged()
+        Check if this FTX simulation has been marked as converged
+    is_reused()
+        Check if this FTX simulation reused the runs of a finished simulation
+    record_result()
+        Add this FTX simulation to its result index if it has finished
     restart()
         Restart this FTX simulation
     is_running()
@@ -58,7 +66,16 @@ class FTXSimulation():
         Execute the next step in this simulation
     """
 
-    def __init__(self, current_run:FTXRun):
+    # artifacts of the previous run that are needed for a restart, as a dict with the file name in
+    # the restart directory as key and a (glob pattern in the previous run directory, action) tuple
+    # as value, where action is either 'copy' or 'keep_last_ts'; rendered inputs and linked input
+    # trees are staged by FTXInput, all other outputs of the previous run are not copied
+    restart_manifest = {
+        "networkFile.h5": (os.path.join("work", "workers__xolotlWorker_*", "xolotlStop.h5"), "keep_last_ts"),
+        "last_TRIDYN.dat": (os.path.join("work", "workers__ftridynWorker_*", "last_TRIDYN.dat"), "copy"),
+    }
+
+    def __init__(self, current_run:FTXRun, walltime_model:FTXWalltimeModel=None, result_index:FTXResultIndex=None):
         """
         Constructs all the necessary attributes for the FTXSimulation object
 
@@ -66,12 +83,29 @@ class FTXSimulation():
         ----------
             current_run : FTXRun
                 The FTX run to use as a basis for this FTX simulation
+            walltime_model : FTXWalltimeModel (keyword argument)
+                The model used to set the time limit of every restart from past runs, by default the time limit of the batchscript is used, fitted time limits never exceed it
+            result_index : FTXResultIndex (keyword argument)
+                The index of finished simulations that this simulation can reuse when it has the same inputs, by default the simulation is always submitted
         """
         self.current_run = current_run
+        self.walltime_model = walltime_model
+        self.result_index = result_index
+        self._reused_from = None # path of the finished simulation whose runs were reused
+        self._converged_at = None # simulated time at which the stopping criterion of a convergence monitor was met
+        self._result_recorded = False # True once this simulation has been added to its result index, or can never be added
         self._runs = list()
+        self._original_time_limit = getattr(current_run.batchscript, "slurm_settings", dict()).get("time_limit") # the fitted time limits of restarts never exceed it
         self._path = self.current_run.get_work_dir()
         self._name = os.path.split(self._path)[-1]
 
+    def get_original_time_limit(self)->float:
+        """Returns the time limit (in minutes) of the batchscript this FTX simulation was defined with, or None if it has no time limit"""
+        if not hasattr(self, "_original_time_limit"): # simulations saved before the original time limit was recorded
+            run = self._runs[0] if len(self._runs) > 0 else self.current_run
+            self._original_time_limit = getattr(run.batchscript, "slurm_settings", dict()).get("time_limit")
+        return self._original_time_limit
+
     def get_runs(self):
         """Returns a list of FTX runs that compose this simulation"""
         return self._runs
@@ -80,82 +114,147 @@ class FTXSimulation():
         """Returns the path of this simulation"""
         return self._path
 
-    def start(self)->None:
-        """Start this FTX simulation"""
+    def start(self, force:bool=False)->None:
+        """
+        Start this FTX simulation, or reuse the runs of a finished simulation in the result index with the same inputs
+
+            Parameters:
+                force (bool): Always submit this simulation, even if a finished simulation with the same inputs exists
+        """
         if self.has_started():
             print(f"Simulation has already started, use 'restart' instead")
             raise ValueError("FTXPy -> FTXSimulation -> start() : Simulation has already started, use 'restart' instead")
         self.current_run.change_work_dir(os.path.join(self._path, "init_" + self._name))
+        if not force and self._reuse_result():
+            return
         self.current_run.write_files()
         self._start_current_run()
 
+    def _reuse_result(self)->bool:
+        result_index = getattr(self, "result_index", None) # simulations saved before the result index was introduced
+        if result_index is None:
+            return False
+        result = result_index.find(self.current_run.inputs)
+        if result is None:
+            return False
+        path, runs = result
+        for k, run in enumerate(runs): # link the run directories of the finished simulation into this simulation
+            work_dir = os.path.join(self._path, "init_" + self._name if k == 0 else "restart_" + self._name + f"_{k}")
+            if os.path.lexists(work_dir):
+                _remove_work_dir(work_dir)
+            os.makedirs(self._path, exist_ok=True)
+            os.symlink(run.get_work_dir(), work_dir)
+            run.change_work_dir(work_dir)
+            if "SIM_NAME" in run.inputs.parameters:
+                run.inputs.parameters["SIM_NAME"].set_value(self.current_run.inputs.parameters["SIM_NAME"].get_value())
+        self._runs = runs
+        self.current_run = runs[-1]
+        self._reused_from = path
+        print(f"Simulation {self._name} has the same inputs as the finished simulation {path}, its runs are reused")
+        return True
+
+    def set_converged(self, time:float=None)->None:
+        """
+        Mark this FTX simulation as converged, it is considered finished and is not restarted
+
+            Parameters:
+                time (float): The simulated time at which the simulation converged
+        """
+        self._converged_at = float("nan") if time is None else float(time)
+
+    def is_converged(self)->bool:
+        """Check if this FTX simulation has been marked as converged"""
+        return getattr(self, "_converged_at", None) is not None # simulations saved before convergence monitoring was introduced
+
+    def is_reused(self)->bool:
+        """Check if this FTX simulation reused the runs of a finished simulation"""
+        return getattr(self, "_reused_from", None) is not None
+
+    def record_result(self)->bool:
+        """Add this FTX simulation to its result index if it has finished, returns True if a new entry was added"""
+        result_index = getattr(self, "result_index", None)
+        if result_index is None or getattr(self, "_result_recorded", False) or not self.has_started(): # simulations saved before results were recorded
+            return False
+        if self.is_reused() or self.is_converged(): # these are never added
+            self._result_recorded = True
+            return False
+        if not self.current_run.has_finished():
+            return False
+        self._result_recorded = True
+        return result_index.add(self)
+
     def _start_current_run(self):
         self.current_run.start()
         self._runs.append(self.current_run)
 
     def restart(self)->None:
         """Restart this FTX simulation"""
-        src = self.current_run.get_work_dir()
+        previous_run = self.current_run
         dest = os.path.join(self._path, "restart_" + self._name + f"_{len(self._runs)}")
         if os.path.exists(dest):
             shutil.rmtree(dest)
-        shutil.copytree(src, dest)
-        self.current_run = FTXRun(dest, copy.deepcopy(self.current_run.inputs), copy.deepcopy(self.current_run.batchscript))
-        self._prepare_restart()
+        os.makedirs(dest)
+        self.current_run = FTXRun(dest, copy.deepcopy(previous_run.inputs), copy.deepcopy(previous_run.batchscript))
+        self._prepare_restart(previous_run)
+        self._set_time_limit()
         self.current_run.write_files(overwrite=True)
-        self.current_run.clean()
         self._start_current_run()
 
-    def _prepare_restart(self)->None:
-        self._keep_last_ts()
-        self._copy_last_tridyn()
-        self._update_restart_parameters()
-
-    def _keep_last_ts(self)->None:
-        work_dir = self.current_run.work_dir
-        src = glob.glob(os.path.join(work_dir, "work", "workers__xolotlWorker_*", "xolotlStop.h5"))[0]
-        dest = os.path.join(work_dir, "networkFile.h5")
-        if os.path.isfile(dest):
-            os.remove(dest)
-        keepLastTS.keepLastTS(inFile=src, outFile=dest)
-
-    def _copy_last_tridyn(self)->None:
-        work_dir = self.current_run.work_dir
-        src = glob.glob(os.path.join(work_dir, "work", "workers__ftridynWorker_*", "last_TRIDYN.dat"))[0]
-        dest = os.path.join(work_dir, "last_TRIDYN.dat")
-        shutil.copyfile(src, dest)
-
-    def _update_restart_parameters(self)->None:
+    def _prepare_restart(self, previous_run:FTXRun)->None:
+        self._stage_restart_artifacts(previous_run)
+        self._update_restart_parameters(previous_run)
+
+    def _set_time_limit(self)->None:
+        if getattr(self, "walltime_model", None) is None: # simulations saved before the walltime model was introduced
+            return
+        walltime_model = copy.deepcopy(self.walltime_model)
+        walltime_model.add_runs(self._runs)
+        walltime_model.fit()
+        time_limit = walltime_model.get_time_limit(self.current_run.inputs.parameters, self.get_original_time_limit())
+        if time_limit is not None:
+            self.current_run.batchscript.slurm_settings["time_limit"] = time_limit
+
+    def _stage_restart_artifacts(self, previous_run:FTXRun)->None:
+        for dest_name, (pattern, action) in self.restart_manifest.items():
+            files = glob.glob(os.path.join(previous_run.get_work_dir(), pattern))
+            if len(files) == 0:
+                print(f"Restart artifact {pattern} not found in {previous_run.get_work_dir()}")
+                raise ValueError("FTXPy -> FTXSimulation -> restart() : Restart artifact not found")
+            dest = os.path.join(self.current_run.get_work_dir(), dest_name)
+            if action == "keep_last_ts":
+                nbytes = keep_last_ts(files[0], dest)
+                print(f"Copied the last timestep of {files[0]} to {dest} ({nbytes / 1e6:.1f} MB)")
+            else:
+                shutil.copyfile(files[0], dest)
+
+    def _update_restart_parameters(self, previous_run:FTXRun)->None:
         self.current_run.inputs.parameters["START_MODE"].set_value("RESTART")
         self.current_run.inputs.parameters["ts_atol"].set_value(1e-3)
         self.current_run.inputs.parameters["ts_rtol"].set_value(1e-3)
-        parameters = self._get_restart_parameters_from_log_file()
+        parameters = self._get_restart_parameters_from_log_file(previous_run)
         for key, val in parameters.items():
             self.current_run.inputs.parameters[key].set_value(val)
 
-    def _get_restart_parameters_from_log_file(self):
+    def _get_restart_parameters_from_log_file(self, previous_run:FTXRun):
         parameters = dict()
-        log_ftx = self.current_run.get_log_file()
-        line_nb = get_last_occurance(log_ftx, "check for updates in time steps")
-        if line_nb > -1:    
-            parameters["LOOP_N"] = int(log_ftx[line_nb].split()[2][:-1])
-            if "no update" in log_ftx[line_nb + 1]:
-                parameters["LOOP_TIME_STEP"] = float(log_ftx[line_nb + 1].split("(")[1].split(")")[0])
-                parameters["start_stop"] = float(log_ftx[line_nb + 1].split("(")[2].split(")")[0])
+        search_strs = ["check for updates in time steps", "change in Xolotls", "driver time (in loop)", "updated the values of voidPortion", "updated the values of grid"]
+        lines = get_last_occurances(previous_run.get_log_file_name(), search_strs, n_after=3) # single backward pass over log.ftx
+        if "check for updates in time steps" in lines:
+            line = lines["check for updates in time steps"]
+            parameters["LOOP_N"] = int(line[0].split()[2][:-1])
+            if "no update" in line[1]:
+                parameters["LOOP_TIME_STEP"] = float(line[1].split("(")[1].split(")")[0])
+                parameters["start_stop"] = float(line[1].split("(")[2].split(")")[0])
             else:
-                parameters["LOOP_TIME_STEP"] = float(log_ftx[line_nb + 3].split()[6])
-                parameters["start_stop"] = float(log_ftx[line_nb + 3].split()[9][1:])
-            line_nb = get_last_occurance(log_ftx, "change in Xolotls")
-            parameters["ts_adapt_dt_max"] = float(log_ftx[line_nb + 1].split()[-1])
-            line_nb = get_last_occurance(log_ftx, "driver time (in loop)")
-            parameters["INIT_TIME"] = float(log_ftx[line_nb].split()[-1])
+                parameters["LOOP_TIME_STEP"] = float(line[3].split()[6])
+                parameters["start_stop"] = float(line[3].split()[9][1:])
+            parameters["ts_adapt_dt_max"] = float(lines["change in Xolotls"][1].split()[-1])
+            parameters["INIT_TIME"] = float(lines["driver time (in loop)"][0].split()[-1])
             parameters["XOLOTL_MAX_TS"] = self.current_run.inputs.parameters["XOLOTL_MAX_TS"].get_value() if parameters["INIT_TIME"] < 5 else 0.1
-            line_nb = get_last_occurance(log_ftx, "updated the values of voidPortion")
-            if line_nb > -1:
-                parameters["voidPortion"] = float(log_ftx[line_nb].split()[-1])
-            line_nb = get_last_occurance(log_ftx, "updated the values of grid")
-            if line_nb > -1:
-                parameters["grid_size"] = int(log_ftx[line_nb].split()[-1])
+            if "updated the values of voidPortion" in lines:
+                parameters["voidPortion"] = float(lines["updated the values of voidPortion"][0].split()[-1])
+            if "updated the values of grid" in lines:
+                parameters["grid_size"] = int(lines["updated the values of grid"][0].split()[-1])
         return parameters
 
     def has_started(self)->bool:
@@ -175,8 +274,8 @@ class FTXSimulation():
         return self.current_run.has_exceeded_the_time_limit()
 
     def has_finished(self)->bool:
-        """Check if this FTX simulation has finished"""
-        return self.current_run.has_finished()
+        """Check if this FTX simulation has finished, or has been marked as converged"""
+        return self.is_converged() or self.current_run.has_finished()
 
     def has_errored(self)->bool:
         """Check if this FTX simulation has errored"""
@@ -203,16 +302,18 @@ class FTXSimulation():
     def delete_all_runs(self):
         """Delete all runs of this FTX simulation"""
         for run in self._runs:
-            shutil.rmtree(run.get_work_dir()) # remove directory
+            _remove_work_dir(run.get_work_dir()) # remove directory
         if len(self._runs) > 0:
             self.current_run = self._runs[0]
         self._runs = list()
+        self._reused_from = None
+        self._converged_at = None
         self.current_run._job_id = None # required, assume this run hasn't been started
 
     def delete_last_run(self):
         """Delete the last run of this FTX simulation"""
         if len(self._runs) > 0:
-            shutil.rmtree(self.current_run.get_work_dir()) # remove directory
+            _remove_work_dir(self.current_run.get_work_dir()) # remove directory
         if len(self._runs) == 1: # if only init run, then assume this run hasn't been started
             self.current_run._job_id = None
         if len(self._runs) > 1: # else, go back to previous run
@@ -230,6 +331,8 @@ class FTXSimulation():
         """Returns the status of this FTX simulation"""
         if not self.has_started():
             status = "has not started"
+        elif self.is_converged():
+            status = f"has converged at t = {self._converged_at}"
         elif self.has_finished():
             status = "has finished"
         elif self.has_exceeded_the_time_limit():
@@ -263,3 +366,10 @@ class FTXSimulation():
             self.start()
         elif self.has_exceeded_the_time_limit():
             self.restart()
+
+# function to remove the work directory of a run, the outputs of reused runs are only unlinked
+def _remove_work_dir(work_dir:str)->None:
+    if os.path.islink(work_dir) or os.path.isfile(work_dir):
+        os.remove(work_dir)
+    else:
+        shutil.rmtree(work_dir)
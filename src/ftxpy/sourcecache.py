@@ -0,0 +1,142 @@
+# import statements
+import hashlib
+import os
+import threading
+
+# special imports
+from .template import Template
+
+# class that represents a content-addressed cache of source templates
+class SourceCache():
+    """
+    A class to represent a process-wide, content-addressed cache of source templates
+
+    Source directories are listed once for every modification time of the directory,
+    and source files are read and compiled once for every path, modification time and
+    size. Compiled templates are stored by the sha256 hash of their contents, so that
+    identical files are stored only once and FTX inputs can refer to a template by its
+    hash instead of keeping their own copy of the file contents.
+
+    Methods
+    -------
+    list_source(src)
+        Returns the names of the files and directories in a source directory
+    add_file(file_name)
+        Adds the contents of a source file to this cache, returns their hash
+    add_text(text, content_hash)
+        Adds the given text to this cache, returns its hash
+    get_template(content_hash, file_name)
+        Returns the compiled template with the given hash
+    get_text(content_hash)
+        Returns the text of the template with the given hash
+    get_hashes()
+        Returns the hashes of all templates in this cache
+    clear()
+        Removes all listings and templates from this cache
+    """
+
+    def __init__(self):
+        """Constructs all the necessary attributes for the SourceCache object"""
+        self._listings = dict() # dict with (path, mtime) keys and lists of entries as values
+        self._files = dict() # dict with (path, mtime, size) keys and hashes as values
+        self._templates = dict() # dict with hashes as keys and compiled templates as values
+        self._lock = threading.Lock()
+
+    def list_source(self, src:str)->list:
+        """
+        Returns the names of the files and directories in a source directory, in the order of 'os.listdir'
+
+            Parameters:
+                src (str): The source directory
+        """
+        key = (os.path.abspath(src), os.stat(src).st_mtime_ns)
+        listing = self._listings.get(key)
+        if listing is None:
+            listing = os.listdir(src)
+            with self._lock:
+                self._listings[key] = listing
+        return list(listing)
+
+    def add_file(self, file_name:str, file_stat:os.stat_result=None)->str:
+        """
+        Adds the contents of a source file to this cache, returns their hash
+
+            Parameters:
+                file_name (str): The name of the source file
+                file_stat (os.stat_result): The result of 'os.stat' for the file, if it is already known
+        """
+        file_stat = os.stat(file_name) if file_stat is None else file_stat
+        key = (os.path.abspath(file_name), file_stat.st_mtime_ns, file_stat.st_size)
+        content_hash = self._files.get(key)
+        if content_hash is None or not content_hash in self._templates:
+            with open(file_name, "r") as f:
+                content_hash = self.add_text(f.read())
+            with self._lock:
+                self._files[key] = content_hash
+        return content_hash
+
+    def add_text(self, text:str, content_hash:str=None)->str:
+        """
+        Adds the given text to this cache, returns its hash
+
+            Parameters:
+                text (str): The contents of a source file
+                content_hash (str): The expected hash of the text, if it is known
+        """
+        text_hash = _hash(text)
+        if content_hash is not None and content_hash != text_hash:
+            print(f"Invalid source template: expected hash {content_hash}, got {text_hash}")
+            raise ValueError("FTXPy -> SourceCache -> add_text() : Invalid source template")
+        if not text_hash in self._templates:
+            template = Template(text)
+            with self._lock:
+                self._templates.setdefault(text_hash, template)
+        return text_hash
+
+    def get_template(self, content_hash:str, file_name:str=None)->Template:
+        """
+        Returns the compiled template with the given hash
+
+            Parameters:
+                content_hash (str): The hash of the template
+                file_name (str): The source file of the template, read again if the template is not in this cache (e.g. in a new process)
+        """
+        if not content_hash in self._templates and file_name is not None and os.path.isfile(file_name):
+            with open(file_name, "r") as f:
+                text = f.read()
+            if _hash(text) == content_hash:
+                self.add_text(text, content_hash)
+        if not content_hash in self._templates:
+            print(f"Source template {content_hash} ({file_name}) is not in the source cache and the source file has been modified or removed, load the simulation group from its state store")
+            raise ValueError("FTXPy -> SourceCache -> get_template() : Source template not found")
+        return self._templates[content_hash]
+
+    def get_text(self, content_hash:str, file_name:str=None)->str:
+        """Returns the text of the template with the given hash"""
+        return self.get_template(content_hash, file_name).render(dict()) # placeholders without values are left untouched
+
+    def get_hashes(self)->set:
+        """Returns the hashes of all templates in this cache"""
+        return set(self._templates)
+
+    def __contains__(self, content_hash:str)->bool:
+        return content_hash in self._templates
+
+    def clear(self)->None:
+        """Removes all listings and templates from this cache"""
+        with self._lock:
+            self._listings.clear()
+            self._files.clear()
+            self._templates.clear()
+
+# function to compute the hash of the contents of a source file
+def _hash(text:str)->str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+# shared cache of source templates, used by all FTX inputs
+_source_cache = SourceCache()
+
+# function to return the shared cache of source templates
+def get_source_cache()->SourceCache:
+    """Returns the cache of source templates that is shared by all FTX inputs"""
+    return _source_cache
@@ -0,0 +1,169 @@
+# import statements
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+import threading
+
+# supported staging modes
+STAGING_MODES = ("copy", "hardlink", "reflink", "symlink")
+
+# ioctl request number to clone a file on Linux (from linux/fs.h)
+_FICLONE = 0x40049409
+
+# function to check a staging mode
+def check_staging_mode(mode:str)->None:
+    """Check if the given staging mode is supported"""
+    if not mode in STAGING_MODES:
+        print(f"Invalid staging mode '{mode}': expected one of {', '.join(STAGING_MODES)}")
+        raise ValueError("FTXPy -> check_staging_mode() : Invalid staging mode")
+
+# function to reflink a file, falls back to a copy if the file system does not support it
+def reflink(src:str, dest:str)->None:
+    """Clone a file with copy-on-write semantics, or copy it if cloning is not supported"""
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        with open(src, "rb") as f_src, open(dest, "wb") as f_dest:
+            fcntl.ioctl(f_dest.fileno(), _FICLONE, f_src.fileno())
+        shutil.copystat(src, dest)
+    except OSError as e:
+        if not e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL):
+            raise
+        shutil.copy2(src, dest)
+
+# function to hardlink a file, falls back to a copy if the file is on another device
+def hardlink(src:str, dest:str)->None:
+    """Hardlink a file, or copy it if the destination is on another device"""
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copy2(src, dest)
+
+# function to stage a file or directory in a destination with a given staging mode
+def stage(src:str, dest:str, mode:str="copy")->None:
+    """
+    Stage a file or directory in a destination with a given staging mode
+
+    Hardlinked and reflinked files are made read-only, so that a run cannot modify a file
+    whose content it shares with the source or with other runs.
+
+        Parameters:
+            src (str): The file or directory to stage
+            dest (str): The name of the staged file or directory
+            mode (str): One of 'copy', 'hardlink', 'reflink' or 'symlink'
+    """
+    check_staging_mode(mode)
+    src = os.path.abspath(src)
+    if os.path.islink(dest):
+        os.remove(dest)
+    elif os.path.isdir(dest) and mode == "symlink":
+        shutil.rmtree(dest)
+    if mode == "symlink":
+        os.symlink(src, dest)
+    elif mode == "copy":
+        if os.path.isdir(src):
+            shutil.copytree(src, dest, dirs_exist_ok=True)
+        else:
+            shutil.copy2(src, dest)
+    else:
+        link = hardlink if mode == "hardlink" else reflink
+        if os.path.isdir(src):
+            shutil.copytree(src, dest, copy_function=link, dirs_exist_ok=True)
+        else:
+            link(src, dest)
+        for file_name in list_files(dest):
+            make_read_only(file_name)
+
+# function to check if a staging mode shares content between source and destination
+def is_shared(mode:str)->bool:
+    """Check if files staged with the given staging mode share their content with the source files"""
+    return mode in ("hardlink", "symlink")
+
+# function to list all files in a file or directory
+def list_files(src:str)->list:
+    """Returns a list of all files in the given directory, or the file itself if src is a file"""
+    if not os.path.isdir(src):
+        return [src]
+    files = list()
+    for root, _, file_names in os.walk(src):
+        for file_name in file_names:
+            files.append(os.path.join(root, file_name))
+    return files
+
+# function to make a file read-only
+def make_read_only(file_name:str)->None:
+    """Remove write permissions from the given file, for a hardlink this also applies to the source file"""
+    mode = os.stat(file_name).st_mode
+    if mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+        os.chmod(file_name, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+# function to compute a fingerprint of a file
+def fingerprint(file_name:str)->tuple:
+    """Returns a (size, modification time) fingerprint of the given file"""
+    file_stat = os.stat(file_name)
+    return (file_stat.st_size, file_stat.st_mtime_ns)
+
+# class that represents a cache of the fingerprints of shared source files and directories
+class FingerprintCache():
+    """
+    A class to represent a process-wide cache of the fingerprints of shared source files and directories
+
+    The fingerprint of a source is a hash of the relative names, sizes and modification
+    times of all of its files. A source is walked only the first time its fingerprint is
+    requested in a process, so that staging the same source tree into many runs does not
+    stat every file again for every run.
+
+    Methods
+    -------
+    get_fingerprint(src, refresh)
+        Returns the fingerprint of the given source file or directory
+    clear()
+        Removes all fingerprints from this cache
+    """
+
+    def __init__(self):
+        """Constructs all the necessary attributes for the FingerprintCache object"""
+        self._fingerprints = dict() # dict with source paths and their fingerprints
+        self._lock = threading.Lock()
+
+    def get_fingerprint(self, src:str, refresh:bool=False)->str:
+        """
+        Returns the fingerprint of the given source file or directory, or None if it does not exist
+
+            Parameters:
+                src (str): The source file or directory
+                refresh (bool): If True, walk the source again even if its fingerprint is in this cache
+        """
+        src = os.path.abspath(src)
+        src_fingerprint = None if refresh else self._fingerprints.get(src)
+        if src_fingerprint is None:
+            if not os.path.exists(src):
+                return None
+            src_hash = hashlib.sha256()
+            for file_name in sorted(list_files(src)):
+                size, mtime = fingerprint(file_name)
+                src_hash.update(f"{os.path.relpath(file_name, src)}\0{size}\0{mtime}\0".encode())
+            src_fingerprint = src_hash.hexdigest()
+            with self._lock:
+                self._fingerprints[src] = src_fingerprint
+        return src_fingerprint
+
+    def clear(self)->None:
+        """Removes all fingerprints from this cache"""
+        with self._lock:
+            self._fingerprints.clear()
+
+# shared cache of source fingerprints, used by all FTX inputs
+_fingerprint_cache = FingerprintCache()
+
+# function to return the shared cache of source fingerprints
+def get_fingerprint_cache()->FingerprintCache:
+    """Returns the cache of source fingerprints that is shared by all FTX inputs"""
+    return _fingerprint_cache
@@ -0,0 +1,294 @@
+# import statements
+import fcntl
+import hashlib
+import io
+import os
+import pickle as pk
+import sqlite3
+import time
+
+# special imports
+from contextlib import contextmanager
+from .sourcecache import get_source_cache
+from .table import FTXParameterTable, _tables
+
+# class that represents an SQLite store with the state of a group of FTX simulations
+class FTXStateStore():
+    """
+    A class to represent an SQLite store with the state of a group of FTX simulations
+
+    Every simulation is stored in its own record, keyed by its path, together with
+    a record for each of its runs (work dir and job id) and its parameter values.
+    The source templates of the input files are stored once, by hash, and are added
+    to the source cache when simulations are loaded. The columns of parameter tables
+    are stored once as well, so that a simulation record only holds the values of
+    its rows. Records are only rewritten when the simulation changed, all updates of a
+    save happen in a single transaction, and simulations can be loaded one by one. The
+    status of every simulation is stored when it is saved, so that the last known status
+    can be read without loading the simulations. Processes that modify the group (e.g. a
+    cron-driven 'step') should do so while holding the lock of the store.
+
+    Methods
+    -------
+    lock()
+        Context manager that holds an exclusive lock on this store
+    save_state(state, simulations, prune)
+        Save the group state and the given simulations
+    get_generation()
+        Returns the number of times a group has been saved in this store
+    load_state()
+        Load the group state
+    save_campaign_state(state)
+        Save the state of the campaign driver of this group
+    load_campaign_state()
+        Load the state of the campaign driver of this group
+    load_source_templates()
+        Add the source templates in this store to the source cache
+    get_simulation_paths()
+        Returns the paths of all simulations in this store
+    get_simulation_names()
+        Returns the names of all simulations in this store
+    load_simulation(path)
+        Load the simulation with the given path or name
+    get_status()
+        Returns the last known status of all simulations
+    print_status()
+        Prints the last known status of all simulations
+    get_runs(path)
+        Returns the run records of the simulation with the given path or name
+    get_parameters(path)
+        Returns the parameter values of the simulation with the given path or name
+    """
+
+    schema_version = 2 # simulations are keyed by their path since version 1, and have a status since version 2
+
+    def __init__(self, file_name:str, timeout:float=60):
+        """
+        Constructs all the necessary attributes for the FTXStateStore object
+
+        Parameters
+        ----------
+            file_name : str
+                The name of the database file
+            timeout : float (keyword argument)
+                The number of seconds to wait for a concurrent writer to finish
+        """
+        self.file_name = file_name
+        self.timeout = timeout
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL") # readers do not block the writer and vice versa
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version < self.schema_version:
+                _migrate(connection, version)
+            connection.execute("CREATE TABLE IF NOT EXISTS group_state (id INTEGER PRIMARY KEY CHECK (id = 0), data BLOB)")
+            connection.execute("CREATE TABLE IF NOT EXISTS simulations (path TEXT PRIMARY KEY, name TEXT, position INTEGER, checksum TEXT, updated REAL, status TEXT, data BLOB)")
+            connection.execute("CREATE TABLE IF NOT EXISTS runs (simulation TEXT, run_number INTEGER, work_dir TEXT, job_id INTEGER, PRIMARY KEY (simulation, run_number))")
+            connection.execute("CREATE TABLE IF NOT EXISTS parameters (simulation TEXT, name TEXT, value TEXT, PRIMARY KEY (simulation, name))")
+            connection.execute("CREATE TABLE IF NOT EXISTS campaign_state (id INTEGER PRIMARY KEY CHECK (id = 0), data BLOB)")
+            connection.execute("CREATE TABLE IF NOT EXISTS source_templates (hash TEXT PRIMARY KEY, data TEXT)")
+            connection.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER)")
+            connection.execute("CREATE TABLE IF NOT EXISTS parameter_tables (key TEXT PRIMARY KEY, data BLOB)")
+            connection.execute(f"PRAGMA user_version = {self.schema_version}")
+        self._source_templates_loaded = False
+
+    @contextmanager
+    def _connection(self):
+        connection = self._connect()
+        try:
+            with connection: # commits on success, rolls back on error
+                yield connection
+        finally:
+            connection.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.file_name, timeout=self.timeout)
+
+    @contextmanager
+    def lock(self):
+        """Context manager that holds an exclusive lock on this store"""
+        with open(self.file_name + ".lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def save_state(self, state:dict, simulations:list, prune:bool=False)->None:
+        """
+        Save the group state and the given simulations, simulations that did not change are not rewritten
+
+            Parameters:
+                state (dict): The state of the group, without the simulations
+                simulations (list): The simulations to save
+                prune (bool): If True, remove the simulations that are not in the given list from this store
+        """
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO group_state (id, data) VALUES (0, ?)", (pk.dumps(state),))
+            connection.execute("INSERT INTO generation (id, value) VALUES (0, 1) ON CONFLICT (id) DO UPDATE SET value = value + 1")
+            checksums = dict(connection.execute("SELECT path, checksum FROM simulations"))
+            saved_hashes = {content_hash for content_hash, in connection.execute("SELECT hash FROM source_templates")}
+            saved_tables = {key for key, in connection.execute("SELECT key FROM parameter_tables")}
+            for position, simulation in enumerate(simulations):
+                path = simulation.get_path()
+                status = simulation.status() # before pickling, since it may advance the log scanners
+                data, tables = _dumps(simulation)
+                for key, table in tables.items(): # tables are keyed by a hash of their columns
+                    if not key in saved_tables:
+                        connection.execute("INSERT OR IGNORE INTO parameter_tables (key, data) VALUES (?, ?)", (key, pk.dumps(table)))
+                        saved_tables.add(key)
+                checksum = hashlib.sha1(data).hexdigest()
+                if checksums.get(path) == checksum:
+                    connection.execute("UPDATE simulations SET position = ?, status = ? WHERE path = ?", (position, status, path))
+                    continue
+                connection.execute("INSERT OR REPLACE INTO simulations (path, name, position, checksum, updated, status, data) VALUES (?, ?, ?, ?, ?, ?, ?)", (path, os.path.basename(path), position, checksum, time.time(), status, data))
+                connection.execute("DELETE FROM runs WHERE simulation = ?", (path,))
+                connection.executemany("INSERT INTO runs (simulation, run_number, work_dir, job_id) VALUES (?, ?, ?, ?)", [(path, k, run.get_work_dir(), run._job_id) for k, run in enumerate(simulation.get_runs())])
+                connection.execute("DELETE FROM parameters WHERE simulation = ?", (path,))
+                connection.executemany("INSERT INTO parameters (simulation, name, value) VALUES (?, ?, ?)", [(path, k, str(v.get_value())) for k, v in simulation.current_run.inputs.parameters.items()])
+                hashes = set().union(*[run.inputs.get_source_hashes().values() for run in simulation.get_runs() + [simulation.current_run]])
+                connection.executemany("INSERT OR IGNORE INTO source_templates (hash, data) VALUES (?, ?)", [(content_hash, get_source_cache().get_text(content_hash)) for content_hash in hashes if not content_hash in saved_hashes])
+                saved_hashes.update(hashes)
+            if prune:
+                removed = set(checksums) - {simulation.get_path() for simulation in simulations}
+                for table, column in (("simulations", "path"), ("runs", "simulation"), ("parameters", "simulation")):
+                    connection.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(path,) for path in removed])
+
+    def get_generation(self)->int:
+        """Returns the number of times a group has been saved in this store, used to detect saves by other processes"""
+        with self._connection() as connection:
+            row = connection.execute("SELECT value FROM generation WHERE id = 0").fetchone()
+        return 0 if row is None else row[0]
+
+    def load_state(self)->dict:
+        """Load the group state"""
+        with self._connection() as connection:
+            row = connection.execute("SELECT data FROM group_state WHERE id = 0").fetchone()
+        if row is None:
+            print(f"No simulation group found in {self.file_name}")
+            raise ValueError("FTXPy -> FTXStateStore -> load_state() : No simulation group found")
+        return pk.loads(row[0])
+
+    def save_campaign_state(self, state:dict)->None:
+        """Save the state of the campaign driver of this group"""
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO campaign_state (id, data) VALUES (0, ?)", (pk.dumps(state),))
+
+    def load_campaign_state(self)->dict:
+        """Load the state of the campaign driver of this group, or an empty dict if no campaign has been run"""
+        with self._connection() as connection:
+            row = connection.execute("SELECT data FROM campaign_state WHERE id = 0").fetchone()
+        return dict() if row is None else pk.loads(row[0])
+
+    def load_source_templates(self)->None:
+        """Add the source templates in this store to the source cache, so that simulations do not depend on the current contents of their source directory"""
+        cache = get_source_cache()
+        with self._connection() as connection:
+            hashes = [content_hash for content_hash, in connection.execute("SELECT hash FROM source_templates") if not content_hash in cache]
+            for content_hash in hashes:
+                cache.add_text(connection.execute("SELECT data FROM source_templates WHERE hash = ?", (content_hash,)).fetchone()[0], content_hash)
+        self._source_templates_loaded = True
+
+    def get_simulation_paths(self)->list:
+        """Returns the paths of all simulations in this store"""
+        with self._connection() as connection:
+            return [path for path, in connection.execute("SELECT path FROM simulations ORDER BY position")]
+
+    def get_simulation_names(self)->list:
+        """Returns the names of all simulations in this store, i.e. the base names of their paths"""
+        with self._connection() as connection:
+            return [name for name, in connection.execute("SELECT name FROM simulations ORDER BY position")]
+
+    def _get_path(self, connection, path:str)->str:
+        if connection.execute("SELECT 1 FROM simulations WHERE path = ?", (path,)).fetchone() is not None:
+            return path
+        paths = [path for path, in connection.execute("SELECT path FROM simulations WHERE name = ?", (path,))]
+        if len(paths) == 0:
+            print(f"Simulation {path} not found in {self.file_name}")
+            raise ValueError("FTXPy -> FTXStateStore -> _get_path() : Simulation not found")
+        if len(paths) > 1:
+            print(f"Simulation name {path} is ambiguous in {self.file_name}, use one of the paths {', '.join(paths)}")
+            raise ValueError("FTXPy -> FTXStateStore -> _get_path() : Simulation name is ambiguous")
+        return paths[0]
+
+    def load_simulation(self, path:str):
+        """Load the simulation with the given path, or with the given name if that name is unique"""
+        if not self._source_templates_loaded:
+            self.load_source_templates()
+        with self._connection() as connection:
+            row = connection.execute("SELECT data FROM simulations WHERE path = ?", (self._get_path(connection, path),)).fetchone()
+            return _Unpickler(io.BytesIO(row[0]), connection).load()
+
+    def get_status(self)->dict:
+        """Returns the last known status of all simulations, i.e. their status when the group was last saved, as a dict with simulation paths as keys and status strings as values"""
+        with self._connection() as connection:
+            return dict(connection.execute("SELECT path, status FROM simulations ORDER BY position"))
+
+    def print_status(self)->None:
+        """Prints the last known status of all simulations, without loading them"""
+        for status in self.get_status().values():
+            print(status)
+
+    def get_runs(self, path:str)->list:
+        """Returns the run records of the simulation with the given path or name, as a list of (work dir, job id) tuples"""
+        with self._connection() as connection:
+            return connection.execute("SELECT work_dir, job_id FROM runs WHERE simulation = ? ORDER BY run_number", (self._get_path(connection, path),)).fetchall()
+
+    def get_parameters(self, path:str)->dict:
+        """Returns the parameter values of the simulation with the given path or name, as a dict with parameter names as keys and values as strings"""
+        with self._connection() as connection:
+            return dict(connection.execute("SELECT name, value FROM parameters WHERE simulation = ?", (self._get_path(connection, path),)))
+
+# class that represents a pickler that stores parameter tables separately
+class _Pickler(pk.Pickler):
+
+    def __init__(self, file):
+        super().__init__(file)
+        self.tables = dict() # parameter tables referred to by the pickled object, stored separately
+
+    def persistent_id(self, obj):
+        if isinstance(obj, FTXParameterTable):
+            self.tables[obj._get_key()] = obj
+            return ("parameter_table", obj._get_key())
+        return None
+
+# class that represents an unpickler that loads parameter tables from the store
+class _Unpickler(pk.Unpickler):
+
+    def __init__(self, file, connection):
+        super().__init__(file)
+        self.connection = connection
+
+    def persistent_load(self, pid):
+        _, key = pid
+        table = _tables.get(key) # members are added to the table with the same columns in this process
+        if table is None:
+            row = self.connection.execute("SELECT data FROM parameter_tables WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                print(f"Parameter table {key} not found in the store")
+                raise ValueError("FTXPy -> FTXStateStore -> load_simulation() : Parameter table not found")
+            table = pk.loads(row[0])
+        return table
+
+# function to pickle an object, returns the pickle and the parameter tables it refers to
+def _dumps(obj)->tuple:
+    f = io.BytesIO()
+    pickler = _Pickler(f)
+    pickler.dump(obj)
+    return f.getvalue(), pickler.tables
+
+# function to migrate a store with an older schema to the current schema
+def _migrate(connection, version:int)->None:
+    tables = {table for table, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not "simulations" in tables:
+        return
+    if version >= 1: # simulations are keyed by their path, only the status is missing
+        connection.execute("ALTER TABLE simulations ADD COLUMN status TEXT")
+        return
+    status = "status" if "status" in [column[1] for column in connection.execute("PRAGMA table_info(simulations)")] else "NULL"
+    connection.execute("ALTER TABLE simulations RENAME TO simulations_v0")
+    connection.execute("CREATE TABLE simulations (path TEXT PRIMARY KEY, name TEXT, position INTEGER, checksum TEXT, updated REAL, status TEXT, data BLOB)")
+    connection.execute(f"INSERT OR REPLACE INTO simulations (path, name, position, checksum, updated, status, data) SELECT path, name, position, NULL, updated, {status}, data FROM simulations_v0")
+    for table in ("runs", "parameters"):
+        if table in tables:
+            connection.execute(f"UPDATE {table} SET simulation = (SELECT path FROM simulations_v0 WHERE simulations_v0.name = {table}.simulation)")
+    connection.execute("DROP TABLE simulations_v0")
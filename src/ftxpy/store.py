@@ -0,0 +1,201 @@
+# import statements
+import numpy as np
+import os
+import shutil
+
+# class that represents a columnar store with the results of a group of FTX simulations
+class FTXResultStore():
+    """
+    A class to represent a columnar store with the results of a group of FTX simulations
+
+    The store is a directory of .npy files that are memory-mapped when opened, so
+    that slicing by parameter ranges and time windows only reads the requested data.
+    Every series (surface, retention, content) is stored as one concatenated time
+    column and one value column, with offsets that mark where each simulation starts.
+
+    Methods
+    -------
+    create(path, names, parameters, series)
+        Creates a new result store in the given directory
+    update(path, names, parameters, series)
+        Updates the result store in the given directory, keeping the previous results of simulations without new results
+    get_names()
+        Returns the names of the simulations in this store
+    get_parameter_names()
+        Returns the names of the parameters in this store
+    get_parameters(param_name)
+        Returns the values of the given parameter for all simulations
+    select(**ranges)
+        Returns the indices of the simulations with parameter values in the given ranges
+    get_series(series_name, index, t_min, t_max)
+        Returns the given series of the simulation with the given index, restricted to a time window
+    """
+
+    series_names = ("surface", "retention", "content")
+
+    def __init__(self, path:str):
+        """
+        Constructs all the necessary attributes for the FTXResultStore object
+
+        Parameters
+        ----------
+            path : str
+                The directory of the result store
+        """
+        if not os.path.isdir(path):
+            print(f"Result store {path} does not exist")
+            raise ValueError("FTXPy -> FTXResultStore -> __init__() : Result store does not exist")
+        self.path = path
+        self._names = np.load(os.path.join(path, "names.npy"))
+        self._parameter_names = np.load(os.path.join(path, "parameter_names.npy"))
+        self._parameters = np.load(os.path.join(path, "parameters.npy"), mmap_mode="r")
+        self._series = dict()
+        for series_name in self.series_names:
+            self._series[series_name] = tuple(np.load(os.path.join(path, f"{series_name}_{column}.npy"), mmap_mode="r") for column in ("offsets", "t", "x"))
+
+    def create(path:str, names:list, parameters:list, series:list):
+        """
+        Creates a new result store in the given directory, an existing store is overwritten
+
+            Parameters:
+                path (str): The directory of the result store
+                names (list): The names of the simulations
+                parameters (list): For every simulation, a dict with parameter names as key and FTX parameters as values
+                series (list): For every simulation, a dict with series names as key and (t, x) tuples as values, or None if the simulation has no results
+        """
+        param_names, values = _get_parameter_values(parameters)
+        return FTXResultStore._write(path, names, param_names, values, series)
+
+    def update(path:str, names:list, parameters:list, series:list):
+        """
+        Updates the result store in the given directory, or creates it if it does not exist
+
+        Simulations that have results replace their rows in the store. Simulations without
+        results, e.g. because they could not be postprocessed this time, and simulations
+        that are only in the existing store keep the rows that were stored before.
+
+            Parameters:
+                path (str): The directory of the result store
+                names (list): The names of the simulations
+                parameters (list): For every simulation, a dict with parameter names as key and FTX parameters as values
+                series (list): For every simulation, a dict with series names as key and (t, x) tuples as values, or None if the simulation has no results
+        """
+        if not os.path.isdir(path):
+            return FTXResultStore.create(path, names, parameters, series)
+        previous = FTXResultStore(path)
+        previous_names = {name: i for i, name in enumerate(previous.get_names().tolist())}
+        new_param_names, values = _get_parameter_values(parameters)
+        param_names = sorted(set(new_param_names) | set(previous.get_parameter_names().tolist()))
+        merged_names, merged_values, merged_series = list(), list(), list()
+        for i, name in enumerate(names):
+            row = dict(zip(new_param_names, values[i].tolist()))
+            if series[i] is None and name in previous_names: # keep the previous results
+                row, simulation_series = previous._get_row(previous_names[name])
+            else:
+                simulation_series = series[i]
+            merged_names.append(name)
+            merged_values.append([row.get(param_name, np.nan) for param_name in param_names])
+            merged_series.append(simulation_series)
+        for name, index in previous_names.items():
+            if not name in names:
+                row, simulation_series = previous._get_row(index)
+                merged_names.append(name)
+                merged_values.append([row.get(param_name, np.nan) for param_name in param_names])
+                merged_series.append(simulation_series)
+        merged_values = np.array(merged_values, dtype=np.float64).reshape(len(merged_names), len(param_names))
+        return FTXResultStore._write(path, merged_names, param_names, merged_values, merged_series)
+
+    def _get_row(self, index:int)->tuple:
+        row = dict(zip(self._parameter_names.tolist(), np.asarray(self._parameters[index]).tolist()))
+        series = {series_name: self.get_series(series_name, index) for series_name in self.series_names}
+        return row, series if any(len(t) > 0 for t, _ in series.values()) else None
+
+    def _write(path:str, names:list, param_names:list, values:np.ndarray, series:list):
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "names.npy"), np.array(names, dtype=str))
+        np.save(os.path.join(tmp_path, "parameter_names.npy"), np.array(param_names, dtype=str))
+        np.save(os.path.join(tmp_path, "parameters.npy"), values)
+        for series_name in FTXResultStore.series_names:
+            ts = [np.asarray(s[series_name][0], dtype=np.float64) if s is not None and s.get(series_name) is not None else np.empty(0) for s in series]
+            xs = [np.asarray(s[series_name][1], dtype=np.float64) if s is not None and s.get(series_name) is not None else np.empty(0) for s in series]
+            offsets = np.cumsum([0] + [len(t) for t in ts])
+            np.save(os.path.join(tmp_path, f"{series_name}_offsets.npy"), offsets)
+            np.save(os.path.join(tmp_path, f"{series_name}_t.npy"), np.concatenate(ts) if len(ts) > 0 else np.empty(0))
+            np.save(os.path.join(tmp_path, f"{series_name}_x.npy"), np.concatenate(xs) if len(xs) > 0 else np.empty(0))
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+        return FTXResultStore(path)
+
+    def get_names(self)->np.ndarray:
+        """Returns the names of the simulations in this store"""
+        return self._names
+
+    def get_parameter_names(self)->np.ndarray:
+        """Returns the names of the parameters in this store"""
+        return self._parameter_names
+
+    def _get_parameter_index(self, param_name:str)->int:
+        indices = np.flatnonzero(self._parameter_names == param_name)
+        if len(indices) == 0:
+            print(f"Parameter {param_name} is not in the result store")
+            raise ValueError("FTXPy -> FTXResultStore -> get_parameters() : Parameter is not in the result store")
+        return indices[0]
+
+    def get_parameters(self, param_name:str)->np.ndarray:
+        """Returns the values of the given parameter for all simulations"""
+        return np.asarray(self._parameters[:, self._get_parameter_index(param_name)])
+
+    def select(self, **ranges)->np.ndarray:
+        """
+        Returns the indices of the simulations with parameter values in the given ranges
+
+            Parameters:
+                ranges: Keyword arguments of the form param_name=(lower, upper), use None for an open bound
+
+            Example:
+                store.select(SBV_W=(8.0, 9.0), EF_W=(None, 1.0))
+        """
+        mask = np.ones(len(self._names), dtype=bool)
+        for param_name, (lower, upper) in ranges.items():
+            values = self.get_parameters(param_name)
+            if lower is not None:
+                mask &= values >= lower
+            if upper is not None:
+                mask &= values <= upper
+        return np.flatnonzero(mask)
+
+    def get_series(self, series_name:str, index:int, t_min:float=None, t_max:float=None)->tuple:
+        """
+        Returns the given series of the simulation with the given index, restricted to a time window
+
+            Parameters:
+                series_name (str): One of 'surface', 'retention' or 'content'
+                index (int): The index of the simulation
+                t_min (float): The start of the time window, or None
+                t_max (float): The end of the time window, or None
+        """
+        if not series_name in self._series:
+            print(f"Invalid series name {series_name}: expected one of {', '.join(self.series_names)}")
+            raise ValueError("FTXPy -> FTXResultStore -> get_series() : Invalid series name")
+        offsets, t, x = self._series[series_name]
+        start, stop = offsets[index], offsets[index + 1]
+        t_sim = t[start:stop] # times of a simulation are sorted
+        lo = 0 if t_min is None else np.searchsorted(t_sim, t_min, side="left")
+        hi = len(t_sim) if t_max is None else np.searchsorted(t_sim, t_max, side="right")
+        return np.asarray(t_sim[lo:hi]), np.asarray(x[start + lo:start + hi])
+
+# function to collect the numeric parameter values of a list of simulations in a 2D array
+def _get_parameter_values(parameters:list)->tuple:
+    param_names = sorted({k for params in parameters for k, v in params.items() if _is_numeric(v.get_value())})
+    values = np.full((len(parameters), len(param_names)), np.nan)
+    for i, params in enumerate(parameters):
+        for j, param_name in enumerate(param_names):
+            if param_name in params and _is_numeric(params[param_name].get_value()):
+                values[i, j] = params[param_name].get_value()
+    return param_names, values
+
+# function to check if a parameter value can be stored in a numeric column
+def _is_numeric(value)->bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
@@ -0,0 +1,458 @@
+# import statements
+import copy
+import hashlib
+import numpy as np
+import pickle as pk
+import threading
+import weakref
+
+# special imports
+from collections.abc import MutableMapping
+from .parameter import FTXParameter
+
+# class that represents an array-backed table with the parameters of an ensemble of FTX simulations
+class FTXParameterTable():
+    """
+    A class to represent an array-backed table with the parameters of an ensemble of FTX simulations
+
+    Names, descriptions, bounds and transforms are stored once for the whole table, and
+    the values of every member are stored in a row of a NumPy array (numeric parameters)
+    or of an object array (all other parameters). 'get_member' returns a dict-like view
+    on one row that can be used as the parameters of an FTXInput, and whose items keep
+    the FTXParameter API. Deep copies of a member (e.g. in 'FTXSimulation.restart') add
+    a row to the same table, and pickled members are added back to a table with the
+    same columns when they are loaded, so that members share the column data. A member
+    is pickled as its table (which only pickles its columns, once per pickle) and the
+    values of its row. The rows added by copies and loads are freed when the last view
+    on them is garbage collected, and are reused by later copies, so that repeated
+    copies (e.g. in 'FTXGroup.submit') do not grow the table. Freed rows hold NaN (or
+    None) in 'get_values' until they are reused. The view counts are updated under a
+    lock, since views may be created and collected in several threads at once (e.g. in
+    the executor threads of an FTXCampaign).
+
+    Methods
+    -------
+    get_parameter_names()
+        Returns the names of the parameters in this table
+    get_size()
+        Returns the number of rows in use in this table
+    add_members(n)
+        Adds n members with the nominal values and returns their views
+    get_member(row)
+        Returns a dict-like view on the given row of this table
+    get_values(name)
+        Returns the values of the given parameter for all rows
+    set_values(name, values, rows)
+        Sets the values of the given parameter for the given rows
+    check_bounds()
+        Checks if the values of all parameters fall between their lower and upper bound
+    """
+
+    def __init__(self, parameters:dict, n_members:int=0):
+        """
+        Constructs all the necessary attributes for the FTXParameterTable object
+
+        Parameters
+        ----------
+            parameters : dict
+                A dict with parameter names as keys and FTX parameters as values, e.g. config["input"]["parameters"]
+            n_members : int (keyword argument)
+                The number of members to add, with the current values of the given parameters
+        """
+        params = list(parameters.values())
+        self._init_columns([param.get_name() for param in params], [param.description for param in params], [param.nominal for param in params],
+                           [param.lower for param in params], [param.upper for param in params], [param.log10_transform for param in params])
+        self.add_members(n_members, [param.get_value() for param in params])
+        _tables[self._get_key()] = self
+
+    def _init_columns(self, names, descriptions, nominals, lowers, uppers, log10_transforms)->None:
+        self.names = np.array(list(names), dtype=object)
+        self._columns = {name: j for j, name in enumerate(self.names)}
+        self.descriptions = np.array(list(descriptions), dtype=object)
+        self.nominals = list(nominals)
+        self._numeric = np.array([_is_numeric(nominal) and _is_numeric(lower) and _is_numeric(upper) for nominal, lower, upper in zip(nominals, lowers, uppers)], dtype=bool)
+        self.lower = np.array([lower if numeric else np.nan for lower, numeric in zip(lowers, self._numeric)], dtype=float)
+        self.upper = np.array([upper if numeric else np.nan for upper, numeric in zip(uppers, self._numeric)], dtype=float)
+        self.log10_transform = np.array([bool(log10_transform) for log10_transform in log10_transforms], dtype=bool)
+        self._deterministic = np.array([not numeric or lower == upper for lower, upper, numeric in zip(lowers, uppers, self._numeric)], dtype=bool) # bounds follow the value
+        self._object_index = np.cumsum(~self._numeric) - 1 # column in the object array of non-numeric parameters
+        self._values = np.full((0, len(self.names)), np.nan)
+        self._is_int = np.zeros((0, len(self.names)), dtype=bool) # keeps the type of integer values for rendering
+        self._objects = np.empty((0, int(np.sum(~self._numeric))), dtype=object)
+        self._n = 0
+        self._refs = list() # number of views on every row, rows of copies are freed when it drops to zero
+        self._owned = list() # rows added by 'add_members', these are never freed
+        self._free = list() # freed rows that can be reused
+        self._lock = threading.RLock() # guards the rows in use, reentrant since a view can be collected while a row is added
+        self._key = None
+
+    def _get_key(self)->str: # identifies the columns of this table when members are pickled
+        if self._key is None:
+            self._key = hashlib.sha1(pk.dumps(self._get_columns())).hexdigest()
+        return self._key
+
+    def _get_columns(self)->tuple:
+        lowers = [_to_python(self.lower[j], self.nominals[j]) if self._numeric[j] else self.nominals[j] for j in range(len(self.names))]
+        uppers = [_to_python(self.upper[j], self.nominals[j]) if self._numeric[j] else self.nominals[j] for j in range(len(self.names))]
+        return (self.names.tolist(), self.descriptions.tolist(), self.nominals, lowers, uppers, self.log10_transform.tolist())
+
+    def get_parameter_names(self)->list:
+        """Returns the names of the parameters in this table"""
+        return self.names.tolist()
+
+    def get_size(self)->int:
+        """Returns the number of rows in use in this table"""
+        return self._n - len(self._free)
+
+    def _get_used_rows(self)->np.ndarray:
+        used = np.ones(self._n, dtype=bool)
+        used[self._free] = False
+        return np.flatnonzero(used)
+
+    def _reserve(self, n:int)->None:
+        capacity = len(self._values)
+        if self._n + n <= capacity:
+            return
+        capacity = max(self._n + n, 2 * capacity, 16)
+        values = np.full((capacity, len(self.names)), np.nan)
+        values[:self._n] = self._values[:self._n]
+        is_int = np.zeros((capacity, len(self.names)), dtype=bool)
+        is_int[:self._n] = self._is_int[:self._n]
+        objects = np.empty((capacity, self._objects.shape[1]), dtype=object)
+        objects[:self._n] = self._objects[:self._n]
+        self._values, self._is_int, self._objects = values, is_int, objects
+
+    def _append_row(self, values, is_int, objects, owned:bool=False)->int:
+        with self._lock:
+            if len(self._free) > 0 and not owned:
+                row = self._free.pop()
+            else:
+                self._reserve(1)
+                row = self._n
+                self._n += 1
+                self._refs.append(0)
+                self._owned.append(owned)
+            self._values[row] = values
+            self._is_int[row] = is_int
+            self._objects[row] = objects
+        return row
+
+    def _acquire(self, row:int)->None:
+        with self._lock:
+            self._refs[row] += 1
+
+    def _release(self, row:int)->None:
+        with self._lock:
+            self._refs[row] -= 1
+            if self._refs[row] == 0 and not self._owned[row]:
+                self._values[row] = np.nan
+                self._objects[row] = None # do not keep the values of a discarded copy alive
+                self._free.append(row)
+
+    def add_members(self, n:int, values:list=None)->list:
+        """
+        Adds n members with the nominal values and returns their views
+
+            Parameters:
+                n (int): The number of members to add
+                values (list): The values of the new members, one for every parameter, by default the nominal values
+        """
+        if n < 1:
+            return list()
+        values = self.nominals if values is None else values
+        self._reserve(n)
+        row = self._append_row(np.nan, False, None, owned=True)
+        for j, value in enumerate(values):
+            self._set(row, j, value)
+        for _ in range(n - 1):
+            self._append_row(self._values[row], self._is_int[row], self._objects[row], owned=True)
+        return [self.get_member(k) for k in range(row, row + n)]
+
+    def get_member(self, row:int):
+        """Returns a dict-like view on the given row of this table, that can be used as the parameters of an FTXInput"""
+        if row < 0 or row >= self._n or row in self._free:
+            print(f"Invalid row {row}: expected a row in use between 0 and {self._n - 1}")
+            raise ValueError("FTXPy -> FTXParameterTable -> get_member() : Invalid row specified")
+        return FTXParameterSet(self, row)
+
+    def _copy_row(self, row:int)->int:
+        return self._append_row(self._values[row].copy(), self._is_int[row].copy(), self._objects[row].copy())
+
+    def _get_column(self, name:str)->int:
+        if not name in self._columns:
+            print(f"Parameter {name} is not in the parameter table")
+            raise ValueError("FTXPy -> FTXParameterTable -> get_values() : Parameter is not in the parameter table")
+        return self._columns[name]
+
+    def _get(self, row:int, j:int):
+        if not self._numeric[j]:
+            return self._objects[row, self._object_index[j]]
+        value = self._values[row, j]
+        return int(value) if self._is_int[row, j] else float(value)
+
+    def _set(self, row:int, j:int, value)->None:
+        if not self._numeric[j]:
+            self._objects[row, self._object_index[j]] = value
+            return
+        if not _is_numeric(value):
+            print(f"Invalid value specified for parameter {self.names[j]}: expected a number, got {value}")
+            raise ValueError("FTXPy -> FTXParameterTable -> set_value() : Invalid value specified")
+        self._values[row, j] = value
+        self._is_int[row, j] = isinstance(value, (int, np.integer))
+
+    def _get_bounds(self, row:int, j:int)->tuple:
+        if self._deterministic[j]:
+            value = self._get(row, j)
+            return value, value
+        return _to_python(self.lower[j], self.nominals[j]), _to_python(self.upper[j], self.nominals[j])
+
+    def get_values(self, name:str)->np.ndarray:
+        """Returns the values of the given parameter for all rows, as a float array for numeric parameters and an object array otherwise"""
+        j = self._get_column(name)
+        if self._numeric[j]:
+            return self._values[:self._n, j].copy()
+        return self._objects[:self._n, self._object_index[j]].copy()
+
+    def set_values(self, name:str, values, rows=None)->None:
+        """
+        Sets the values of the given parameter for the given rows
+
+            Parameters:
+                name (str): The name of the parameter
+                values (np.ndarray): The new values
+                rows (np.ndarray): The rows to update, by default all rows in use
+        """
+        j = self._get_column(name)
+        rows = self._get_used_rows() if rows is None else np.asarray(rows)
+        if not self._numeric[j]:
+            self._objects[rows, self._object_index[j]] = values
+            return
+        values = np.broadcast_to(np.asarray(values), rows.shape)
+        if not np.issubdtype(values.dtype, np.number) or np.issubdtype(values.dtype, np.bool_):
+            print(f"Invalid values specified for parameter {name}: expected numbers")
+            raise ValueError("FTXPy -> FTXParameterTable -> set_values() : Invalid values specified")
+        if not self._deterministic[j]:
+            self._check_column(j, values, rows)
+        self._values[rows, j] = values
+        self._is_int[rows, j] = np.issubdtype(values.dtype, np.integer)
+
+    def _check_column(self, j:int, values:np.ndarray, rows:np.ndarray)->None:
+        invalid = np.flatnonzero(~((values >= self.lower[j]) & (values <= self.upper[j])))
+        if len(invalid) > 0:
+            print(f"Invalid value specified for parameter {self.names[j]} in row {rows[invalid[0]]}: expected value between {self.lower[j]} (lower bound) and {self.upper[j]} (upper bound), got {values[invalid[0]]} ({len(invalid)} invalid values)")
+            raise ValueError("FTXPy -> FTXParameterTable -> check_bounds() : Invalid value specified")
+
+    def check_bounds(self)->None:
+        """Checks if the values of all parameters fall between their lower and upper bound, for all rows at once"""
+        columns = np.flatnonzero(self._numeric & ~self._deterministic)
+        rows = self._get_used_rows()
+        values = self._values[np.ix_(rows, columns)]
+        invalid = ~((values >= self.lower[columns]) & (values <= self.upper[columns]))
+        if np.any(invalid):
+            row, k = np.argwhere(invalid)[0]
+            self._check_column(columns[k], values[:, k], rows)
+
+    def __reduce__(self): # only the columns, the values are pickled with the members
+        return (_load_table, (self._get_key(), self._get_columns()))
+
+# class that represents a dict-like view on one row of an FTX parameter table
+class FTXParameterSet(MutableMapping):
+    """
+    A class to represent a dict-like view on one row of an FTX parameter table
+
+    Items are FTXParameterView objects. Assigning an FTX parameter to a name that is in
+    the table sets the value in the table, other parameters are kept in this view.
+    """
+
+    __slots__ = ("_table", "_row", "_extra")
+
+    def __init__(self, table:FTXParameterTable, row:int, extra:dict=None):
+        self._table = table
+        self._row = row
+        self._extra = dict() if extra is None else extra # parameters that are not in the table
+        table._acquire(row)
+
+    def __del__(self):
+        try:
+            self._table._release(self._row)
+        except (AttributeError, TypeError): # not fully constructed, or interpreter shutdown
+            pass
+
+    def get_table(self)->FTXParameterTable:
+        """Returns the parameter table of this view"""
+        return self._table
+
+    def get_row(self)->int:
+        """Returns the row of this view in its parameter table"""
+        return self._row
+
+    def __getitem__(self, name:str):
+        if name in self._extra:
+            return self._extra[name]
+        if not name in self._table._columns:
+            raise KeyError(name)
+        return FTXParameterView(self, self._table._columns[name])
+
+    def __setitem__(self, name:str, param)->None:
+        if name in self._table._columns and name not in self._extra:
+            j = self._table._columns[name]
+            value = param.get_value()
+            if not self._table._deterministic[j]:
+                FTXParameterView(self, j).check_bounds(value)
+            self._table._set(self._row, j, value)
+        else:
+            self._extra[name] = param
+
+    def __delitem__(self, name:str)->None:
+        if not name in self._extra:
+            print(f"Parameter {name} is stored in the parameter table and cannot be deleted")
+            raise ValueError("FTXPy -> FTXParameterSet -> __delitem__() : Parameter cannot be deleted")
+        del self._extra[name]
+
+    def __iter__(self):
+        yield from self._table.names
+        yield from (name for name in self._extra if name not in self._table._columns)
+
+    def __len__(self)->int:
+        return len(self._table.names) + sum(1 for name in self._extra if name not in self._table._columns)
+
+    def __contains__(self, name)->bool:
+        return name in self._extra or name in self._table._columns
+
+    def __deepcopy__(self, memo:dict):
+        return FTXParameterSet(self._table, self._table._copy_row(self._row), copy.deepcopy(self._extra, memo)) # a new row in the same table
+
+    def __reduce__(self):
+        table = self._table
+        row = (table._values[self._row].copy(), table._is_int[self._row].copy(), table._objects[self._row].copy())
+        return (_load_row, (table, row, self._extra))
+
+# class that represents one parameter in a row of an FTX parameter table
+class FTXParameterView():
+    """
+    A class to represent one parameter in a row of an FTX parameter table, with the same methods as FTXParameter
+
+    Methods
+    -------
+    check_bounds(value):
+        Checks if the given parameter falls between the lower and upper bound
+    get_name()
+        Returns the name of this parameter
+    get_value()
+        Returns the current value of this parameter
+    set_value(value)
+        Sets the value of this parameter to the given value
+    set_random_value(value)
+        Sets the value of this parameter to a random value sampled according to a uniform law between the lower and upper bound
+    """
+
+    __slots__ = ("_member", "_column")
+
+    def __init__(self, member:FTXParameterSet, column:int):
+        self._member = member
+        self._column = column
+
+    @property
+    def name(self)->str:
+        return self._member._table.names[self._column]
+
+    @property
+    def description(self)->str:
+        return self._member._table.descriptions[self._column]
+
+    @property
+    def nominal(self):
+        return self._member._table.nominals[self._column]
+
+    @property
+    def value(self):
+        return self.get_value()
+
+    @property
+    def lower(self):
+        return self._member._table._get_bounds(self._member._row, self._column)[0]
+
+    @property
+    def upper(self):
+        return self._member._table._get_bounds(self._member._row, self._column)[1]
+
+    @property
+    def log10_transform(self):
+        return bool(self._member._table.log10_transform[self._column])
+
+    def check_bounds(self, value)->None:
+        """Checks if the given parameter falls between the lower and upper bound"""
+        if self._member._table._deterministic[self._column]:
+            return # bounds follow the value
+        lower, upper = self.lower, self.upper
+        if not (value >= lower and value <= upper):
+            print(f"Invalid value specified for parameter {self.name}: expected value between {lower} (lower bound) and {upper} (upper bound), got {value}")
+            raise ValueError("FTXPy -> FTXParameter -> check_bounds() : Invalid value specified")
+
+    def get_name(self)->str:
+        """Returns the name of this parameter"""
+        return self.name
+
+    def get_value(self):
+        """Returns the current value of this parameter"""
+        return self._member._table._get(self._member._row, self._column)
+
+    def set_value(self, value)->None:
+        """
+        Sets the value of this parameter to the given value
+
+            Parameters:
+                value (float): The new vaue for this parameter
+        """
+        self.check_bounds(value)
+        self._member._table._set(self._member._row, self._column, value)
+
+    def set_random_value(self)->None:
+        """Sets the value of this parameter to a random value sampled according to a uniform law between the lower and upper bound"""
+        a = self.lower
+        b = self.upper
+        if self.log10_transform:
+            a = np.log10(a)
+            b = np.log10(b)
+        value = np.random.rand() * (b - a) + a
+        if self.log10_transform:
+            value = 10**value
+        self._member._table._set(self._member._row, self._column, float(value))
+
+    def to_parameter(self)->FTXParameter:
+        """Returns a standalone FTX parameter with the same attributes as this parameter"""
+        param = FTXParameter(self.name, description=self.description, value=self.nominal, lower=self.lower if not self._member._table._deterministic[self._column] else None, upper=self.upper if not self._member._table._deterministic[self._column] else None, log10_transform=self.log10_transform)
+        param.value = self.get_value()
+        return param
+
+    def __repr__(self)->str:
+        return f"FTXParameterView({self.name}={self.get_value()!r})"
+
+# tables that members are added to when they are loaded, by column key
+_tables = weakref.WeakValueDictionary()
+
+# function to load a pickled table, members are added to the table with the same columns if there is one
+def _load_table(key:str, columns:tuple)->FTXParameterTable:
+    table = _tables.get(key)
+    if table is None:
+        table = FTXParameterTable.__new__(FTXParameterTable)
+        table._init_columns(*columns)
+        table._key = key
+        _tables[key] = table
+    return table
+
+# function to load a pickled member into its table
+def _load_row(table:FTXParameterTable, row:tuple, extra:dict)->FTXParameterSet:
+    return FTXParameterSet(table, table._append_row(*row), extra)
+
+# function to load a member pickled with its columns, by versions that did not pickle the table
+def _load_member(key:str, columns:tuple, row:tuple, extra:dict)->FTXParameterSet:
+    return _load_row(_load_table(key, columns), row, extra)
+
+# function to check if a value can be stored in a numeric column
+def _is_numeric(value)->bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+# function to convert a bound back to the type of the nominal value
+def _to_python(value:float, nominal):
+    return int(value) if isinstance(nominal, (int, np.integer)) and float(value).is_integer() else float(value)
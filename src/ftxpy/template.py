@@ -0,0 +1,87 @@
+# import statements
+import re
+
+# class that represents a compiled text template with {name} placeholders
+class Template():
+    """
+    A class to represent a compiled text template with {name} placeholders
+
+    Methods
+    -------
+    get_references()
+        Returns the set of placeholder names that occur in this template
+    render(values)
+        Returns the text of this template with placeholders replaced by the given values
+    """
+
+    _pattern = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+    def __init__(self, text:str):
+        """
+        Constructs all the necessary attributes for the Template object
+
+        Parameters
+        ----------
+            text : str
+                The text to compile
+        """
+        self._literals = list() # literal text before each placeholder, and after the last one
+        self._names = list() # placeholder names, in order of appearance
+        start = 0
+        for match in self._pattern.finditer(text):
+            self._literals.append(text[start:match.start()])
+            self._names.append(match.group(1))
+            start = match.end()
+        self._literals.append(text[start:])
+        self._references = set(self._names)
+
+    def get_references(self)->set:
+        """Returns the set of placeholder names that occur in this template"""
+        return self._references
+
+    def render(self, values:dict)->str:
+        """
+        Returns the text of this template with placeholders replaced by the given values
+
+            Parameters:
+                values (dict): A dict with placeholder names as keys and replacement strings as values, placeholders not in this dict are left untouched
+        """
+        if len(self._names) == 0:
+            return self._literals[0]
+        segments = list()
+        for literal, name in zip(self._literals, self._names):
+            segments.append(literal)
+            segments.append(values[name] if name in values else "{" + name + "}")
+        segments.append(self._literals[-1])
+        return "".join(segments)
+
+# function to resolve parameter values that refer to other parameters
+def resolve_parameters(parameters:dict, names)->dict:
+    """
+    Return a dict with the fully rendered string value of the given parameter names
+
+        Parameters:
+            parameters (dict): A dict with parameter names as key and FTX parameters as values
+            names (iterable): The names of the parameters to resolve, names that are not parameters are ignored
+    """
+    resolved = dict()
+    visiting = list()
+
+    def resolve(name):
+        if name in resolved:
+            return resolved[name]
+        if name in visiting:
+            cycle = " -> ".join(visiting[visiting.index(name):] + [name])
+            print(f"Circular reference between parameters: {cycle}")
+            raise ValueError("FTXPy -> resolve_parameters() : Circular reference between parameters")
+        visiting.append(name)
+        template = Template(str(parameters[name].get_value()))
+        values = {ref: resolve(ref) for ref in template.get_references() if ref in parameters}
+        visiting.pop()
+        resolved[name] = template.render(values)
+        return resolved[name]
+
+    for name in names:
+        if name in parameters:
+            resolve(name)
+    return resolved
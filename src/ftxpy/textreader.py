@@ -0,0 +1,149 @@
+# import statements
+import io
+import numpy as np
+import os
+import time
+import warnings
+
+# class that represents a reader for whitespace-separated text files with a fixed number of columns
+class TextReader():
+    """
+    A class to represent a reader for whitespace-separated text files with a fixed number of columns
+
+    Files are parsed with np.loadtxt, which is implemented in C since numpy 1.23 and is
+    as fast as a chunked np.fromstring parser (see examples/benchmark_text_reader.py).
+    Files are streamed to the parser in blocks, so only the parsed array is held in memory.
+    Lines starting with '#' are ignored, and a last line without a newline (as left behind
+    by a running or killed job) is dropped unless the file is known to be complete, since
+    it may have been cut off in the middle of a number.
+
+    Methods
+    -------
+    read(file_name, complete)
+        Returns the contents of the given file as a 2D float64 array
+    get_throughput()
+        Returns the parse throughput (in MB/s) over all files read so far
+    print_throughput()
+        Prints the parse throughput over all files read so far
+    get_stats()
+        Returns the parse statistics
+    add_stats(stats)
+        Adds the given parse statistics, e.g. of another process
+    reset()
+        Resets the parse statistics
+    """
+
+    def __init__(self):
+        """Constructs all the necessary attributes for the TextReader object"""
+        self.reset()
+
+    def reset(self)->None:
+        """Resets the parse statistics"""
+        self.files_read = 0
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.seconds = 0.0
+
+    def read(self, file_name:str, complete:bool=False)->np.ndarray:
+        """
+        Returns the contents of the given file as a 2D float64 array
+
+            Parameters:
+                file_name (str): The name of the file to read
+                complete (bool): If True, the file is no longer written to and a last line without a newline is kept
+        """
+        start = time.perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning) # files without data
+            if complete:
+                file_size = os.path.getsize(file_name)
+                array = np.loadtxt(file_name, dtype=np.float64, ndmin=2)
+            else:
+                with open(file_name, "rb", buffering=0) as f:
+                    file_size = os.fstat(f.fileno()).st_size # the file may be appended to while it is read
+                    array = np.loadtxt(io.BufferedReader(_BoundedFile(f, _find_last_newline(f, file_size)), _block_size), dtype=np.float64, ndmin=2)
+        if array.size == 0:
+            array = np.empty((0, 0), dtype=np.float64)
+        self.files_read += 1
+        self.bytes_read += file_size
+        self.rows_read += array.shape[0]
+        self.seconds += time.perf_counter() - start
+        return array
+
+    def get_throughput(self)->float:
+        """Returns the parse throughput (in MB/s) over all files read so far"""
+        return self.bytes_read / 1e6 / self.seconds if self.seconds > 0 else 0.0
+
+    def print_throughput(self)->None:
+        """Prints the parse throughput over all files read so far"""
+        print(f"Parsed {self.files_read} file(s), {self.rows_read} row(s), {self.bytes_read / 1e6:.1f} MB in {self.seconds:.2f} s ({self.get_throughput():.1f} MB/s)")
+
+    def get_stats(self)->tuple:
+        """Returns the parse statistics, as a tuple with the number of files, bytes and rows read and the number of seconds spent"""
+        return (self.files_read, self.bytes_read, self.rows_read, self.seconds)
+
+    def add_stats(self, stats:tuple)->None:
+        """
+        Adds the given parse statistics, e.g. of another process
+
+            Parameters:
+                stats (tuple): Parse statistics as returned by 'get_stats'
+        """
+        self.files_read += stats[0]
+        self.bytes_read += stats[1]
+        self.rows_read += stats[2]
+        self.seconds += stats[3]
+
+# size of the blocks in which files are streamed to the parser
+_block_size = 1 << 22
+
+# class that represents a file that can only be read up to a given offset
+class _BoundedFile(io.RawIOBase):
+
+    def __init__(self, f, end:int):
+        self._f = f
+        self._remaining = end
+
+    def readable(self)->bool:
+        return True
+
+    def readinto(self, buffer)->int:
+        n = min(len(buffer), self._remaining)
+        if n <= 0:
+            return 0
+        n = self._f.readinto(memoryview(buffer)[:n])
+        self._remaining -= n
+        return n
+
+# function to find the offset after the last newline in the first file_size bytes of a file
+def _find_last_newline(f, file_size:int)->int:
+    end = file_size
+    while end > 0:
+        start = max(0, end - 65536)
+        f.seek(start)
+        block = f.read(end - start)
+        k = block.rfind(b"\n")
+        if k >= 0:
+            f.seek(0)
+            return start + k + 1
+        end = start
+    f.seek(0)
+    return 0
+
+# shared reader, used for all Xolotl text outputs
+_text_reader = TextReader()
+
+# function to return the shared text reader
+def get_text_reader()->TextReader:
+    """Returns the text reader that is shared by all FTX outputs"""
+    return _text_reader
+
+# function to read a whitespace-separated text file with a fixed number of columns
+def read_columns(file_name:str)->np.ndarray:
+    """Returns the contents of the given file as a 2D float64 array, using the shared text reader, a last line without a newline is dropped"""
+    return _text_reader.read(file_name)
+
+# function to read a whitespace-separated text file with a fixed number of columns that is no longer written to
+def read_complete_columns(file_name:str)->np.ndarray:
+    """Returns the contents of the given file as a 2D float64 array, using the shared text reader, a last line without a newline is kept"""
+    return _text_reader.read(file_name, complete=True)
@@ -1,10 +1,12 @@
 # import statements
+import hashlib
 import os
 import pickle as pk
 import toml
 
 # special imports
 from .parameter import FTXParameter
+from collections import deque
 from contextlib import contextmanager
 
 # context manager to change the working directory
@@ -48,15 +50,122 @@ def get_last_occurance(file_contents:list, search_str:str)->int:
         return -1
     return max(lines)
 
+# generator that yields the lines of a file in reverse order
+def reverse_lines(file_name:str, chunk_size:int=1 << 16):
+    """Yield the lines of a given file from the last line to the first, reading the file backwards in chunks"""
+    with open(file_name, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        head = b"" # incomplete first line of the previous chunk
+        first_chunk = True
+        while position > 0:
+            size = min(chunk_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + head).split(b"\n")
+            head = lines.pop(0)
+            if first_chunk and len(lines) > 0 and lines[-1] == b"": # file ends with a newline
+                lines.pop()
+            first_chunk = False
+            for line in reversed(lines):
+                yield line.decode(errors="replace") + "\n"
+        if len(head) > 0 or not first_chunk:
+            yield head.decode(errors="replace") + "\n"
+
+# return the lines that correspond to the last lines containing given search strings
+def get_last_occurances(file_name:str, search_strs:list, n_after:int=0)->dict:
+    """
+    Return the last line that contains each of the given search strings in a given file, together with the lines that follow it
+
+        Parameters:
+            file_name (str): The name of the file
+            search_strs (list): The strings to search for
+            n_after (int): The number of lines following each match to return
+
+        Returns:
+            matches (dict): A dict with the search strings that were found as keys and a list with the matching line and up to 'n_after' following lines as values
+    """
+    matches = dict()
+    following = deque(maxlen=n_after) # lines following the current line, nearest first
+    for line in reverse_lines(file_name):
+        for search_str in search_strs:
+            if search_str not in matches and search_str in line:
+                matches[search_str] = [line] + list(following)
+        if len(matches) == len(search_strs):
+            break # stop as soon as every search string has been found
+        if n_after > 0:
+            following.appendleft(line)
+    return matches
+
+# compiled configurations, with (content hash, case, profile) keys
+_config_cache = dict()
+
+# allowed keys of a parameter in a configuration file
+_parameter_keys = ("description", "value", "lower", "upper", "log10_transform")
+
 # function to parse a toml file into parameters, slurm settings and a list of commands
-def parse(config_file:str, case="PISCES", profile="debug"):
-    """Parse a configuration file for a given case and profile"""
+def parse(config_file:str, case="PISCES", profile="debug", cache:bool=True):
+    """
+    Parse a configuration file for a given case and profile
+
+    The configuration file is loaded, checked and overlaid with the case and profile only
+    once for every combination of file contents, case and profile. Every call returns its
+    own copy of the configuration, with shallow copies of the cached FTX parameters.
+    The 'input.staging' table is optional and defaults to an empty table.
+
+        Parameters:
+            config_file (str): The name of the configuration file
+            case (str): The name of the case in 'input.cases'
+            profile (str): The name of the profile in 'profiles'
+            cache (bool): If False, the file is parsed again and the cache is not used
+
+        Returns:
+            config (dict): The configuration, with the parameters in config["input"]["parameters"]
+    """
 
     # parse toml file
-    config = toml.load(config_file)
+    with open(config_file, "rb") as f:
+        contents = f.read()
+    key = (hashlib.sha256(contents).hexdigest(), case, profile)
+    if not cache or not key in _config_cache:
+        config = _compile(toml.loads(contents.decode()), config_file, case, profile)
+        if not cache:
+            return config
+        _config_cache[key] = config
+
+    # copy the compiled configuration, shallow copies of the parameters suffice since set_value replaces their value
+    config = _config_cache[key]
+    config_copy = _copy_tree(config, skip=config["input"]["parameters"])
+    config_copy["input"]["parameters"] = {name: _copy_parameter(param) for name, param in config["input"]["parameters"].items()}
+
+    return config_copy
+
+# function to clear the cache of compiled configuration files
+def clear_config_cache()->None:
+    """Clear the cache of compiled configuration files used by 'parse'"""
+    _config_cache.clear()
+
+# function to copy the dicts and lists of a parsed toml file, the values are immutable
+def _copy_tree(tree, skip=None):
+    if tree is skip:
+        return None
+    if isinstance(tree, dict):
+        return {k: _copy_tree(v, skip) for k, v in tree.items()}
+    if isinstance(tree, list):
+        return [_copy_tree(v, skip) for v in tree]
+    return tree
+
+# function to make a shallow copy of a parameter, without the overhead of copy.copy
+def _copy_parameter(param:FTXParameter)->FTXParameter:
+    param_copy = object.__new__(type(param))
+    param_copy.__dict__.update(param.__dict__)
+    return param_copy
+
+# function to check a configuration and apply the case and profile
+def _compile(config:dict, config_file:str, case:str, profile:str)->dict:
 
     # input checking
-    # TODO
+    _check_config(config, config_file, case, profile)
 
     # update case-specific parameters
     for k, v in config["input"]["cases"][case]["parameters"].items():
@@ -70,10 +179,39 @@ def parse(config_file:str, case="PISCES", profile="debug"):
     for k, v in config["profiles"][profile]["batchscript"]["slurm_settings"].items():
         config["batchscript"]["slurm_settings"][k] = v
 
+    # staging modes are optional
+    config["input"].setdefault("staging", dict())
+
     # parse parameters
     parameters = dict()
     for k, v in config["input"]["parameters"].items():
         parameters[k] = FTXParameter(name=k, **v)
     config["input"]["parameters"] = parameters
 
-    return config
\ No newline at end of file
+    return config
+
+# function to check the layout of a configuration
+def _check_config(config:dict, config_file:str, case:str, profile:str)->None:
+    for keys in (("input", "parameters"), ("input", "source"), ("input", "cases", case, "parameters"), ("batchscript", "slurm_settings"),
+                 ("batchscript", "commands"), ("profiles", profile, "input", "parameters"), ("profiles", profile, "batchscript", "slurm_settings")):
+        table = config
+        for k, key in enumerate(keys):
+            if not isinstance(table, dict) or not key in table:
+                print(f"Invalid configuration file {config_file}: missing '{'.'.join(keys[:k + 1])}'")
+                raise ValueError("FTXPy -> utils -> parse() : Invalid configuration file")
+            table = table[key]
+    parameters = config["input"]["parameters"]
+    for name, param in parameters.items():
+        if not isinstance(param, dict) or not "value" in param:
+            print(f"Invalid configuration file {config_file}: parameter {name} has no value")
+            raise ValueError("FTXPy -> utils -> parse() : Invalid configuration file")
+        unknown = [key for key in param if not key in _parameter_keys]
+        if len(unknown) > 0:
+            print(f"Invalid configuration file {config_file}: unknown keys {', '.join(unknown)} for parameter {name}, expected one of {', '.join(_parameter_keys)}")
+            raise ValueError("FTXPy -> utils -> parse() : Invalid configuration file")
+    overlays = {f"input.cases.{case}.parameters": config["input"]["cases"][case]["parameters"], f"profiles.{profile}.input.parameters": config["profiles"][profile]["input"]["parameters"]}
+    for section, overlay in overlays.items():
+        unknown = [name for name in overlay if not name in parameters]
+        if len(unknown) > 0:
+            print(f"Invalid configuration file {config_file}: unknown parameters {', '.join(unknown)} in '{section}'")
+            raise ValueError("FTXPy -> utils -> parse() : Invalid configuration file")
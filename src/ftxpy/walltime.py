@@ -0,0 +1,213 @@
+# import statements
+import math
+import numpy as np
+import os
+import re
+import time
+
+# class that represents a model for the wall-clock time of FTX runs
+class FTXWalltimeModel():
+    """
+    A class to represent a model for the wall-clock time of FTX runs
+
+    The wall-clock time of an FTX loop is modeled as a + b * (length of the loop in
+    simulated time). The coefficients are fitted to past runs that finished or were
+    killed because they exceeded their time limit: every 'driver time (in loop)' line
+    in log.ftx marks a completed loop. The wall-clock time of the completed loops is
+    taken from the time stamps of the log lines if they have one, otherwise from the
+    start time of the job (see 'FTXRun.get_start_time') to the last modification of
+    log.ftx. Killed runs without either are counted as running for their full time
+    limit, which overestimates the time per loop. The number of remaining loops follows
+    from the loop schedule in the parameters (LOOP_TIME_STEP is multiplied by
+    LOOP_TS_FACTOR every LOOP_TS_NLOOPS loops), which gives a predicted time limit for
+    a restart up to END_TIME.
+
+    Methods
+    -------
+    add_runs(runs)
+        Add the observations of the given FTX runs to this model
+    get_observations()
+        Returns the observations of this model
+    fit()
+        Fit this model to its observations
+    is_fitted()
+        Check if this model has been fitted
+    predict(parameters)
+        Returns the predicted wall-clock time (in minutes) to reach END_TIME
+    get_time_limit(parameters)
+        Returns the time limit (in minutes) for a run with the given parameters
+    """
+
+    def __init__(self, safety_factor:float=1.25, overhead:float=10, min_time_limit:int=10, max_time_limit:int=None):
+        """
+        Constructs all the necessary attributes for the FTXWalltimeModel object
+
+        Parameters
+        ----------
+            safety_factor : float (keyword argument)
+                The predicted wall-clock time is multiplied by this factor
+            overhead : float (keyword argument)
+                The number of minutes added to the time limit for the startup of a run
+            min_time_limit : int (keyword argument)
+                The minimum time limit (in minutes)
+            max_time_limit : int (keyword argument)
+                The maximum time limit (in minutes), None means no limit
+        """
+        if safety_factor < 1:
+            print(f"Invalid safety factor specified: expected a value of at least 1, got {safety_factor}")
+            raise ValueError("FTXPy -> FTXWalltimeModel -> __init__() : Invalid safety factor specified")
+        self.safety_factor = safety_factor
+        self.overhead = overhead
+        self.min_time_limit = min_time_limit
+        self.max_time_limit = max_time_limit
+        self._observations = list() # list of (number of loops, simulated time, wall-clock seconds) tuples
+        self._coeffs = None
+
+    def add_runs(self, runs:list)->int:
+        """
+        Add the observations of the given FTX runs to this model, returns the number of observations added
+
+            Parameters:
+                runs (list): The FTX runs, only runs that finished or exceeded their time limit are used
+        """
+        n = len(self._observations)
+        for run in runs:
+            observation = _get_observation(run)
+            if observation is not None:
+                self._observations.append(observation)
+        self._coeffs = None
+        return len(self._observations) - n
+
+    def get_observations(self)->list:
+        """Returns the observations of this model, as a list of (number of loops, simulated time, wall-clock seconds) tuples"""
+        return self._observations
+
+    def fit(self)->None:
+        """Fit this model to its observations"""
+        if len(self._observations) == 0:
+            self._coeffs = None
+            return
+        A = np.array([[n, dt] for n, dt, _ in self._observations], dtype=float)
+        w = np.array([seconds for _, _, seconds in self._observations], dtype=float)
+        coeffs = None
+        if np.linalg.matrix_rank(A) == 2:
+            coeffs, *_ = np.linalg.lstsq(A, w, rcond=None)
+        if coeffs is None or np.any(coeffs < 0): # not enough information to separate both terms, use a constant time per loop
+            coeffs = np.array([w.sum() / A[:, 0].sum(), 0.0])
+        self._coeffs = coeffs
+
+    def is_fitted(self)->bool:
+        """Check if this model has been fitted"""
+        return self._coeffs is not None
+
+    def predict(self, parameters:dict)->float:
+        """
+        Returns the predicted wall-clock time (in minutes) to reach END_TIME, without safety margin
+
+            Parameters:
+                parameters (dict): A dict with parameter names as keys and FTX parameters as values
+        """
+        if not self.is_fitted():
+            print(f"The walltime model has not been fitted, use 'fit()' first")
+            raise ValueError("FTXPy -> FTXWalltimeModel -> predict() : The walltime model has not been fitted")
+        n, dt = _get_remaining_loops(parameters)
+        return (self._coeffs[0] * n + self._coeffs[1] * dt) / 60
+
+    def get_time_limit(self, parameters:dict, max_time_limit:float=None)->int:
+        """
+        Returns the time limit (in minutes) for a run with the given parameters, or None if this model has not been fitted
+
+            Parameters:
+                parameters (dict): A dict with parameter names as keys and FTX parameters as values
+                max_time_limit (float): An additional maximum time limit (in minutes), e.g. the time limit of the original batchscript, None means no limit
+
+        Notes:
+            The predicted time limit is at least 'min_time_limit', unless that exceeds one of the maximum time limits.
+        """
+        if not self.is_fitted():
+            return None
+        time_limit = max(self.min_time_limit, math.ceil(self.safety_factor * self.predict(parameters) + self.overhead))
+        for limit in (self.max_time_limit, max_time_limit):
+            if isinstance(limit, (int, float)):
+                time_limit = min(time_limit, limit)
+        return time_limit
+
+# function to return a (number of loops, simulated time, wall-clock seconds) observation of a run, or None
+def _get_observation(run)->tuple:
+    if hasattr(run, "_walltime_observation"): # runs that have ended are only read once
+        return run._walltime_observation
+    if not run.has_started():
+        return None
+    if run.has_finished() or run.has_exceeded_the_time_limit():
+        run._walltime_observation = _read_observation(run)
+    else: # still queueing or running, or failed and may be resubmitted
+        return None
+    return run._walltime_observation
+
+# function to read a (number of loops, simulated time, wall-clock seconds) observation from the log of a run that finished or exceeded its time limit, or None
+def _read_observation(run)->tuple:
+    log_ftx = os.path.join(run.get_work_dir(), "log.ftx")
+    if not os.path.isfile(log_ftx):
+        return None
+    times = list() # simulated time at the end of every completed loop
+    first_stamp = None # time stamp of the first line with a time stamp
+    last_stamp = None # time stamp of the last completed loop
+    with open(log_ftx, "r") as f:
+        for line in f:
+            stamp = _parse_time_stamp(line)
+            if first_stamp is None:
+                first_stamp = stamp
+            if "driver time (in loop)" in line:
+                try:
+                    times.append(float(line.split()[-1]))
+                except ValueError:
+                    continue
+                last_stamp = stamp
+    if len(times) == 0:
+        return None
+    dt = max(0.0, times[-1] - float(run.inputs.parameters["INIT_TIME"].get_value()))
+    if first_stamp is not None and last_stamp is not None and last_stamp > first_stamp: # time stamps of the completed loops
+        return len(times), dt, last_stamp - first_stamp
+    time_limit = run.batchscript.slurm_settings.get("time_limit")
+    start_time = run.get_start_time()
+    if start_time is not None: # from the start of the job to the last line written
+        end_time = os.path.getmtime(log_ftx)
+        if isinstance(time_limit, (int, float)):
+            end_time = min(end_time, start_time + 60.0 * time_limit)
+        if end_time > start_time:
+            return len(times), dt, end_time - start_time
+    if run.has_exceeded_the_time_limit() and isinstance(time_limit, (int, float)): # an upper bound
+        return len(times), dt, 60.0 * time_limit
+    return None
+
+# time stamp at the start of a log line, as written by the logging module (e.g. '2022-06-01 12:00:00,123')
+_time_stamp = re.compile(r"^\s*(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})(?:[.,](\d+))?")
+
+# function to return the time stamp at the start of a log line (in seconds since the epoch, in local time), or None if the line has no time stamp
+def _parse_time_stamp(line:str)->float:
+    match = _time_stamp.match(line)
+    if match is None:
+        return None
+    try:
+        seconds = time.mktime(time.strptime(f"{match.group(1)} {match.group(2)}", "%Y-%m-%d %H:%M:%S"))
+    except (ValueError, OverflowError):
+        return None
+    return seconds + (float("0." + match.group(3)) if match.group(3) else 0.0)
+
+# function to return the number of loops and the simulated time up to END_TIME
+def _get_remaining_loops(parameters:dict, max_loops:int=1000000)->tuple:
+    t = float(parameters["INIT_TIME"].get_value())
+    end_time = float(parameters["END_TIME"].get_value())
+    loop_time_step = float(parameters["LOOP_TIME_STEP"].get_value())
+    factor = float(parameters["LOOP_TS_FACTOR"].get_value())
+    nloops = max(1, int(parameters["LOOP_TS_NLOOPS"].get_value()))
+    if loop_time_step <= 0:
+        print(f"Invalid loop time step: expected a positive value, got {loop_time_step}")
+        raise ValueError("FTXPy -> FTXWalltimeModel -> predict() : Invalid loop time step")
+    n = 0
+    while t < end_time and n < max_loops:
+        t += min(loop_time_step, end_time - t)
+        n += 1
+        if n % nloops == 0:
+            loop_time_step *= factor
+    return n, max(0.0, end_time - float(parameters["INIT_TIME"].get_value()))
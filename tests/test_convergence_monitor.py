@@ -0,0 +1,60 @@
+import ftxpy
+import numpy as np
+import os
+import pickle
+import tempfile
+import time
+import types
+
+# set up a source directory with an input file
+tmp_dir = tempfile.mkdtemp()
+source = os.path.join(tmp_dir, "source")
+os.makedirs(source)
+with open(os.path.join(source, "ftx.conf"), "w") as f:
+    f.write("SIM_NAME = {SIM_NAME}\n")
+
+# function to set up a simulation that writes a retention line every 0.1 s, the retention levels off at 'level' (or keeps growing if None)
+def get_simulation(name, level):
+    config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile="debug")
+    inputs = ftxpy.FTXInput(parameters=config["input"]["parameters"], source=source)
+    value = "$t" if level is None else f"$(( t < 5 ? t : {level} ))"
+    commands = ["mkdir -p work/workers__xolotlWorker_0", "for t in $(seq 0 600); do echo \"$t $((t + 1)) $(( 2 * " + value + " )) 0 0 1\" >> work/workers__xolotlWorker_0/retentionOut.txt; sleep 0.1; done"]
+    batchscript = ftxpy.LocalBatchscript({"output": "log.slurm.stdOut"}, commands)
+    work_dir = os.path.join(tmp_dir, name)
+    os.makedirs(work_dir)
+    return ftxpy.FTXSimulation(ftxpy.FTXRun(work_dir, inputs, batchscript))
+
+# the retention of the first simulation converges
+converging = get_simulation("converging", 5)
+converging.start()
+monitor = ftxpy.FTXConvergenceMonitor(ftxpy.FTXRelativeChange("content", window=3, rtol=1e-6))
+for _ in range(100):
+    if len(monitor.check_group(types.SimpleNamespace(simulations=[converging]))) > 0:
+        break
+    time.sleep(0.1)
+
+# the converged simulation is finished and its job is cancelled
+assert converging.is_converged() and converging.has_finished() and "has converged" in converging.status()
+assert ftxpy.get_local_queue().wait(timeout=30)
+assert not converging.is_running() and not converging.has_exceeded_the_time_limit()
+
+# the retention of the second simulation keeps changing
+growing = get_simulation("growing", None)
+growing.start()
+for _ in range(20):
+    assert len(monitor.check_group(types.SimpleNamespace(simulations=[growing]))) == 0
+    time.sleep(0.1)
+assert not growing.is_converged() and growing.is_running()
+
+# the monitor only reads new lines, and gives the same series as reading the whole file
+t, x = monitor.get_series(growing)["content"]
+data = np.loadtxt(os.path.join(growing.current_run.get_work_dir(), "work", "workers__xolotlWorker_0", "retentionOut.txt"))
+assert len(t) > 10 and np.all(t == data[1:len(t) + 1, 0]) and np.all(x == data[1:len(t) + 1, 2])
+
+# a pickled monitor continues where it stopped, e.g. between two cron-driven checks
+time.sleep(0.5)
+t, x = pickle.loads(pickle.dumps(monitor)).get_series(growing)["content"]
+data = np.loadtxt(os.path.join(growing.current_run.get_work_dir(), "work", "workers__xolotlWorker_0", "retentionOut.txt"))
+assert len(t) >= len(data) - 2 and np.all(t == data[1:len(t) + 1, 0]) and np.all(x == data[1:len(t) + 1, 2])
+growing.current_run.cancel()
+assert ftxpy.get_local_queue().wait(timeout=30)
@@ -0,0 +1,38 @@
+import ftxpy
+import h5py
+import numpy as np
+import os
+import tempfile
+
+# create a synthetic Xolotl checkpoint file with a header, a network and three concentration timesteps
+tmp_dir = tempfile.mkdtemp()
+in_file = os.path.join(tmp_dir, "xolotlStop.h5")
+out_file = os.path.join(tmp_dir, "networkFile.h5")
+with h5py.File(in_file, "w") as f:
+    header = f.create_group("headerGroup")
+    header.attrs["nx"] = 8
+    header.create_dataset("grid", data=np.linspace(0, 1, 8))
+    network = f.create_group("networkGroup")
+    network.create_dataset("reactions", data=np.arange(4000, dtype=np.int64).reshape(1000, 4), chunks=(100, 4), compression="gzip")
+    concentrations = f.create_group("concentrationsGroup")
+    concentrations.attrs["lastTimeStep"] = 2
+    for timestep in range(3):
+        concentration = concentrations.create_group(f"concentration_{timestep}")
+        concentration.attrs["absoluteTime"] = 0.1 * timestep
+        concentration.create_dataset("concs", data=np.full((8, 50), timestep, dtype=np.float64))
+        concentration.create_dataset("concs_startingIndices", data=np.arange(9, dtype=np.int64))
+
+# keep the last timestep
+nbytes = ftxpy.keep_last_ts(in_file, out_file)
+
+# check the result
+with h5py.File(in_file, "r") as f_in, h5py.File(out_file, "r") as f_out:
+    assert f_out["headerGroup"].attrs["nx"] == 8
+    assert np.array_equal(f_out["headerGroup/grid"][()], f_in["headerGroup/grid"][()])
+    assert np.array_equal(f_out["networkGroup/reactions"][()], f_in["networkGroup/reactions"][()])
+    assert f_out["networkGroup/reactions"].compression == "gzip" and f_out["networkGroup/reactions"].chunks == (100, 4)
+    assert list(f_out["concentrationsGroup"].keys()) == ["concentration_2"]
+    assert f_out["concentrationsGroup"].attrs["lastTimeStep"] == 2
+    assert f_out["concentrationsGroup/concentration_2"].attrs["absoluteTime"] == 0.2
+    assert np.array_equal(f_out["concentrationsGroup/concentration_2/concs"][()], f_in["concentrationsGroup/concentration_2/concs"][()])
+assert nbytes == 8*8 + 1000*4*8 + 8*50*8 + 9*8
@@ -0,0 +1,39 @@
+import ftxpy
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# run two jobs on a single local worker, the first one exceeds its time limit
+tmp_dir = tempfile.mkdtemp()
+queue = ftxpy.get_local_queue()
+queue.set_max_workers(1)
+batchscript = ftxpy.LocalBatchscript({"output": "log.slurm.stdOut", "time_limit": 0.02}, ["echo start", "sleep 10", "echo end"])
+with ftxpy.utils.working_directory(tmp_dir):
+    slow_job_id = batchscript.submit()
+    fast_job_id = ftxpy.LocalBatchscript({"output": "log.%j"}, ["echo $SLURM_JOB_ID"]).submit()
+
+# check the status of both jobs
+assert queue.is_running(slow_job_id)
+assert queue.is_queueing(fast_job_id)
+assert queue.wait(timeout=30)
+assert not queue.is_running(slow_job_id) and not queue.is_queueing(fast_job_id)
+
+# check the output files
+with open(os.path.join(tmp_dir, "log.slurm.stdOut"), "r") as f:
+    contents = f.read()
+assert "start" in contents and not "end" in contents and "DUE TO TIME LIMIT" in contents
+with open(os.path.join(tmp_dir, f"log.{fast_job_id}"), "r") as f:
+    assert f.read().strip() == fast_job_id
+
+# jobs keep running after the submitting process has exited, and can be queried and cancelled from another process
+script = f"import ftxpy, os; os.chdir({tmp_dir!r}); print(ftxpy.LocalBatchscript({{'output': 'log.detached'}}, ['sleep 30']).submit())"
+result = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True)
+detached_job_id = result.stdout.strip().splitlines()[-1]
+assert queue.is_running(detached_job_id)
+queue.cancel(detached_job_id)
+time.sleep(1)
+assert not queue.is_running(detached_job_id)
+with open(os.path.join(tmp_dir, "log.detached"), "r") as f:
+    assert "CANCELLED" in f.read()
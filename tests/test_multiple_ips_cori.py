@@ -27,7 +27,7 @@ for seed in [0, 1]:
 
     # define inputs
     source = os.path.expandvars(config["input"]["source"])
-    inputs = ftxpy.FTXInput(parameters=parameters, source=source)
+    inputs = ftxpy.FTXInput(parameters=parameters, source=source, staging=config["input"]["staging"])
 
     # define batchscript
     slurm_settings = config["batchscript"]["slurm_settings"]
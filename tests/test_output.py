@@ -0,0 +1,53 @@
+import ftxpy
+import numpy as np
+import os
+import tempfile
+import types
+
+# function to set up a run directory with surface and retention outputs for the given times
+tmp_dir = tempfile.mkdtemp()
+def get_run(name, times, finished=True):
+    work_dir = os.path.join(tmp_dir, name)
+    os.makedirs(os.path.join(work_dir, "work", "workers__xolotlWorker_0"))
+    write_outputs(work_dir, times)
+    return types.SimpleNamespace(get_work_dir=lambda: work_dir, has_finished=lambda: finished)
+
+# function to append outputs for the given times to a run directory
+def write_outputs(work_dir, times):
+    with open(os.path.join(work_dir, "work", "workers__xolotlWorker_0", "surface.txt"), "a") as f:
+        f.writelines(f"{t} {2 * t}\n" for t in times)
+    with open(os.path.join(work_dir, "work", "workers__xolotlWorker_0", "retentionOut.txt"), "a") as f:
+        f.writelines(f"{t} {t + 1} {3 * t} 0 0 1\n" for t in times)
+
+# function to merge the series of all runs from scratch
+def get_expected(runs):
+    return {name: np.unique(np.vstack([np.loadtxt(os.path.join(run.get_work_dir(), "work", "workers__xolotlWorker_0", file), ndmin=2).reshape(-1, ncols) for run in runs]), axis=0) for name, file, ncols in (("surface", "surface.txt", 2), ("retention", "retentionOut.txt", 6))}
+
+# function to restore and ingest the outputs of a simulation as in a postprocess, returns the number of files parsed
+def postprocess(simulation):
+    files_read = ftxpy.get_text_reader().files_read
+    output = ftxpy.FTXOutput(simulation)
+    output.restore()
+    output.ingest()
+    output.save_series()
+    expected = get_expected(simulation.get_runs())
+    assert all(np.array_equal(output._series[name], expected[name]) for name in expected)
+    return ftxpy.get_text_reader().files_read - files_read
+
+# the first run is parsed once
+runs = [get_run("run_0", range(0, 10))]
+simulation = types.SimpleNamespace(get_runs=lambda: runs, get_path=lambda: runs[0].get_work_dir())
+assert postprocess(simulation) == 2 and postprocess(simulation) == 0
+assert os.path.isfile(os.path.join(simulation.get_path(), ftxpy.FTXOutput.merged_file)) and not os.path.isfile(os.path.join(simulation.get_path(), "output.pk"))
+
+# a restart that overlaps with the first run is merged without parsing the first run again
+runs.append(get_run("run_1", range(8, 15), finished=False))
+assert postprocess(simulation) == 2
+
+# lines appended to the running restart replace its rows
+write_outputs(runs[1].get_work_dir(), range(15, 20))
+assert postprocess(simulation) == 2
+
+# a change to an earlier run merges all runs again, unchanged runs are read from their sidecar files
+write_outputs(runs[0].get_work_dir(), range(30, 32))
+assert postprocess(simulation) == 2
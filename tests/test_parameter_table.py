@@ -0,0 +1,73 @@
+import copy
+import ftxpy
+import numpy as np
+import pickle
+import sys
+import threading
+
+# load configuration file
+config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile="debug")
+parameters = config["input"]["parameters"]
+
+# store the parameters of 100 members in a table, the members render the same values as the parameters
+table = ftxpy.FTXParameterTable(parameters, n_members=100)
+member = table.get_member(3)
+assert list(member) == list(parameters)
+assert ftxpy.resolve_parameters(member, list(member)) == ftxpy.resolve_parameters(parameters, list(parameters))
+assert member["NPROC"].get_value() == 128 and isinstance(member["NPROC"].get_value(), int)
+
+# set the uncertain parameters of all members at once
+sampler = ftxpy.FTXSampler(parameters, method="mc", seed=2022)
+design = sampler.sample(100)
+for j, param_name in enumerate(sampler.get_parameter_names()):
+    table.set_values(param_name, design[:, j])
+table.check_bounds()
+assert member["SBV_W"].get_value() == design[3, sampler.get_parameter_names().index("SBV_W")]
+
+# values outside the bounds are rejected
+try:
+    member["SBV_W"].set_value(100)
+    raise AssertionError("expected a ValueError")
+except ValueError:
+    pass
+
+# deep copies add a row to the same table
+restart = copy.deepcopy(member)
+restart["START_MODE"].set_value("RESTART")
+assert restart.get_table() is table and table.get_size() == 101
+assert member["START_MODE"].get_value() == "INIT"
+
+# pickled members are loaded into the table with the same columns
+loaded = pickle.loads(pickle.dumps(restart))
+assert loaded.get_table() is table and loaded["START_MODE"].get_value() == "RESTART"
+assert np.isclose(loaded["SBV_W"].get_value(), member["SBV_W"].get_value())
+
+# pickled members only hold the values of their row, the columns are pickled once with the table
+members = table.add_members(10)
+assert len(pickle.dumps(members)) < len(pickle.dumps(table)) + 10 * (len(pickle.dumps(members[0])) - len(pickle.dumps(table)))
+
+# the rows of discarded copies are reused
+size = table.get_size()
+for _ in range(100):
+    copy.deepcopy(member)
+    pickle.loads(pickle.dumps(member))
+assert table.get_size() == size and len(table.get_values("SBV_W")) <= size + 1
+del restart, loaded
+assert table.get_size() == size - 2
+table.check_bounds()
+
+# copies can be made and discarded in several threads at once
+errors = list()
+def copy_member():
+    try:
+        for _ in range(2000):
+            copy.deepcopy(member)
+    except Exception as e:
+        errors.append(e)
+sys.setswitchinterval(1e-6) # switch threads as often as possible
+threads = [threading.Thread(target=copy_member) for _ in range(4)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert len(errors) == 0 and table.get_size() == size - 2 and all(refs >= 0 for refs in table._refs)
@@ -0,0 +1,46 @@
+import ftxpy
+import os
+import tempfile
+
+# parse the same configuration file twice, the second call uses the cache
+config_file = ftxpy._ftxpy_config_cori_
+config = ftxpy.utils.parse(config_file, case="PISCES", profile="debug")
+other = ftxpy.utils.parse(config_file, case="PISCES", profile="debug")
+reference = ftxpy.utils.parse(config_file, case="PISCES", profile="debug", cache=False)
+
+# cached and uncached calls return the same configuration
+parameters = config["input"]["parameters"]
+assert ftxpy.resolve_parameters(parameters, list(parameters)) == ftxpy.resolve_parameters(reference["input"]["parameters"], list(reference["input"]["parameters"]))
+assert config["batchscript"] == reference["batchscript"]
+
+# every call returns its own parameters and settings
+parameters["SIM_NAME"].set_value("seed_0")
+config["batchscript"]["slurm_settings"]["time_limit"] = 5
+assert other["input"]["parameters"]["SIM_NAME"].get_value() != "seed_0"
+assert other["batchscript"]["slurm_settings"]["time_limit"] == reference["batchscript"]["slurm_settings"]["time_limit"]
+assert isinstance(parameters["SIM_NAME"], ftxpy.FTXParameter)
+parameters["SIM_NAME"].value = "seed_1" # attributes remain writable
+assert other["input"]["parameters"]["SIM_NAME"].value != "seed_1"
+
+# a changed configuration file is parsed again
+with tempfile.TemporaryDirectory() as tmp_dir:
+    with open(config_file, "r") as f:
+        contents = f.read()
+    tmp_file = os.path.join(tmp_dir, "config.toml")
+    with open(tmp_file, "w") as f:
+        f.write(contents.replace('[input.cases.PISCES.parameters]', '[input.cases.PISCES.parameters]\nSIM_NAME = "changed"'))
+    assert ftxpy.utils.parse(tmp_file)["input"]["parameters"]["SIM_NAME"].get_value() == "changed"
+
+    # the staging table is optional
+    with open(tmp_file, "w") as f:
+        f.write(contents.replace("[input.staging]", "[input.staging_unused]"))
+    assert ftxpy.utils.parse(tmp_file)["input"]["staging"] == dict()
+
+    # overlays that refer to unknown parameters are rejected
+    with open(tmp_file, "w") as f:
+        f.write(contents.replace('[input.cases.PISCES.parameters]', '[input.cases.PISCES.parameters]\nUNKNOWN = 1'))
+    try:
+        ftxpy.utils.parse(tmp_file)
+        raise AssertionError("expected a ValueError")
+    except ValueError:
+        pass
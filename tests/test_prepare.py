@@ -0,0 +1,32 @@
+import ftxpy
+import os
+import tempfile
+
+# set up a source directory with an input file
+tmp_dir = tempfile.mkdtemp()
+source = os.path.join(tmp_dir, "source")
+os.makedirs(source)
+with open(os.path.join(source, "ftx.conf"), "w") as f:
+    f.write("SIM_ROOT = {SIM_ROOT}\n")
+
+# batchscript that cannot be submitted
+class FailingBatchscript(ftxpy.LocalBatchscript):
+    def submit(self):
+        raise RuntimeError("cannot submit")
+
+# simulations are prepared in place, a failed preparation leaves them as they were, with plain and table-backed parameters
+config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile="debug")
+table = ftxpy.FTXParameterTable(config["input"]["parameters"])
+for name, parameters in (("plain", config["input"]["parameters"]), ("table", table.add_members(1)[0])):
+    work_dir = os.path.join(tmp_dir, name)
+    os.makedirs(work_dir)
+    simulation = ftxpy.FTXSimulation(ftxpy.FTXRun(work_dir, ftxpy.FTXInput(parameters=parameters, source=source), FailingBatchscript({"output": "log.slurm.stdOut"}, ["true"])))
+    sim_root = parameters["SIM_ROOT"].get_value()
+    prepared, error = ftxpy.group._prepare_simulation(simulation, "start")
+    assert prepared is None and "cannot submit" in error
+    assert simulation.current_run.get_work_dir() == work_dir and parameters["SIM_ROOT"].get_value() == sim_root and not simulation.has_started()
+    simulation.current_run.batchscript = ftxpy.LocalBatchscript({"output": "log.slurm.stdOut"}, ["true"])
+    prepared, error = ftxpy.group._prepare_simulation(simulation, "start")
+    assert prepared is simulation and error is None and simulation.has_started()
+    assert simulation.current_run.inputs.parameters["SIM_ROOT"].get_value() == os.path.join(work_dir, "init_" + name)
+assert ftxpy.get_local_queue().wait(timeout=30)
@@ -0,0 +1,78 @@
+import ftxpy
+import os
+import pickle
+import sqlite3
+import tempfile
+
+# set up a source directory with an input file
+tmp_dir = tempfile.mkdtemp()
+source = os.path.join(tmp_dir, "source")
+os.makedirs(source)
+with open(os.path.join(source, "ftx.conf"), "w") as f:
+    f.write("SIM_NAME = {SIM_NAME}\nSIM_ROOT = {SIM_ROOT}\nEND_TIME = {END_TIME}\n")
+os.makedirs(os.path.join(source, "data"))
+result_index = ftxpy.FTXResultIndex(os.path.join(tmp_dir, "result_index.db"), version="test")
+
+# function to set up a simulation that writes a finished log.ftx
+def get_simulation(name, end_time=10):
+    config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile="debug")
+    parameters = config["input"]["parameters"]
+    parameters["SIM_NAME"].set_value(name)
+    parameters["END_TIME"].set_value(end_time)
+    inputs = ftxpy.FTXInput(parameters=parameters, source=source)
+    batchscript = ftxpy.LocalBatchscript({"output": "log.slurm.stdOut"}, ["echo 'FT-X driver:finalize called' > log.ftx"])
+    work_dir = os.path.join(tmp_dir, name)
+    os.makedirs(work_dir)
+    return ftxpy.FTXSimulation(ftxpy.FTXRun(work_dir, inputs, batchscript), result_index=result_index)
+
+# run a first simulation and add it to the result index
+first = get_simulation("first")
+first.start()
+assert ftxpy.get_local_queue().wait(timeout=30)
+assert first.has_finished() and first.record_result() and result_index.get_size() == 1
+
+# a simulation with the same inputs in another work dir reuses the finished runs
+second = get_simulation("second")
+second.start()
+assert second.is_reused() and second.has_finished() and not ftxpy.get_local_queue().is_running(second.current_run._job_id)
+assert os.path.realpath(second.current_run.get_work_dir()) == os.path.realpath(first.current_run.get_work_dir())
+assert second.current_run.inputs.parameters["SIM_NAME"].get_value() == "second"
+
+# the source templates are stored with the entry, so that reused runs can be rendered in another process
+with sqlite3.connect(os.path.join(tmp_dir, "result_index.db")) as connection:
+    templates = pickle.loads(connection.execute("SELECT templates FROM results").fetchone()[0])
+assert set(templates) == set(first.current_run.inputs.get_source_hashes().values())
+
+# a modified source directory changes the input hash
+key = result_index.get_key(first.current_run.inputs)
+with open(os.path.join(source, "data", "table.txt"), "w") as f:
+    f.write("1 2 3\n")
+ftxpy.get_fingerprint_cache().clear() # fingerprints are computed once per process
+assert result_index.get_key(first.current_run.inputs) != key
+os.remove(os.path.join(source, "data", "table.txt"))
+ftxpy.get_fingerprint_cache().clear()
+assert result_index.get_key(first.current_run.inputs) == key
+
+# a simulation with other inputs, or started with force=True, is submitted
+third = get_simulation("third", end_time=20)
+third.start()
+fourth = get_simulation("fourth")
+fourth.start(force=True)
+assert not third.is_reused() and not fourth.is_reused()
+assert ftxpy.get_local_queue().wait(timeout=30)
+
+# entries whose outputs were removed are dropped
+first.delete_all_runs()
+assert get_simulation("fifth").get_runs() == [] and result_index.find(first.current_run.inputs) is None and result_index.get_size() == 0
+
+# the version identifies the commands and executables
+commands = ["module load xolotl", "ips.py --config=ips.ftx.config"]
+executable = os.path.join(tmp_dir, "xolotl")
+with open(executable, "w") as f:
+    f.write("build 1\n")
+version = ftxpy.get_code_version(commands, executables=[executable], platform_name="test")
+assert version == ftxpy.get_code_version(list(commands), executables=[executable], platform_name="test")
+assert version != ftxpy.get_code_version(commands[:1] + ["module load xolotl/2"], executables=[executable], platform_name="test")
+with open(executable, "w") as f:
+    f.write("build 22\n")
+assert version != ftxpy.get_code_version(commands, executables=[executable], platform_name="test")
@@ -0,0 +1,24 @@
+import ftxpy
+import numpy as np
+
+# load configuration file
+config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile="debug")
+parameters = config["input"]["parameters"]
+
+# check that designs respect the bounds and can be extended without resampling the existing members
+for method in ["mc", "sobol", "halton"]:
+    sampler = ftxpy.FTXSampler(parameters, method=method, seed=2022)
+    design = sampler.sample(16)
+    assert design.shape == (16, len(sampler.get_parameter_names()))
+    assert np.array_equal(sampler.extend(sampler.sample(8), 8), design)
+    for j, param_name in enumerate(sampler.get_parameter_names()):
+        assert np.all(design[:, j] >= parameters[param_name].lower) and np.all(design[:, j] <= parameters[param_name].upper)
+
+# check that log10-transformed parameters are sampled on a log scale
+sampler = ftxpy.FTXSampler(parameters, param_names=["initialV"], method="halton", seed=2022)
+design = sampler.sample(256)
+assert np.abs(np.mean(np.log10(design[:, 0])) - np.log10(1e-18)) < 0.05
+
+# apply a row of a design
+sampler.apply(parameters, design[0])
+assert parameters["initialV"].get_value() == design[0, 0]
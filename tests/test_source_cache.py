@@ -0,0 +1,55 @@
+import copy
+import ftxpy
+import os
+import pickle
+import tempfile
+
+# set up a source directory with a template and a subdirectory
+tmp_dir = tempfile.mkdtemp()
+source = os.path.join(tmp_dir, "source")
+os.makedirs(os.path.join(source, "data"))
+with open(os.path.join(source, "ftx.conf"), "w") as f:
+    f.write("SIM_NAME = {SIM_NAME}\nEND_TIME = {END_TIME}\n")
+
+# inputs with the same source share their templates
+config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile="debug")
+parameters = config["input"]["parameters"]
+inputs = ftxpy.FTXInput(parameters=parameters, source=source)
+other = ftxpy.FTXInput(parameters=copy.deepcopy(parameters), source=source)
+content_hash = inputs.get_source_hashes()["ftx.conf"]
+assert other.get_source_hashes() == inputs.get_source_hashes() and content_hash in ftxpy.get_source_cache()
+
+# pickled inputs refer to their templates by hash
+assert not b"END_TIME = {END_TIME}" in pickle.dumps(inputs)
+
+# a simulation group saved in a state store keeps its templates when the source changes
+work_dir = os.path.join(tmp_dir, "run")
+os.makedirs(work_dir)
+run = ftxpy.FTXRun(work_dir, inputs, ftxpy.LocalBatchscript({"output": "log.slurm.stdOut"}, ["true"]))
+group = ftxpy.FTXGroup(tmp_dir, [ftxpy.FTXSimulation(run)])
+group.save()
+with open(os.path.join(source, "ftx.conf"), "w") as f:
+    f.write("modified\n")
+ftxpy.get_source_cache().clear()
+group = ftxpy.FTXGroup.load(os.path.join(tmp_dir, "simulation_group.db"))
+group.simulations[0].current_run.write_files()
+with open(os.path.join(work_dir, "ftx.conf"), "r") as f:
+    assert f.read() == f"SIM_NAME = {parameters['SIM_NAME'].get_value()}\nEND_TIME = {parameters['END_TIME'].get_value()}\n"
+
+# new inputs use the modified source
+assert ftxpy.FTXInput(parameters=parameters, source=source).get_source_hashes()["ftx.conf"] != content_hash
+
+# hardlinked sources are read-only, and modifications made in the same process are detected
+with open(os.path.join(source, "data", "table.dat"), "w") as f:
+    f.write("1 2 3\n")
+linked = ftxpy.FTXInput(parameters=copy.deepcopy(parameters), source=source, staging={"data": "hardlink"})
+linked.write_files(work_dir)
+assert os.stat(os.path.join(work_dir, "data", "table.dat")).st_mode & 0o222 == 0 and os.stat(os.path.join(source, "data", "table.dat")).st_mode & 0o222 == 0
+os.chmod(os.path.join(source, "data", "table.dat"), 0o644)
+with open(os.path.join(source, "data", "table.dat"), "a") as f:
+    f.write("4 5 6\n")
+try:
+    linked.write_files(work_dir)
+    raise AssertionError("modified shared source was not detected")
+except ValueError:
+    pass
@@ -0,0 +1,61 @@
+import ftxpy
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+# set up a source directory with an input file
+tmp_dir = tempfile.mkdtemp()
+source = os.path.join(tmp_dir, "source")
+os.makedirs(source)
+with open(os.path.join(source, "ftx.conf"), "w") as f:
+    f.write("SIM_NAME = {SIM_NAME}\nSIM_ROOT = {SIM_ROOT}\n")
+
+# function to set up a simulation, simulations in different directories may have the same name
+def get_simulation(directory, name):
+    config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile="debug")
+    parameters = config["input"]["parameters"]
+    parameters["SIM_NAME"].set_value(name)
+    inputs = ftxpy.FTXInput(parameters=parameters, source=source)
+    batchscript = ftxpy.LocalBatchscript({"output": "log.slurm.stdOut"}, ["echo 'FT-X driver:finalize called' > log.ftx"])
+    work_dir = os.path.join(tmp_dir, directory, name)
+    os.makedirs(work_dir)
+    return ftxpy.FTXSimulation(ftxpy.FTXRun(work_dir, inputs, batchscript))
+
+# simulations with the same name in different directories are stored separately
+group = ftxpy.FTXGroup(tmp_dir, [get_simulation("a", "sim"), get_simulation("b", "sim"), get_simulation("a", "other")])
+group.save()
+file_name = os.path.join(tmp_dir, "simulation_group.db")
+store = ftxpy.FTXStateStore(file_name)
+assert store.get_simulation_paths() == [simulation.get_path() for simulation in group.simulations]
+assert store.get_simulation_names() == ["sim", "sim", "other"]
+assert store.load_simulation("other").get_path() == group.simulations[2].get_path()
+
+# a simulation that was removed from the group is removed from the store
+del group.simulations[1]
+group.save(overwrite=True)
+assert store.get_simulation_paths() == [simulation.get_path() for simulation in group.simulations]
+
+# a group loaded with a subset of the simulations does not remove the others
+partial = ftxpy.FTXGroup.load(file_name, names=["other"])
+partial.save(overwrite=True)
+assert len(store.get_simulation_paths()) == 2
+
+# unchanged simulations are not rewritten, also when saved from another process
+run = group.simulations[0].current_run
+with open(os.path.join(run.get_work_dir(), "log.warning"), "w") as f:
+    f.write("ERROR: JOB CANCELLED DUE TO TIME LIMIT\n")
+assert run.has_errored() # the log scanner of this run now holds a set with several matches
+group.save(overwrite=True)
+script = f"import ftxpy; ftxpy.FTXGroup.load({file_name!r}).save(overwrite=True)"
+subprocess.run([sys.executable, "-c", script], check=True, env=dict(os.environ, PYTHONHASHSEED="1"))
+with sqlite3.connect(file_name) as connection:
+    updated = dict(connection.execute("SELECT path, updated FROM simulations"))
+for seed in ("2", "3", "4", "5"):
+    subprocess.run([sys.executable, "-c", script], check=True, env=dict(os.environ, PYTHONHASHSEED=seed))
+    with sqlite3.connect(file_name) as connection:
+        assert dict(connection.execute("SELECT path, updated FROM simulations")) == updated
+
+# the status is computed when it is requested
+assert list(store.get_status().values()) == [simulation.status() for simulation in group.simulations]
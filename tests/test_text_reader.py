@@ -0,0 +1,44 @@
+import ftxpy
+import numpy as np
+import os
+import tempfile
+
+# write an output file whose last line was cut off by a running or killed job
+tmp_dir = tempfile.mkdtemp()
+file_name = os.path.join(tmp_dir, "retentionOut.txt")
+rows = np.arange(12, dtype=np.float64).reshape(4, 3) / 7
+with open(file_name, "w") as f:
+    f.write("# time retention flux\n")
+    for row in rows:
+        f.write(" ".join(repr(float(value)) for value in row) + "\n")
+    f.write("0.5 0.2")
+
+# the last line is dropped, unless the file is complete
+reader = ftxpy.TextReader()
+assert np.array_equal(reader.read(file_name), rows)
+try:
+    reader.read(file_name, complete=True)
+    raise AssertionError("a cut off line in a complete file was not rejected")
+except ValueError:
+    pass
+with open(file_name, "a") as f:
+    f.write(" 0.1")
+assert np.array_equal(reader.read(file_name, complete=True), np.vstack([rows, [0.5, 0.2, 0.1]]))
+
+# a file with only a cut off line has no rows
+with open(file_name, "w") as f:
+    f.write("1.0 2.")
+assert reader.read(file_name).shape == (0, 0)
+
+# files that do not fit in a single block are read in full
+with open(file_name, "w") as f:
+    many_rows = np.random.default_rng(2022).random((100000, 6))
+    np.savetxt(f, many_rows)
+    f.write("0.25 0.5")
+assert os.path.getsize(file_name) > ftxpy.textreader._block_size and np.allclose(reader.read(file_name), many_rows)
+
+# the parse statistics can be combined
+total = ftxpy.TextReader()
+total.add_stats(reader.get_stats())
+total.add_stats(reader.get_stats())
+assert total.files_read == 2 * reader.files_read and total.rows_read == 2 * reader.rows_read
@@ -0,0 +1,43 @@
+import ftxpy
+import os
+import tempfile
+import time
+import types
+
+# function to set up a run that completed the given loops, with log lines with or without time stamps
+tmp_dir = tempfile.mkdtemp()
+config = ftxpy.utils.parse(ftxpy._ftxpy_config_cori_, case="PISCES", profile="debug")
+def get_run(name, loop_times, seconds_per_loop, stamps=True, finished=True, killed=False, start_time=None, time_limit=60):
+    work_dir = os.path.join(tmp_dir, name)
+    os.makedirs(work_dir)
+    start = time.mktime(time.strptime("2022-06-01 12:00:00", "%Y-%m-%d %H:%M:%S"))
+    with open(os.path.join(work_dir, "log.ftx"), "w") as f:
+        for k, t in enumerate([None] + list(loop_times)):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + k * seconds_per_loop)) + ",250 " if stamps else ""
+            f.write(stamp + ("driver:init\n" if t is None else f"driver time (in loop) {t}\n"))
+    return types.SimpleNamespace(get_work_dir=lambda: work_dir, has_started=lambda: True, has_finished=lambda: finished, has_exceeded_the_time_limit=lambda: killed,
+                                 get_start_time=lambda: start_time, batchscript=types.SimpleNamespace(slurm_settings={"time_limit": time_limit}), inputs=types.SimpleNamespace(parameters=config["input"]["parameters"]))
+
+# the time stamps of finished runs give the wall-clock time of the completed loops
+model = ftxpy.FTXWalltimeModel()
+assert model.add_runs([get_run("stamped", [0.1, 0.2, 0.3, 0.4], 30), get_run("running", [0.1], 30, finished=False)]) == 1
+assert model.get_observations() == [(4, 0.4, 120.0)]
+
+# without time stamps, the time from the start of the job to the last line of the log is used
+run = get_run("started", [0.1, 0.2], 30, stamps=False, start_time=time.time() - 90)
+assert model.add_runs([run]) == 1 and abs(model.get_observations()[-1][2] - 90) < 5
+
+# killed runs without time stamps and start time count as running for their full time limit
+assert model.add_runs([get_run("killed", [0.1, 0.2, 0.3], 30, stamps=False, finished=False, killed=True, time_limit=2)]) == 1
+assert model.get_observations()[-1] == (3, 0.3, 120.0)
+
+# finished runs without time stamps and start time are not used
+assert model.add_runs([get_run("unknown", [0.1], 30, stamps=False)]) == 0
+
+# the model can be fitted without killed runs
+model = ftxpy.FTXWalltimeModel()
+model.add_runs([get_run(f"finished_{k}", [0.1 * (j + 1) for j in range(k + 1)], 30) for k in range(3)])
+model.fit()
+parameters = config["input"]["parameters"]
+n, _ = ftxpy.walltime._get_remaining_loops(parameters)
+assert model.is_fitted() and abs(model.predict(parameters) - 0.5 * n) < 1e-6 * n